@@ -1,39 +1,46 @@
-import json
 import requests
-import logging
+import requests.adapters
 import time
+import heapq
+import weakref
+import threading
+import collections
+import concurrent.futures
 from spylunking.log.setup_logging import console_logger
 from antinex_client.utils import ev
+from antinex_client.base_ai_client import BaseAIClient
+from antinex_client.base_ai_client import log_level
 from antinex_client.consts import LOGIN_SUCCESS
-from antinex_client.consts import LOGIN_NOT_ATTEMPTED
 from antinex_client.consts import LOGIN_FAILED
 from antinex_client.consts import SUCCESS
 from antinex_client.consts import FAILED
 from antinex_client.consts import ERROR
 from antinex_client.consts import NOT_SET
+from antinex_client.consts import ANTINEX_CACHE_MAX_ENTRIES
+from antinex_client.consts import ANTINEX_CACHE_MAX_BYTES
+from antinex_client.consts import ANTINEX_CACHE_TTL
+from antinex_client.consts import ANTINEX_CACHE_EVICTION
+from antinex_client.consts import ANTINEX_CACHE_SUMMARIES_ONLY
+from antinex_client.consts import ANTINEX_ETA_FILE
+from antinex_client.consts import ANTINEX_TOKEN_CACHE_FILE
+from antinex_client.consts import ANTINEX_PREDICTION_CACHE_FILE
+from antinex_client.json_codec import dumps
+from antinex_client.json_codec import loads
+from antinex_client.stream_json import iter_json_array
+from antinex_client.poll_policy import build_poll_policy
+from antinex_client.predict_format import decode_predict_rows
+from antinex_client.predict_format import set_predict_rows
+from antinex_client.predict_format import PREDICT_FORMAT_ROWS
+from antinex_client.prediction_cache import PredictionCache
+from antinex_client.prediction_cache import build_row_key
 
 
-log_level = logging.INFO
-log_level_str = ev(
-    "AI_CLIENT_LEVEL",
-    "info").lower()
-if log_level_str == "info":
-    log_level = logging.INFO
-elif log_level_str == "debug":
-    log_level = logging.DEBUG
-elif log_level_str == "silent":
-    log_level = logging.CRITICAL
-elif log_level_str == "critical":
-    log_level = logging.CRITICAL
-elif log_level_str == "error":
-    log_level = logging.ERROR
-
 log = console_logger(
     name='ai_client',
     log_level=log_level)
 
 
-class AIClient:
+class AIClient(BaseAIClient):
 
     """
 
@@ -42,6 +49,11 @@ class AIClient:
     This can use either environment variables or keyword arguments
     to create a valid client.
 
+    One client can be shared by many threads. Logins hold a lock
+    so threads share one token, the record caches and job
+    tracking are locked, and each thread gets its own
+    ``requests.Session`` mounted on one shared connection pool.
+
     """
 
     def __init__(
@@ -62,7 +74,38 @@ class AIClient:
             ca_dir=None,
             cert_file=None,
             key_file=None,
-            debug=False):
+            debug=False,
+            pool_connections=None,
+            pool_maxsize=None,
+            pool_block=False,
+            keep_alive=True,
+            poll_policy=None,
+            estimator=None,
+            eta_file=ANTINEX_ETA_FILE,
+            status_probe=True,
+            conditional_get=True,
+            cache_max_entries=ANTINEX_CACHE_MAX_ENTRIES,
+            cache_max_bytes=ANTINEX_CACHE_MAX_BYTES,
+            cache_ttl=ANTINEX_CACHE_TTL,
+            cache_eviction=ANTINEX_CACHE_EVICTION,
+            cache_summaries_only=ANTINEX_CACHE_SUMMARIES_ONLY,
+            compress_requests=bool(ev(
+                "API_COMPRESS_REQUESTS",
+                "0") == "1"),
+            compress_min_bytes=int(ev(
+                "API_COMPRESS_MIN_BYTES",
+                "16384")),
+            compress_encoding=ev(
+                "API_COMPRESS_ENCODING",
+                "gzip"),
+            token_refresh_margin=float(ev(
+                "API_TOKEN_REFRESH_MARGIN",
+                "30")),
+            background_refresh=True,
+            token_cache=None,
+            token_cache_file=ANTINEX_TOKEN_CACHE_FILE,
+            prediction_cache=None,
+            prediction_cache_file=ANTINEX_PREDICTION_CACHE_FILE):
         """__init__
 
         :param user: username
@@ -74,16 +117,90 @@ class AIClient:
         :param cert_file: optional path to x509 ssl cert file
         :param key_file: optional path to x509 ssl private key
         :param debug: turn on debugging - this will print passwords to stdout
+        :param pool_connections: number of per-host connection pools
+                                 to cache in the session - defaults
+                                 to ``API_POOL_CONNECTIONS`` or 10
+        :param pool_maxsize: max number of connections to keep
+                             open in each host's pool - defaults
+                             to ``API_POOL_MAXSIZE`` or 10
+        :param pool_block: block when the pool has no free connections
+                           instead of opening a throwaway connection
+        :param keep_alive: reuse connections between calls - set to
+                           ``False`` to send ``Connection: close``
+        :param poll_policy: optional ``PollPolicy`` for the wait
+                            methods - defaults to backoff with jitter
+        :param estimator: optional ``JobDurationEstimator`` used to
+                          schedule the first poll of a job near its
+                          expected finish
+        :param eta_file: optional JSON file to persist job duration
+                         estimates across runs
+        :param status_probe: poll jobs and results with only their
+                             status fields and download the full
+                             records once when they are finished
+        :param conditional_get: send ``If-None-Match`` and
+                                ``If-Modified-Since`` from the cached
+                                copy and reuse it on a ``304``
+        :param cache_max_entries: max records kept in each of
+                                  ``all_jobs``, ``all_results`` and
+                                  ``all_prepares`` - ``0`` is unbounded
+        :param cache_max_bytes: max estimated bytes kept in each
+                                cache - ``0`` is unbounded
+        :param cache_ttl: seconds to keep a record - ``0`` is forever
+        :param cache_eviction: ``lru`` or ``fifo``
+        :param cache_summaries_only: only keep the scalar fields
+                                     of each record
+        :param compress_requests: compress ``run_job`` and
+                                  ``run_prepare`` bodies - the API
+                                  must accept ``Content-Encoding``
+        :param compress_min_bytes: only compress bodies this large
+        :param compress_encoding: ``gzip`` or ``deflate``
+        :param token_refresh_margin: seconds before the JWT's ``exp``
+                                     to log in again - ``0`` only
+                                     refreshes after a ``401``
+        :param background_refresh: refresh the token on a background
+                                   thread instead of in the caller
+        :param token_cache: optional ``TokenCache`` to reuse tokens
+                            from earlier runs
+        :param token_cache_file: optional file for a ``TokenCache``
+                                 when ``token_cache`` is not set
+        :param prediction_cache: optional ``PredictionCache`` for
+                                 ``run_job_with_cache``
+        :param prediction_cache_file: optional ``sqlite`` file for
+                                      the ``PredictionCache`` disk
+                                      tier when ``prediction_cache``
+                                      is not set
         """
 
-        self.user = user
-        self.email = email
-        self.password = password
-        self.url = url
-        self.verbose = verbose
-        self.ca_dir = ca_dir
-        self.cert_file = cert_file
-        self.key_file = key_file
+        super(AIClient, self).__init__(
+            user=user,
+            password=password,
+            url=url,
+            email=email,
+            verbose=verbose,
+            ca_dir=ca_dir,
+            cert_file=cert_file,
+            key_file=key_file,
+            debug=debug,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            keep_alive=keep_alive,
+            poll_policy=poll_policy,
+            estimator=estimator,
+            eta_file=eta_file,
+            status_probe=status_probe,
+            conditional_get=conditional_get,
+            cache_max_entries=cache_max_entries,
+            cache_max_bytes=cache_max_bytes,
+            cache_ttl=cache_ttl,
+            cache_eviction=cache_eviction,
+            cache_summaries_only=cache_summaries_only,
+            compress_requests=compress_requests,
+            compress_min_bytes=compress_min_bytes,
+            compress_encoding=compress_encoding,
+            token_refresh_margin=token_refresh_margin,
+            token_cache=token_cache,
+            token_cache_file=token_cache_file)
+
         self.cert = None
         self.use_verify = False
         if self.ca_dir:
@@ -96,32 +213,158 @@ class AIClient:
                 self.cert_file,
                 self.key_file)
 
-        self.debug = debug
+        self.background_refresh = background_refresh
+        # only one caller logs in at a time and the rest reuse its token
+        self.login_lock = threading.RLock()
+        self.token_lock = threading.Lock()
+        self.refreshing = False
+        self.pool_block = pool_block
+        self.prediction_cache = prediction_cache
+        self.own_prediction_cache = not prediction_cache
+        if not self.prediction_cache:
+            self.prediction_cache = PredictionCache(
+                db_file=prediction_cache_file or None)
+        # one session per thread on a shared thread-safe adapter
+        self.adapter = None
+        self.local = threading.local()
+        self.sessions = weakref.WeakSet()
+        self.session_lock = threading.Lock()
+        self.session = None
+        self.session = self.get_session()
+        self.load_cached_token()
+    # end of __init__
+
+    def build_adapter(
+            self):
+        """build_adapter
+
+        Build the pooled ``HTTPAdapter`` shared by every session -
+        its ``urllib3`` pools are safe to use from many threads
+        """
+        return requests.adapters.HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block)
+    # end of build_adapter
+
+    def build_session(
+            self,
+            adapter=None):
+        """build_session
+
+        Build a ``requests.Session`` with a pooled adapter so every
+        call made by this client reuses the same TCP connections
+        (and TLS sessions when ``ca_dir`` or ``cert_file`` are set)
+        instead of reconnecting on every request
+
+        :param adapter: optional ``HTTPAdapter`` to share - a new
+                        one is built when not set
+        """
+
+        session = requests.Session()
+        if not adapter:
+            adapter = self.build_adapter()
+        session.mount(
+            "http://",
+            adapter)
+        session.mount(
+            "https://",
+            adapter)
+        session.verify = self.use_verify
+        session.headers["Accept-Encoding"] = "gzip, deflate"
+        session.cert = self.cert
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
 
         if self.debug:
-            self.verbose = True
-
-        self.api_urls = {
-            "login": "{}/api-token-auth/".format(self.url),
-            "job": "{}/ml/".format(self.url),
-            "prepare": "{}/mlprepare/".format(self.url),
-            "results": "{}/mlresults/".format(self.url),
-            "create_user": "{}/users/".format(self.url)
-        }
-        self.token = "not-logged-in-no-token"
-        self.login_status = LOGIN_NOT_ATTEMPTED
-        self.user_id = None
-        self.max_retries = 10
-        self.login_retry_wait_time = 0.1  # in seconds
-        self.all_prepares = {}
-        self.all_jobs = {}
-        self.all_results = {}
-    # end of __init__
+            log.info(("built session pool_connections={} pool_maxsize={} "
+                      "pool_block={} keep_alive={}")
+                     .format(
+                        self.pool_connections,
+                        self.pool_maxsize,
+                        self.pool_block,
+                        self.keep_alive))
+
+        return session
+    # end of build_session
+
+    def close(
+            self):
+        """close
+
+        Close every thread's session and release all open connections
+        """
+        with self.session_lock:
+            for session in list(self.sessions):
+                session.close()
+            self.sessions = weakref.WeakSet()
+            if self.adapter:
+                self.adapter.close()
+            self.adapter = None
+            self.local = threading.local()
+            self.session = None
+        if self.own_prediction_cache:
+            self.prediction_cache.close()
+    # end of close
+
+    def get_session(
+            self):
+        """get_session
+
+        Get the calling thread's session - sessions keep cookies
+        and headers so they are not shared between threads, but
+        they all send requests through one pooled adapter
+        """
+        session = getattr(
+            self.local,
+            "session",
+            None)
+        if session:
+            return session
+        with self.session_lock:
+            if not self.adapter:
+                self.adapter = self.build_adapter()
+            session = self.build_session(
+                adapter=self.adapter)
+            self.sessions.add(session)
+            self.local.session = session
+            if not self.session:
+                self.session = session
+        return session
+    # end of get_session
+
+    def __enter__(
+            self):
+        """__enter__"""
+        return self
+    # end of __enter__
+
+    def __exit__(
+            self,
+            exc_type,
+            exc_value,
+            traceback):
+        """__exit__
+
+        :param exc_type: exception type
+        :param exc_value: exception value
+        :param traceback: exception traceback
+        """
+        self.close()
+    # end of __exit__
 
     def login(
             self):
         """login"""
 
+        with self.login_lock:
+            return self.login_unlocked()
+    # end of login
+
+    def login_unlocked(
+            self):
+        """login_unlocked - call ``login`` to hold the login lock"""
+
         auth_url = self.api_urls["login"]
 
         if self.verbose:
@@ -150,11 +393,11 @@ class AIClient:
                     self.use_verify,
                     self.cert))
 
-        response = requests.post(
+        response = self.get_session().post(
             auth_url,
             verify=self.use_verify,
             cert=self.cert,
-            data=json.dumps(login_data),
+            data=dumps(login_data),
             headers=use_headers)
 
         if self.debug:
@@ -166,11 +409,11 @@ class AIClient:
 
         user_token = ""
         if response.status_code == 200:
-            user_token = json.loads(response.text)["token"]
+            user_token = loads(response.content)["token"]
 
         if user_token != "":
-            self.token = user_token
-            self.login_status = LOGIN_SUCCESS
+            self.set_token(
+                user_token)
 
             if self.verbose:
                 log.debug("login success")
@@ -184,63 +427,110 @@ class AIClient:
         # if the user token exists
 
         return self.login_status
-    # end of login
+    # end of login_unlocked
 
-    def is_logged_in(
+    def start_token_refresh(
             self):
-        """is_logged_in"""
-        return self.login_status == LOGIN_SUCCESS
-    # end of is_logged_in
+        """start_token_refresh
+
+        Start one background login to replace a token that is about
+        to expire - callers keep using the current token until the
+        new one is ready
+        """
+        with self.token_lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        thread = threading.Thread(
+            target=self.run_token_refresh,
+            args=(self.token,),
+            name="antinex-token-refresh",
+            daemon=True)
+        thread.start()
+    # end of start_token_refresh
+
+    def run_token_refresh(
+            self,
+            old_token=None):
+        """run_token_refresh
+
+        Background thread target for ``start_token_refresh`` - only
+        this thread clears ``refreshing``
+
+        :param old_token: token to replace
+        """
+        try:
+            return self.refresh_token(
+                old_token)
+        finally:
+            with self.token_lock:
+                self.refreshing = False
+    # end of run_token_refresh
+
+    def refresh_token(
+            self,
+            old_token=None):
+        """refresh_token
+
+        :param old_token: token to replace - skipped if another
+                          caller already replaced it
+        """
+        return self.retry_login(
+            failed_token=old_token or self.token)
+    # end of refresh_token
 
     def get_token(
             self):
         """get_token"""
+        if self.needs_refresh() and self.user and self.password:
+            if self.token_expires_at <= time.time():
+                # already expired so wait for the login
+                self.refresh_token(
+                    self.token)
+            elif self.background_refresh:
+                self.start_token_refresh()
+            else:
+                self.refresh_token(
+                    self.token)
         return self.token
     # end of get_token
 
-    def get_auth_header(
-            self):
-        """get_auth_header"""
-        headers = {
-            "Content-type": "application/json",
-            "Authorization": "JWT {}".format(self.get_token())
-        }
-        return headers
-    # end of get_auth_header
-
-    def build_response(
+    def retry_login(
             self,
-            status=NOT_SET,
-            error="",
-            data=None):
-        """build_response
+            failed_token=None):
+        """retry_login
 
-        :param status: status code
-        :param error: error message
-        :param data: dictionary to send back
-        """
-
-        res_node = {
-            "status": status,
-            "error": error,
-            "data": data
-        }
-        return res_node
-    # end of build_response
+        Log in again after a ``401`` - concurrent callers wait on
+        one login and reuse its token instead of each logging in
 
-    def retry_login(
-            self):
-        """retry_login"""
+        :param failed_token: token the API rejected - no login is
+                             made if the client already has a
+                             different token
+        """
 
         if not self.user or not self.password:
             return self.build_response(
                 status=ERROR,
                 error="please set the user and password")
 
+        with self.login_lock:
+            return self.retry_login_unlocked(
+                failed_token=failed_token)
+    # end of retry_login
+
+    def retry_login_unlocked(
+            self,
+            failed_token=None):
+        """retry_login_unlocked - call ``retry_login`` to hold the lock
+
+        :param failed_token: token the API rejected
+        """
+
         retry = 0
         not_done = True
         while not_done:
-            if self.is_logged_in():
+            if self.is_logged_in() \
+                    and (retry > 0 or self.token != failed_token):
                 return self.build_response(
                     status=SUCCESS)
             else:
@@ -250,7 +540,7 @@ class AIClient:
                                 retry,
                                 self.max_retries))
 
-                if self.login() == LOGIN_SUCCESS:
+                if self.login_unlocked() == LOGIN_SUCCESS:
                     return self.build_response(
                         status=SUCCESS)
                 else:
@@ -271,59 +561,68 @@ class AIClient:
             error="user={} not able to login attempts={}".format(
                 self.user,
                 retry))
-    # end of retry_login
+    # end of retry_login_unlocked
 
-    def get_prepare_by_id(
+    def get_record(
             self,
-            prepare_id=None):
-        """get_prepare_by_id
-
-        :param prepare_id: MLJob.id in the database
+            name,
+            url,
+            record_id,
+            all_records,
+            fields=None):
+        """get_record
+
+        Shared GET handler for the job, result and prepare records
+
+        :param name: record name for logging and errors
+        :param url: url for the record
+        :param record_id: record id in the database
+        :param all_records: dictionary to store the record in
+        :param fields: optional list of fields requested in ``url`` -
+                       projected records are not stored
         """
 
-        if not prepare_id:
-            log.error("missing prepare_id for get_prepare_by_id")
-            return self.build_response(
-                status=ERROR,
-                error="missing prepare_id for get_prepare_by_id")
-
-        if self.debug:
-            log.info(("user={} getting prepare={}")
-                     .format(
-                        self.user,
-                        prepare_id))
-
-        url = "{}{}".format(
-                self.api_urls["prepare"],
-                prepare_id)
-
         not_done = True
         while not_done:
 
+            token = self.get_token()
+            headers = self.get_auth_header(
+                token=token)
+            # send validators from the last response if there are any
+            cached_entry = self.get_cached_entry(
+                record_id=record_id,
+                url=url,
+                all_records=all_records,
+                headers=headers,
+                fields=fields)
+
             if self.debug:
                 log.info((
-                    "JOB attempting to get={} to url={} "
+                    "{} attempting to get={} to url={} "
                     "verify={} cert={}").format(
-                        prepare_id,
+                        name.upper(),
+                        record_id,
                         url,
                         self.use_verify,
                         self.cert))
 
-            response = requests.get(
+            response = self.get_session().get(
                 url,
                 verify=self.use_verify,
                 cert=self.cert,
-                headers=self.get_auth_header())
+                headers=headers)
 
             if self.debug:
-                log.info(("JOB response status_code={} text={} reason={}")
+                log.info(("{} response status_code={} text={} reason={}")
                          .format(
+                            name.upper(),
                             response.status_code,
                             response.text,
                             response.reason))
 
             if response.status_code == 401:
-                login_res = self.retry_login()
+                login_res = self.retry_login(
+                    failed_token=token)
                 if login_res["status"] != SUCCESS:
                     if self.verbose:
                         log.error(
@@ -332,38 +631,57 @@ class AIClient:
                         status=login_res["status"],
                         error=login_res["error"])
                 # if able to log back in just retry the call
+            elif response.status_code == 304 and cached_entry:
+
+                if self.debug:
+                    log.info(("{}={} not modified using cached copy")
+                             .format(
+                                name,
+                                record_id))
+
+                self.touch_record(
+                    record_id=record_id,
+                    url=url,
+                    all_records=all_records,
+                    fields=fields)
+                return self.build_response(
+                    status=SUCCESS,
+                    error="",
+                    data=cached_entry[0])
             elif response.status_code == 200:
 
                 if self.verbose:
                     log.debug("deserializing")
 
-                prepare_data = json.loads(
-                    response.text)
+                record_data = loads(
+                    response.content)
 
-                prepare_id = prepare_data.get(
+                found_id = record_data.get(
                     "id",
                     None)
 
-                if not prepare_id:
+                if not found_id:
                     return self.build_response(
                         status=ERROR,
-                        error="missing prepare.id",
+                        error="missing {}.id".format(
+                            name),
                         data="text={} reason={}".format(
                             response.reason,
                             response.text))
 
-                self.all_prepares[str(prepare_id)] = prepare_data
-
-                if self.debug:
-                    log.info(("added prepare={} all_prepares={}")
-                             .format(
-                                prepare_id,
-                                len(self.all_prepares)))
+                self.store_record(
+                    name=name,
+                    record_data=record_data,
+                    url=url,
+                    all_records=all_records,
+                    response_headers=response.headers,
+                    size=len(response.content),
+                    fields=fields)
 
                 return self.build_response(
                     status=SUCCESS,
                     error="",
-                    data=prepare_data)
+                    data=record_data)
             else:
                 err_msg = ("failed with "
                            "status_code={} text={} reason={}").format(
@@ -375,17 +693,53 @@ class AIClient:
                 return self.build_response(
                     status=ERROR,
                     error=err_msg)
-                # if able to log back in just retry the call
             # end of handling response status codes
         # end of while not_done
+    # end of get_record
+
+    def get_prepare_by_id(
+            self,
+            prepare_id=None,
+            fields=None):
+        """get_prepare_by_id
+
+        :param prepare_id: MLPrepare.id in the database
+        :param fields: optional list of fields to fetch instead
+                       of the whole record
+        """
+
+        if not prepare_id:
+            log.error("missing prepare_id for get_prepare_by_id")
+            return self.build_response(
+                status=ERROR,
+                error="missing prepare_id for get_prepare_by_id")
+
+        if self.debug:
+            log.info(("user={} getting prepare={}")
+                     .format(
+                        self.user,
+                        prepare_id))
+
+        return self.get_record(
+            name="prepare",
+            url=self.build_record_url(
+                self.api_urls["prepare"],
+                prepare_id,
+                fields=fields),
+            record_id=prepare_id,
+            all_records=self.all_prepares,
+            fields=fields)
     # end of get_prepare_by_id
 
     def get_job_by_id(
             self,
-            job_id=None):
+            job_id=None,
+            fields=None):
         """get_job_by_id
 
         :param job_id: MLJob.id in the database
+        :param fields: optional list of fields to fetch instead
+                       of the whole record
         """
 
         if not job_id:
@@ -400,99 +754,26 @@ class AIClient:
                         self.user,
                         job_id))
 
-        url = "{}{}".format(
+        return self.get_record(
+            name="job",
+            url=self.build_record_url(
                 self.api_urls["job"],
-                job_id)
-
-        not_done = True
-        while not_done:
-
-            if self.debug:
-                log.info((
-                    "JOB attempting to get={} to url={} "
-                    "verify={} cert={}").format(
-                        job_id,
-                        url,
-                        self.use_verify,
-                        self.cert))
-
-            response = requests.get(
-                url,
-                verify=self.use_verify,
-                cert=self.cert,
-                headers=self.get_auth_header())
-
-            if self.debug:
-                log.info(("JOB response status_code={} text={} reason={}")
-                         .format(
-                            response.status_code,
-                            response.text,
-                            response.reason))
-
-            if response.status_code == 401:
-                login_res = self.retry_login()
-                if login_res["status"] != SUCCESS:
-                    if self.verbose:
-                        log.error(
-                            "retry login attempts failed")
-                    return self.build_response(
-                        status=login_res["status"],
-                        error=login_res["error"])
-                # if able to log back in just retry the call
-            elif response.status_code == 200:
-
-                if self.verbose:
-                    log.debug("deserializing")
-
-                job_data = json.loads(
-                    response.text)
-
-                job_id = job_data.get(
-                    "id",
-                    None)
-
-                if not job_id:
-                    return self.build_response(
-                        status=ERROR,
-                        error="missing job.id",
-                        data="text={} reason={}".format(
-                            response.reason,
-                            response.text))
-
-                self.all_jobs[str(job_id)] = job_data
-
-                if self.debug:
-                    log.info(("added job={} all_jobs={}")
-                             .format(
-                                job_id,
-                                len(self.all_jobs)))
-
-                return self.build_response(
-                    status=SUCCESS,
-                    error="",
-                    data=job_data)
-            else:
-                err_msg = ("failed with "
-                           "status_code={} text={} reason={}").format(
-                               response.status_code,
-                               response.text,
-                               response.reason)
-                if self.verbose:
-                    log.error(err_msg)
-                return self.build_response(
-                    status=ERROR,
-                    error=err_msg)
-                # if able to log back in just retry the call
-            # end of handling response status codes
-        # end of while not_done
+                job_id,
+                fields=fields),
+            record_id=job_id,
+            all_records=self.all_jobs,
+            fields=fields)
     # end of get_job_by_id
 
     def get_result_by_id(
             self,
-            result_id=None):
+            result_id=None,
+            fields=None):
         """get_result_by_id
 
         :param result_id: MLJobResult.id in the database
+        :param fields: optional list of fields to fetch instead
+                       of the whole record
         """
 
         if not result_id:
@@ -507,37 +788,59 @@ class AIClient:
                         self.user,
                         result_id))
 
-        url = "{}{}".format(
+        return self.get_record(
+            name="result",
+            url=self.build_record_url(
                 self.api_urls["results"],
-                result_id)
+                result_id,
+                fields=fields),
+            record_id=result_id,
+            all_records=self.all_results,
+            fields=fields)
+    # end of get_result_by_id
+
+    def open_record_stream(
+            self,
+            name,
+            url,
+            record_id):
+        """open_record_stream
+
+        Start a streaming GET for a record and return the open
+        ``requests.Response`` in ``data`` without reading the body -
+        the caller must close it
+
+        :param name: record name for logging and errors
+        :param url: url for the record
+        :param record_id: record id in the database
+        """
 
         not_done = True
         while not_done:
 
+            token = self.get_token()
             if self.debug:
                 log.info((
-                    "RESULT attempting to get={} to url={} "
+                    "{} attempting to stream={} from url={} "
                     "verify={} cert={}").format(
-                        result_id,
+                        name.upper(),
+                        record_id,
                         url,
                         self.use_verify,
                         self.cert))
 
-            response = requests.get(
+            response = self.get_session().get(
                 url,
                 verify=self.use_verify,
                 cert=self.cert,
-                headers=self.get_auth_header())
-
-            if self.debug:
-                log.info(("RESULT response status_code={} text={} reason={}")
-                         .format(
-                            response.status_code,
-                            response.text,
-                            response.reason))
+                headers=self.get_auth_header(
+                    token=token),
+                stream=True)
 
             if response.status_code == 401:
-                login_res = self.retry_login()
+                response.close()
+                login_res = self.retry_login(
+                    failed_token=token)
                 if login_res["status"] != SUCCESS:
                     if self.verbose:
                         log.error(
@@ -547,69 +850,163 @@ class AIClient:
                         error=login_res["error"])
                 # if able to log back in just retry the call
             elif response.status_code == 200:
-
-                if self.verbose:
-                    log.debug("deserializing")
-
-                result_data = json.loads(
-                    response.text)
-
-                result_id = result_data.get(
-                    "id",
-                    None)
-
-                if not result_id:
-                    return self.build_response(
-                        status=ERROR,
-                        error="missing result.id",
-                        data="text={} reason={}".format(
-                            response.reason,
-                            response.text))
-
-                self.all_results[str(result_id)] = result_data
-
-                if self.debug:
-                    log.info(("added result={} all_results={} ")
-                             .format(
-                                result_id,
-                                len(self.all_results)))
-
                 return self.build_response(
                     status=SUCCESS,
                     error="",
-                    data=result_data)
+                    data=response)
             else:
                 err_msg = ("failed with "
                            "status_code={} text={} reason={}").format(
                                response.status_code,
                                response.text,
                                response.reason)
+                response.close()
                 if self.verbose:
                     log.error(err_msg)
                 return self.build_response(
                     status=ERROR,
                     error=err_msg)
-                # if able to log back in just retry the call
             # end of handling response status codes
         # end of while not_done
-    # end of get_result_by_id
+    # end of open_record_stream
+
+    def get_result_predictions_iter(
+            self,
+            result_id=None,
+            chunk_size=65536):
+        """get_result_predictions_iter
+
+        Stream a result and return a lazy iterator over its
+        ``predictions_json["predictions"]`` in ``data``. The body
+        is parsed incrementally from the socket so the whole
+        result is never held in memory.
+
+        :param result_id: MLJobResult.id in the database
+        :param chunk_size: bytes to read from the socket at a time
+        """
+
+        if not result_id:
+            log.error("missing result_id for get_result_predictions_iter")
+            return self.build_response(
+                status=ERROR,
+                error="missing result_id for get_result_predictions_iter")
+
+        res = self.open_record_stream(
+            name="result",
+            url="{}{}".format(
+                self.api_urls["results"],
+                result_id),
+            record_id=result_id)
+
+        if res["status"] != SUCCESS:
+            return res
+
+        response = res["data"]
+
+        def iter_predictions():
+            try:
+                for prediction in iter_json_array(
+                        response.iter_content(
+                            chunk_size=chunk_size),
+                        key="predictions"):
+                    yield prediction
+            finally:
+                response.close()
+        # end of iter_predictions
+
+        return self.build_response(
+            status=SUCCESS,
+            error="",
+            data=iter_predictions())
+    # end of get_result_predictions_iter
+
+    def download_result_by_id(
+            self,
+            result_id=None,
+            path=None,
+            chunk_size=65536):
+        """download_result_by_id
+
+        Stream a result's JSON straight to a file on disk
+
+        :param result_id: MLJobResult.id in the database
+        :param path: file to write
+        :param chunk_size: bytes to read from the socket at a time
+        """
+
+        if not result_id or not path:
+            log.error("missing result_id or path for download_result_by_id")
+            return self.build_response(
+                status=ERROR,
+                error="missing result_id or path for download_result_by_id")
+
+        res = self.open_record_stream(
+            name="result",
+            url="{}{}".format(
+                self.api_urls["results"],
+                result_id),
+            record_id=result_id)
+
+        if res["status"] != SUCCESS:
+            return res
+
+        response = res["data"]
+        num_bytes = 0
+        try:
+            with open(path, "wb") as f:
+                for chunk in response.iter_content(
+                        chunk_size=chunk_size):
+                    f.write(chunk)
+                    num_bytes += len(chunk)
+        except Exception as e:
+            err_msg = ("failed writing result.id={} to path={} "
+                       "with ex={}").format(
+                           result_id,
+                           path,
+                           e)
+            log.error(err_msg)
+            return self.build_response(
+                status=ERROR,
+                error=err_msg)
+        finally:
+            response.close()
+
+        if self.verbose:
+            log.info(("downloaded result.id={} bytes={} to path={}")
+                     .format(
+                        result_id,
+                        num_bytes,
+                        path))
+
+        return self.build_response(
+            status=SUCCESS,
+            error="",
+            data={
+                "path": path,
+                "bytes": num_bytes
+            })
+    # end of download_result_by_id
 
     def run_job(
             self,
             body):
         """run_job
 
-        :param body: dictionary to launch job
+        :param body: dictionary to launch job or its JSON
+                     encoded ``bytes`` like from a ``RequestTemplate``
         """
 
+        raw_data, data, content_encoding = self.encode_body(body)
+
         if self.verbose:
             log.info(("user={} starting job={}")
                      .format(
                         self.user,
-                        str(body)[0:32]))
+                        raw_data[0:32].decode("utf-8", "replace")))
 
         url = "{}".format(
                 self.api_urls["job"])
+        start_time = time.time()
 
         not_done = True
         while not_done:
@@ -618,17 +1015,23 @@ class AIClient:
                 log.info((
                     "JOB attempting to post={} to url={} "
                     "verify={} cert={}").format(
-                        json.dumps(body),
+                        raw_data.decode("utf-8"),
                         url,
                         self.use_verify,
                         self.cert))
 
-            response = requests.post(
+            token = self.get_token()
+            headers = self.get_auth_header(
+                token=token)
+            if content_encoding:
+                headers["Content-Encoding"] = content_encoding
+
+            response = self.get_session().post(
                 url,
                 verify=self.use_verify,
                 cert=self.cert,
-                data=json.dumps(body),
-                headers=self.get_auth_header())
+                data=data,
+                headers=headers)
 
             if self.debug:
                 log.info(("JOB response status_code={} text={} reason={}")
@@ -638,7 +1041,8 @@ class AIClient:
                             response.reason))
 
             if response.status_code == 401:
-                login_res = self.retry_login()
+                login_res = self.retry_login(
+                    failed_token=token)
                 if login_res["status"] != SUCCESS:
                     if self.verbose:
                         log.error(
@@ -652,8 +1056,8 @@ class AIClient:
                 if self.verbose:
                     log.debug("deserializing")
 
-                res_dict = json.loads(
-                    response.text)
+                res_dict = loads(
+                    response.content)
 
                 job_data = res_dict.get(
                     "job",
@@ -691,8 +1095,18 @@ class AIClient:
                             response.reason,
                             response.text))
 
-                self.all_jobs[str(job_id)] = job_data
-                self.all_results[str(result_id)] = result_data
+                self.all_jobs.set(
+                    str(job_id),
+                    job_data,
+                    size=len(response.content))
+                self.all_results.set(
+                    str(result_id),
+                    result_data,
+                    size=len(response.content))
+                self.track_job_start(
+                    job_id=job_id,
+                    body=body,
+                    start_time=start_time)
 
                 if self.verbose:
                     log.info(("added job={} result={} "
@@ -723,167 +1137,720 @@ class AIClient:
         # end of while not_done
     # end of run_job
 
-    def wait_for_job_to_finish(
+    def submit_many(
             self,
-            job_id,
-            sec_to_sleep=5.0,
-            max_retries=100000):
-        """wait_for_job_to_finish
+            bodies,
+            max_in_flight=10):
+        """submit_many
+
+        Run ``run_job`` for each request body with up to
+        ``max_in_flight`` posts at once and yield the ``run_job``
+        responses in the same order as ``bodies``
+
+        ``bodies`` is read lazily and only when there is room for
+        another post, so a generator of ``generate_ai_request``
+        bodies never has more than about ``max_in_flight`` bodies
+        in memory. Closing the generator stops submitting.
+
+        :param bodies: iterable of request body dictionaries
+        :param max_in_flight: max number of ``run_job`` posts
+                              running at once
+        """
 
-        :param job_id: MLJob.id to wait on
-        :param sec_to_sleep: seconds to sleep during polling
+        max_in_flight = max(1, max_in_flight)
+        pending = collections.deque()
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_in_flight)
+        try:
+            for body in bodies:
+                pending.append(executor.submit(
+                    self.run_job,
+                    body))
+                if len(pending) >= max_in_flight:
+                    yield pending.popleft().result()
+            # end of submitting all bodies
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+        # end of try/finally to stop submitting
+    # end of submit_many
+
+    def run_job_with_cache(
+            self,
+            body,
+            prediction_cache=None,
+            sec_to_sleep=None,
+            max_retries=100000,
+            poll_policy=None):
+        """run_job_with_cache
+
+        Predict the rows in ``body`` with the ``PredictionCache`` in
+        front of ``run_job`` and ``wait_for_job_to_finish``
+
+        Rows are looked up by the request ``label`` and a hash of
+        each converted row. Only the distinct rows that missed are
+        sent in one job with the request's ``predict_format`` and
+        their predictions are cached once it finishes. ``data``
+        holds the ``predictions`` for every row in the original
+        order, the ``job`` and ``result`` (``None`` when every row
+        was cached), the number of ``cache_hits`` and the
+        ``num_submitted`` distinct rows. A cached prediction is
+        reused as-is so any row position fields in it come from
+        the job that predicted it.
+
+        :param body: request dictionary from ``generate_ai_request``
+                     or its JSON encoded ``bytes``
+        :param prediction_cache: optional ``PredictionCache`` -
+                                 defaults to the client's cache
+        :param sec_to_sleep: optional fixed seconds to sleep during
+                             polling instead of the ``poll_policy``
         :param max_retries: max retires until stopping
+        :param poll_policy: optional ``PollPolicy``
         """
+        use_cache = prediction_cache or self.prediction_cache
+        raw_body = body
+        if not isinstance(raw_body, dict):
+            # orjson only reads exact bytes not an EncodedRequest
+            raw_body = loads(bytes(raw_body))
+        predict_format = raw_body.get(
+            "predict_format",
+            PREDICT_FORMAT_ROWS)
+        use_body = decode_predict_rows(
+            raw_body)
+        label = use_body.get(
+            "label",
+            None)
+        predict_rows = use_body.get(
+            "predict_rows",
+            None) or []
+
+        keys = [
+            build_row_key(
+                label,
+                r)
+            for r in predict_rows
+        ]
+        found = use_cache.get_many(
+            keys)
+        cache_hits = sum(
+            1
+            for key in keys
+            if key in found)
+        miss_keys = []
+        miss_rows = []
+        seen = set()
+        for key, r in zip(keys, predict_rows):
+            if key not in found and key not in seen:
+                seen.add(key)
+                miss_keys.append(key)
+                miss_rows.append(r)
+        # end of finding distinct rows to predict
 
-        not_done = True
-        retry_attempt = 1
-        while not_done:
+        if self.verbose:
+            log.info(("label={} rows={} cache_hits={} submitting={}")
+                     .format(
+                        label,
+                        len(predict_rows),
+                        cache_hits,
+                        len(miss_rows)))
+
+        job_data = None
+        result_data = None
+        if miss_rows:
+            job_body = dict(use_body)
+            set_predict_rows(
+                body=job_body,
+                predict_rows=miss_rows,
+                predict_format=predict_format,
+                columns=raw_body.get(
+                    "predict_columns",
+                    None),
+                default=raw_body.get(
+                    "predict_default",
+                    None))
+            response = self.run_job(
+                job_body)
+            if response["status"] != SUCCESS:
+                return response
+            job_id = response["data"]["job"]["id"]
+            response = self.wait_for_job_to_finish(
+                job_id,
+                sec_to_sleep=sec_to_sleep,
+                max_retries=max_retries,
+                poll_policy=poll_policy)
+            if response["status"] != SUCCESS:
+                return response
+            job_data = response["data"]["job"]
+            result_data = response["data"]["result"]
+            predictions = (result_data.get(
+                "predictions_json",
+                None) or {}).get(
+                    "predictions",
+                    [])
+            if len(predictions) != len(miss_rows):
+                err_msg = ("job.id={} sent rows={} but got "
+                           "predictions={}").format(
+                            job_id,
+                            len(miss_rows),
+                            len(predictions))
+                log.error(err_msg)
+                return self.build_response(
+                    status=ERROR,
+                    error=err_msg,
+                    data=response["data"])
+            new_items = list(zip(
+                miss_keys,
+                predictions))
+            use_cache.set_many(
+                label,
+                new_items)
+            found.update(new_items)
+        # end of predicting the misses
 
-            if self.debug:
-                log.info(("JOBSTATUS getting job.id={} details")
-                         .format(
-                            job_id))
+        return self.build_response(
+            status=SUCCESS,
+            error="",
+            data={
+                "job": job_data,
+                "result": result_data,
+                "predictions": [
+                    found[key]
+                    for key in keys
+                ],
+                "cache_hits": cache_hits,
+                "num_submitted": len(miss_rows)
+            })
+    # end of run_job_with_cache
+
+    def poll_job(
+            self,
+            job_id,
+            include_result=True):
+        """poll_job
+
+        Check a job and its result one time without sleeping
+
+        Returns a ``(is_done, response)`` tuple. When ``is_done`` is
+        ``True`` the response is the final ``build_response`` with
+        the ``job`` and ``result`` dictionaries (or the error).
+        When the job is still running ``is_done`` is ``False``.
+
+        With ``status_probe`` enabled the job and result are
+        polled with ``job_status_fields`` and
+        ``result_status_fields`` and the full records are only
+        downloaded once the result is finished.
+
+        :param job_id: MLJob.id to check
+        :param include_result: download the full result when it is
+                               finished - set to ``False`` to skip it
+                               and stream large predictions with
+                               ``get_result_predictions_iter``
+        """
 
-            response = self.get_job_by_id(job_id)
+        job_fields, result_fields = self.get_poll_fields()
 
-            if self.debug:
-                log.info(("JOBSTATUS got job.id={} response={}")
-                         .format(
-                            job_id,
-                            response))
+        if self.debug:
+            log.info(("JOBSTATUS getting job.id={} details")
+                     .format(
+                        job_id))
 
+        response = self.get_job_by_id(
+            job_id,
+            fields=job_fields)
+
+        if self.debug:
+            log.info(("JOBSTATUS got job.id={} response={}")
+                     .format(
+                        job_id,
+                        response))
+
+        if response["status"] != SUCCESS:
+            log.error(("JOBSTATUS failed to get job.id={} with error={}")
+                      .format(
+                        job_id,
+                        response["error"]))
+            return True, self.build_response(
+                status=ERROR,
+                error=response["error"],
+                data=response["data"])
+        # stop if this failed getting the job details
+
+        job_data = response.get(
+            "data",
+            None)
+
+        if not job_data:
+            return True, self.build_response(
+                status=ERROR,
+                error="failed to find job dictionary in response",
+                data=response["data"])
+
+        job_status = job_data["status"]
+
+        if job_status != "finished" \
+           and job_status != "completed" \
+           and job_status != "launched":
+            return False, self.build_response(
+                status=NOT_SET,
+                error="",
+                data={
+                    "job": job_data,
+                    "result": None
+                })
+        # if the job is still running
+
+        if self.debug:
+            log.info(("job.id={} is done with status={}")
+                     .format(
+                        job_id,
+                        job_status))
+
+        result_id = job_data["predict_manifest"]["result_id"]
+
+        if self.debug:
+            log.info(("JOBRESULT getting result.id={} details")
+                     .format(
+                        result_id))
+
+        response = self.get_result_by_id(
+            result_id,
+            fields=result_fields)
+
+        if self.debug:
+            log.info(("JOBRESULT got result.id={} response={}")
+                     .format(
+                        result_id,
+                        response))
+
+        if response["status"] != SUCCESS:
+            log.error(("JOBRESULT failed to get "
+                       "result.id={} with error={}")
+                      .format(
+                        result_id,
+                        response["error"]))
+            return True, self.build_response(
+                status=ERROR,
+                error=response["error"],
+                data=response["data"])
+        # stop if this failed getting the result details
+
+        result_data = response.get(
+            "data",
+            None)
+
+        if result_data["status"] != "finished":
+            return False, self.build_response(
+                status=NOT_SET,
+                error="",
+                data={
+                    "job": job_data,
+                    "result": result_data
+                })
+        # wait while results are written to the db
+
+        # download the full records once now that both are done
+        if self.is_partial_record(
+                job_data,
+                job_fields):
+            response = self.get_job_by_id(
+                job_id)
             if response["status"] != SUCCESS:
-                log.error(("JOBSTATUS failed to get job.id={} with error={}")
+                log.error(("JOBRESULT failed to get full "
+                           "job.id={} with error={}")
                           .format(
                             job_id,
                             response["error"]))
-                return self.build_response(
+                return True, self.build_response(
                     status=ERROR,
                     error=response["error"],
                     data=response["data"])
-            # stop if this failed getting the job details
-
-            job_data = response.get(
-                "data",
-                None)
+            job_data = response["data"]
+        # if the job was only probed
 
-            if not job_data:
-                return self.build_response(
+        if include_result and self.is_partial_record(
+                result_data,
+                result_fields):
+            response = self.get_result_by_id(
+                result_id)
+            if response["status"] != SUCCESS:
+                log.error(("JOBRESULT failed to get full "
+                           "result.id={} with error={}")
+                          .format(
+                            result_id,
+                            response["error"]))
+                return True, self.build_response(
                     status=ERROR,
-                    error="failed to find job dictionary in response",
+                    error=response["error"],
                     data=response["data"])
+            result_data = response["data"]
+        # if the result was only probed
 
-            job_status = job_data["status"]
+        full_response = {
+            "job": job_data,
+            "result": result_data
+        }
 
-            if job_status == "finished" \
-               or job_status == "completed" \
-               or job_status == "launched":
+        self.track_job_finished(
+            job_id=job_id)
 
-                if self.debug:
-                    log.info(("job.id={} is done with status={}")
-                             .format(
-                                job_id,
-                                job_status))
+        return True, self.build_response(
+            status=SUCCESS,
+            error="",
+            data=full_response)
+    # end of poll_job
 
-                result_id = job_data["predict_manifest"]["result_id"]
+    def wait_for_job_to_finish(
+            self,
+            job_id,
+            sec_to_sleep=None,
+            max_retries=100000,
+            poll_policy=None,
+            include_result=True):
+        """wait_for_job_to_finish
 
-                if self.debug:
-                    log.info(("JOBRESULT getting result.id={} details")
-                             .format(
-                                result_id))
+        :param job_id: MLJob.id to wait on
+        :param sec_to_sleep: optional fixed seconds to sleep during
+                             polling instead of the ``poll_policy``
+        :param max_retries: max retires until stopping
+        :param poll_policy: optional ``PollPolicy`` - defaults to
+                            the client's ``poll_policy``
+        :param include_result: download the full result once it is
+                               finished
+        """
 
-                response = self.get_result_by_id(result_id)
+        use_policy = build_poll_policy(
+            sec_to_sleep=sec_to_sleep,
+            poll_policy=poll_policy,
+            default_policy=self.poll_policy)
 
-                if self.debug:
-                    log.info(("JOBRESULT got result.id={} response={}")
-                             .format(
-                                result_id,
-                                response))
+        first_delay = self.get_first_poll_delay(
+            job_id=job_id)
+        if first_delay > 0.0:
+            if self.debug:
+                log.info(("job.id={} first poll in {:.2f}s")
+                         .format(
+                            job_id,
+                            first_delay))
+            time.sleep(first_delay)
 
-                if response["status"] != SUCCESS:
-                    log.error(("JOBRESULT failed to get "
-                               "result.id={} with error={}")
-                              .format(
-                                result_id,
-                                response["error"]))
-                    return self.build_response(
-                        status=ERROR,
-                        error=response["error"],
-                        data=response["data"])
-                # stop if this failed getting the result details
+        not_done = True
+        retry_attempt = 1
+        while not_done:
 
-                result_data = response.get(
-                    "data",
-                    None)
+            is_done, response = self.poll_job(
+                job_id,
+                include_result=include_result)
 
-                if result_data["status"] == "finished":
-                    full_response = {
-                        "job": job_data,
-                        "result": result_data
-                    }
-                    not_done = False
-                    return self.build_response(
-                        status=SUCCESS,
-                        error="",
-                        data=full_response)
+            if is_done:
+                not_done = False
+                return response
+
+            retry_attempt += 1
+            if retry_attempt > max_retries:
+                result_data = response["data"]["result"]
+                if result_data:
+                    err_msg = ("failed waiting "
+                               "for job.id={} result.id={} "
+                               "to finish").format(
+                                job_id,
+                                result_data["id"])
                 else:
+                    err_msg = ("failed waiting "
+                               "for job.id={} to finish").format(
+                                   job_id)
+                log.error(err_msg)
+                return self.build_response(
+                    status=ERROR,
+                    error=err_msg)
+            else:
+                if self.verbose:
                     if retry_attempt % 100 == 0:
-                        if self.verbose:
-                            log.info(("result_id={} are not done retry={}")
-                                     .format(
-                                        result_id,
-                                        retry_attempt))
+                        log.info(("waiting on job.id={} retry={}")
+                                 .format(
+                                    job_id,
+                                    retry_attempt))
+                # if logging just to show this is running
+                time.sleep(
+                    use_policy.get_sleep(retry_attempt - 1))
+        # end of while waiting for the job to finish
+    # end of wait_for_job_to_finish
 
-                    retry_attempt += 1
-                    if retry_attempt > max_retries:
+    def iter_jobs_to_finish(
+            self,
+            job_ids,
+            sec_to_sleep=None,
+            max_retries=100000,
+            max_concurrent=10,
+            poll_policy=None,
+            include_result=True):
+        """iter_jobs_to_finish
+
+        Poll many jobs from one scheduler and yield a
+        ``(job_id, response)`` tuple as soon as each job is done.
+        Each ``response`` is the same dictionary
+        ``wait_for_job_to_finish`` returns for that job.
+
+        At most ``max_concurrent`` polls are in flight at once and
+        each job is polled again after the ``poll_policy`` sleep
+        once its last poll returned. Closing the generator stops polling.
+
+        :param job_ids: list of MLJob.id values to wait on
+        :param sec_to_sleep: optional fixed seconds to sleep between
+                             polls of a job instead of the ``poll_policy``
+        :param max_retries: max polls per job until stopping
+        :param max_concurrent: max number of polls in flight
+        :param poll_policy: optional ``PollPolicy`` - defaults to
+                            the client's ``poll_policy``
+        :param include_result: download the full result once it is
+                               finished
+        """
+
+        use_job_ids = []
+        for job_id in job_ids:
+            if job_id not in use_job_ids:
+                use_job_ids.append(job_id)
+
+        if len(use_job_ids) == 0:
+            return
+
+        use_policy = build_poll_policy(
+            sec_to_sleep=sec_to_sleep,
+            poll_policy=poll_policy,
+            default_policy=self.poll_policy)
+
+        # min-heap of (next poll time, order, job_id)
+        now = time.time()
+        schedule = [
+            (now + self.get_first_poll_delay(job_id), idx, job_id)
+            for idx, job_id in enumerate(use_job_ids)
+        ]
+        heapq.heapify(schedule)
+        attempts = {}
+        in_flight = {}
+        max_concurrent = max(1, max_concurrent)
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_concurrent)
+        try:
+            while schedule or in_flight:
+                now = time.time()
+                while schedule \
+                        and len(in_flight) < max_concurrent \
+                        and schedule[0][0] <= now:
+                    next_poll, order, job_id = heapq.heappop(schedule)
+                    future = executor.submit(
+                        self.poll_job,
+                        job_id,
+                        include_result)
+                    in_flight[future] = (order, job_id)
+                # end of launching all due polls
+
+                wait_for = None
+                if schedule and len(in_flight) < max_concurrent:
+                    wait_for = max(0.0, schedule[0][0] - time.time())
+
+                if not in_flight:
+                    time.sleep(wait_for)
+                    continue
+
+                done, not_done = concurrent.futures.wait(
+                    list(in_flight),
+                    timeout=wait_for,
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+
+                for future in done:
+                    order, job_id = in_flight.pop(future)
+                    is_done, response = future.result()
+                    attempts[job_id] = attempts.get(job_id, 1) + 1
+                    if is_done:
+                        yield job_id, response
+                    elif attempts[job_id] > max_retries:
                         err_msg = ("failed waiting "
-                                   "for job.id={} result.id={} "
-                                   "to finish").format(
-                                    job_id,
-                                    result_id)
+                                   "for job.id={} to finish").format(
+                                       job_id)
                         log.error(err_msg)
-                        return self.build_response(
+                        yield job_id, self.build_response(
                             status=ERROR,
                             error=err_msg)
                     else:
-                        time.sleep(sec_to_sleep)
-                    # wait while results are written to the db
-            else:
+                        heapq.heappush(
+                            schedule,
+                            (time.time() + use_policy.get_sleep(
+                                attempts[job_id] - 1),
+                             order,
+                             job_id))
+                # end of handling finished polls
+            # end of while jobs are still pending
+        finally:
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=False)
+        # end of try/finally to stop polling
+    # end of iter_jobs_to_finish
+
+    def wait_for_jobs_to_finish(
+            self,
+            job_ids,
+            num_to_finish=None,
+            callback=None,
+            sec_to_sleep=None,
+            max_retries=100000,
+            max_concurrent=10,
+            poll_policy=None,
+            include_result=True):
+        """wait_for_jobs_to_finish
+
+        Wait on many jobs at once so the total wait is the slowest
+        job instead of the sum of all jobs. Returns a response with
+        ``data`` holding:
+
+        - ``jobs`` - dictionary of job id to its finished response
+        - ``finished`` - job ids in the order they finished
+        - ``pending`` - job ids that were not waited on
+
+        :param job_ids: list of MLJob.id values to wait on
+        :param num_to_finish: stop after this many jobs are done -
+                              ``None`` waits for all of them
+        :param callback: optional ``callback(job_id, response)``
+                         called as each job is done
+        :param sec_to_sleep: optional fixed seconds to sleep between
+                             polls of a job instead of the ``poll_policy``
+        :param max_retries: max polls per job until stopping
+        :param max_concurrent: max number of polls in flight
+        :param poll_policy: optional ``PollPolicy`` - defaults to
+                            the client's ``poll_policy``
+        :param include_result: download the full result once it is
+                               finished
+        """
 
-                retry_attempt += 1
-                if retry_attempt > max_retries:
-                    err_msg = ("failed waiting "
-                               "for job.id={} to finish").format(
-                                   job_id)
-                    log.error(err_msg)
-                    return self.build_response(
-                        status=ERROR,
-                        error=err_msg)
-                else:
-                    if self.verbose:
-                        if retry_attempt % 100 == 0:
-                            log.info(("waiting on job.id={} retry={}")
-                                     .format(
-                                        job_id,
-                                        retry_attempt))
-                    # if logging just to show this is running
-                    time.sleep(sec_to_sleep)
-        # end of while waiting for the job to finish
-    # end of wait_for_job_to_finish
+        use_job_ids = []
+        for job_id in job_ids:
+            if job_id not in use_job_ids:
+                use_job_ids.append(job_id)
+
+        if num_to_finish is None:
+            num_to_finish = len(use_job_ids)
+
+        jobs = {}
+        finished = []
+        failed = []
+        waiter = self.iter_jobs_to_finish(
+            job_ids=use_job_ids,
+            sec_to_sleep=sec_to_sleep,
+            max_retries=max_retries,
+            max_concurrent=max_concurrent,
+            poll_policy=poll_policy,
+            include_result=include_result)
+        try:
+            for job_id, response in waiter:
+                jobs[job_id] = response
+                finished.append(job_id)
+                if response["status"] != SUCCESS:
+                    failed.append(job_id)
+                if callback:
+                    callback(job_id, response)
+                if len(finished) >= num_to_finish:
+                    break
+            # end of for all finished jobs
+        finally:
+            waiter.close()
+
+        pending = [
+            job_id
+            for job_id in use_job_ids
+            if job_id not in jobs
+        ]
+
+        res_data = {
+            "jobs": jobs,
+            "finished": finished,
+            "pending": pending
+        }
+
+        if len(failed) > 0:
+            return self.build_response(
+                status=ERROR,
+                error="failed waiting for job.ids={}".format(
+                    failed),
+                data=res_data)
+
+        return self.build_response(
+            status=SUCCESS,
+            error="",
+            data=res_data)
+    # end of wait_for_jobs_to_finish
+
+    def wait_all(
+            self,
+            job_ids,
+            **kwargs):
+        """wait_all
+
+        Wait until every job is done
+
+        :param job_ids: list of MLJob.id values to wait on
+        :param kwargs: arguments for ``wait_for_jobs_to_finish``
+        """
+        return self.wait_for_jobs_to_finish(
+            job_ids=job_ids,
+            num_to_finish=None,
+            **kwargs)
+    # end of wait_all
+
+    def wait_any(
+            self,
+            job_ids,
+            **kwargs):
+        """wait_any
+
+        Wait until the first job is done
+
+        :param job_ids: list of MLJob.id values to wait on
+        :param kwargs: arguments for ``wait_for_jobs_to_finish``
+        """
+        return self.wait_for_jobs_to_finish(
+            job_ids=job_ids,
+            num_to_finish=1,
+            **kwargs)
+    # end of wait_any
+
+    def wait_first_n(
+            self,
+            job_ids,
+            num_to_finish,
+            **kwargs):
+        """wait_first_n
+
+        Wait until the first ``num_to_finish`` jobs are done
+
+        :param job_ids: list of MLJob.id values to wait on
+        :param num_to_finish: number of jobs to wait on
+        :param kwargs: arguments for ``wait_for_jobs_to_finish``
+        """
+        return self.wait_for_jobs_to_finish(
+            job_ids=job_ids,
+            num_to_finish=num_to_finish,
+            **kwargs)
+    # end of wait_first_n
 
     def run_prepare(
             self,
             body):
         """run_prepare
 
-        :param body: dictionary to launch prepare
+        :param body: dictionary to launch prepare or its JSON
+                     encoded ``bytes`` like from a ``RequestTemplate``
         """
 
+        raw_data, data, content_encoding = self.encode_body(body)
+
         if self.verbose:
             log.info(("user={} starting prepare={}")
                      .format(
                         self.user,
-                        str(body)[0:32]))
+                        raw_data[0:32].decode("utf-8", "replace")))
 
         url = "{}".format(
                 self.api_urls["prepare"])
@@ -895,17 +1862,23 @@ class AIClient:
                 log.info((
                     "JOB attempting to post={} to url={} "
                     "verify={} cert={}").format(
-                        json.dumps(body),
+                        raw_data.decode("utf-8"),
                         url,
                         self.use_verify,
                         self.cert))
 
-            response = requests.post(
+            token = self.get_token()
+            headers = self.get_auth_header(
+                token=token)
+            if content_encoding:
+                headers["Content-Encoding"] = content_encoding
+
+            response = self.get_session().post(
                 url,
                 verify=self.use_verify,
                 cert=self.cert,
-                data=json.dumps(body),
-                headers=self.get_auth_header())
+                data=data,
+                headers=headers)
 
             if self.debug:
                 log.info(("JOB response status_code={} text={} reason={}")
@@ -915,7 +1888,8 @@ class AIClient:
                             response.reason))
 
             if response.status_code == 401:
-                login_res = self.retry_login()
+                login_res = self.retry_login(
+                    failed_token=token)
                 if login_res["status"] != SUCCESS:
                     if self.verbose:
                         log.error(
@@ -931,8 +1905,8 @@ class AIClient:
                              .format(
                                 response.text))
 
-                prepare_data = json.loads(
-                    response.text)
+                prepare_data = loads(
+                    response.content)
 
                 if not prepare_data:
                     return self.build_response(
@@ -954,7 +1928,10 @@ class AIClient:
                             response.reason,
                             response.text))
 
-                self.all_prepares[str(prepare_id)] = prepare_data
+                self.all_prepares.set(
+                    str(prepare_id),
+                    prepare_data,
+                    size=len(response.content))
 
                 if self.verbose:
                     log.info(("added prepare={} all_prepares={}")
@@ -985,15 +1962,24 @@ class AIClient:
     def wait_for_prepare_to_finish(
             self,
             prepare_id,
-            sec_to_sleep=5.0,
-            max_retries=100000):
+            sec_to_sleep=None,
+            max_retries=100000,
+            poll_policy=None):
         """wait_for_prepare_to_finish
 
         :param prepare_id: MLPrepare.id to wait on
-        :param sec_to_sleep: seconds to sleep during polling
+        :param sec_to_sleep: optional fixed seconds to sleep during
+                             polling instead of the ``poll_policy``
         :param max_retries: max retires until stopping
+        :param poll_policy: optional ``PollPolicy`` - defaults to
+                            the client's ``poll_policy``
         """
 
+        use_policy = build_poll_policy(
+            sec_to_sleep=sec_to_sleep,
+            poll_policy=poll_policy,
+            default_policy=self.poll_policy)
+
         not_done = True
         retry_attempt = 1
         while not_done:
@@ -1062,7 +2048,8 @@ class AIClient:
                                         prepare_id,
                                         retry_attempt))
                     # if logging just to show this is running
-                    time.sleep(sec_to_sleep)
+                    time.sleep(
+                        use_policy.get_sleep(retry_attempt - 1))
         # end of while waiting for the prepare to finish
     # end of wait_for_prepare_to_finish
 
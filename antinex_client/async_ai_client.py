@@ -0,0 +1,1552 @@
+import os
+import ssl
+import time
+import asyncio
+import importlib
+import collections
+from spylunking.log.setup_logging import console_logger
+from antinex_client.utils import ev
+from antinex_client.base_ai_client import BaseAIClient
+from antinex_client.base_ai_client import log_level
+from antinex_client.consts import LOGIN_SUCCESS
+from antinex_client.consts import LOGIN_FAILED
+from antinex_client.consts import SUCCESS
+from antinex_client.consts import FAILED
+from antinex_client.consts import ERROR
+from antinex_client.consts import NOT_SET
+from antinex_client.consts import ANTINEX_CACHE_MAX_ENTRIES
+from antinex_client.consts import ANTINEX_CACHE_MAX_BYTES
+from antinex_client.consts import ANTINEX_CACHE_TTL
+from antinex_client.consts import ANTINEX_CACHE_EVICTION
+from antinex_client.consts import ANTINEX_CACHE_SUMMARIES_ONLY
+from antinex_client.consts import ANTINEX_ETA_FILE
+from antinex_client.consts import ANTINEX_TOKEN_CACHE_FILE
+from antinex_client.json_codec import dumps
+from antinex_client.json_codec import loads
+from antinex_client.poll_policy import build_poll_policy
+
+
+log = console_logger(
+    name='async_ai_client',
+    log_level=log_level)
+
+
+def import_aiohttp():
+    """import_aiohttp
+
+    Import ``aiohttp`` on first use so the rest of the package
+    works without it - install it with:
+    ``pip install antinex-client[async]``
+    """
+    try:
+        return importlib.import_module("aiohttp")
+    except ImportError:
+        raise ImportError(
+            "AsyncAIClient requires aiohttp - install it with: "
+            "pip install antinex-client[async]")
+# end of import_aiohttp
+
+
+class SubmitManyIterator:
+
+    """
+
+    Async iterator from ``AsyncAIClient.submit_many`` that yields
+    the ``run_job`` responses in the same order as the bodies
+
+    It keeps at most ``max_in_flight`` ``run_job`` tasks running
+    and only reads the next body once a response has been
+    yielded, so results can be consumed while the rest of the
+    batch is still posting. This is a class instead of an async
+    generator so it also works on Python 3.5.
+
+    """
+
+    def __init__(
+            self,
+            client,
+            bodies,
+            max_in_flight=10):
+        """__init__
+
+        :param client: ``AsyncAIClient`` to post with
+        :param bodies: iterable of request body dictionaries
+        :param max_in_flight: max number of ``run_job`` posts
+                              running at once
+        """
+        self.client = client
+        self.bodies = iter(bodies)
+        self.max_in_flight = max(1, max_in_flight)
+        self.pending = collections.deque()
+        self.done_reading = False
+    # end of __init__
+
+    def __aiter__(
+            self):
+        """__aiter__"""
+        return self
+    # end of __aiter__
+
+    async def __anext__(
+            self):
+        """__anext__
+
+        Fill the free ``run_job`` slots then wait for the oldest
+        post to finish
+        """
+        while (not self.done_reading and
+               len(self.pending) < self.max_in_flight):
+            try:
+                body = next(self.bodies)
+            except StopIteration:
+                self.done_reading = True
+                break
+            self.pending.append(asyncio.ensure_future(
+                self.client.run_job(body)))
+        # end of filling the free slots
+
+        if not self.pending:
+            raise StopAsyncIteration
+
+        try:
+            response = await self.pending[0]
+        except BaseException:
+            await self.aclose()
+            raise
+        self.pending.popleft()
+        return response
+    # end of __anext__
+
+    async def aclose(
+            self):
+        """aclose
+
+        Stop submitting and cancel the posts that are still running
+        """
+        self.done_reading = True
+        for task in self.pending:
+            task.cancel()
+        self.pending.clear()
+    # end of aclose
+
+# end of SubmitManyIterator
+
+
+class AsyncAIClient(BaseAIClient):
+
+    """
+
+    AntiNex Python asyncio AI Client
+
+    Same API surface as ``AIClient`` but every network call
+    and every polling wait is awaitable, so one event loop can
+    track thousands of jobs without blocking a thread per job.
+
+    All methods return the same ``build_response`` dictionary
+    with ``status``, ``error`` and ``data`` keys.
+
+    """
+
+    def __init__(
+            self,
+            user=ev(
+                "API_USER",
+                "user-not-set"),
+            password=ev(
+                "API_PASSWORD",
+                "password-not-set"),
+            url=ev(
+                "API_URL",
+                "http://localhost:8010"),
+            email=ev(
+                "API_EMAIL",
+                "email-not-set"),
+            verbose=True,
+            ca_dir=None,
+            cert_file=None,
+            key_file=None,
+            debug=False,
+            pool_connections=None,
+            pool_maxsize=None,
+            keep_alive=True,
+            poll_policy=None,
+            estimator=None,
+            eta_file=ANTINEX_ETA_FILE,
+            status_probe=True,
+            conditional_get=True,
+            cache_max_entries=ANTINEX_CACHE_MAX_ENTRIES,
+            cache_max_bytes=ANTINEX_CACHE_MAX_BYTES,
+            cache_ttl=ANTINEX_CACHE_TTL,
+            cache_eviction=ANTINEX_CACHE_EVICTION,
+            cache_summaries_only=ANTINEX_CACHE_SUMMARIES_ONLY,
+            compress_requests=bool(ev(
+                "API_COMPRESS_REQUESTS",
+                "0") == "1"),
+            compress_min_bytes=int(ev(
+                "API_COMPRESS_MIN_BYTES",
+                "16384")),
+            compress_encoding=ev(
+                "API_COMPRESS_ENCODING",
+                "gzip"),
+            token_refresh_margin=float(ev(
+                "API_TOKEN_REFRESH_MARGIN",
+                "30")),
+            token_cache=None,
+            token_cache_file=ANTINEX_TOKEN_CACHE_FILE):
+        """__init__
+
+        :param user: username
+        :param email: email address
+        :param password: password for the user
+        :param url: url running the django rest framework
+        :param verbose: turn off setup_logging
+        :param ca_dir: optional path to CA bundle dir
+        :param cert_file: optional path to x509 ssl cert file
+        :param key_file: optional path to x509 ssl private key
+        :param debug: turn on debugging - this will print passwords to stdout
+        :param pool_connections: max number of open connections per
+                                 host - defaults to
+                                 ``API_POOL_CONNECTIONS`` or 10
+        :param pool_maxsize: max number of open connections in total -
+                             defaults to ``API_POOL_MAXSIZE`` or 10
+        :param keep_alive: reuse connections between calls
+        :param poll_policy: optional ``PollPolicy`` for the wait
+                            methods - defaults to backoff with jitter
+        :param estimator: optional ``JobDurationEstimator`` used to
+                          schedule the first poll of a job near its
+                          expected finish
+        :param eta_file: optional JSON file to persist job duration
+                         estimates across runs
+        :param status_probe: poll jobs and results with only their
+                             status fields and download the full
+                             records once when they are finished
+        :param conditional_get: send ``If-None-Match`` and
+                                ``If-Modified-Since`` from the cached
+                                copy and reuse it on a ``304``
+        :param cache_max_entries: max records kept in each of
+                                  ``all_jobs``, ``all_results`` and
+                                  ``all_prepares`` - ``0`` is unbounded
+        :param cache_max_bytes: max estimated bytes kept in each
+                                cache - ``0`` is unbounded
+        :param cache_ttl: seconds to keep a record - ``0`` is forever
+        :param cache_eviction: ``lru`` or ``fifo``
+        :param cache_summaries_only: only keep the scalar fields
+                                     of each record
+        :param compress_requests: compress ``run_job`` and
+                                  ``run_prepare`` bodies - the API
+                                  must accept ``Content-Encoding``
+        :param compress_min_bytes: only compress bodies this large
+        :param compress_encoding: ``gzip`` or ``deflate``
+        :param token_refresh_margin: seconds before the JWT's ``exp``
+                                     to log in again in a background
+                                     task - ``0`` only refreshes
+                                     after a ``401``
+        :param token_cache: optional ``TokenCache`` to reuse tokens
+                            from earlier runs
+        :param token_cache_file: optional file for a ``TokenCache``
+                                 when ``token_cache`` is not set
+        """
+
+        super(AsyncAIClient, self).__init__(
+            user=user,
+            password=password,
+            url=url,
+            email=email,
+            verbose=verbose,
+            ca_dir=ca_dir,
+            cert_file=cert_file,
+            key_file=key_file,
+            debug=debug,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            keep_alive=keep_alive,
+            poll_policy=poll_policy,
+            estimator=estimator,
+            eta_file=eta_file,
+            status_probe=status_probe,
+            conditional_get=conditional_get,
+            cache_max_entries=cache_max_entries,
+            cache_max_bytes=cache_max_bytes,
+            cache_ttl=cache_ttl,
+            cache_eviction=cache_eviction,
+            cache_summaries_only=cache_summaries_only,
+            compress_requests=compress_requests,
+            compress_min_bytes=compress_min_bytes,
+            compress_encoding=compress_encoding,
+            token_refresh_margin=token_refresh_margin,
+            token_cache=token_cache,
+            token_cache_file=token_cache_file)
+
+        # created on first use so it binds to the running loop
+        self.login_lock = None
+        self.refresh_task = None
+        self.use_ssl = self.build_ssl_context()
+        # the aiohttp session must be created inside a running loop
+        self.session = None
+        self.load_cached_token()
+    # end of __init__
+
+    def build_ssl_context(
+            self):
+        """build_ssl_context
+
+        Build the ``ssl`` argument for aiohttp that matches the
+        ``verify`` and ``cert`` arguments used by ``AIClient``
+        """
+
+        if not self.ca_dir and not self.cert_file:
+            return False
+
+        use_ssl = None
+        if self.ca_dir:
+            if os.path.isdir(self.ca_dir):
+                use_ssl = ssl.create_default_context(
+                    capath=self.ca_dir)
+            else:
+                use_ssl = ssl.create_default_context(
+                    cafile=self.ca_dir)
+        else:
+            use_ssl = ssl.create_default_context(
+                cafile=self.cert_file)
+
+        if self.cert_file and self.key_file:
+            use_ssl.load_cert_chain(
+                self.cert_file,
+                self.key_file)
+
+        return use_ssl
+    # end of build_ssl_context
+
+    def get_session(
+            self):
+        """get_session
+
+        Get the pooled ``aiohttp.ClientSession`` and build it on
+        first use from inside the running event loop
+        """
+        if not self.session or self.session.closed:
+            aiohttp = import_aiohttp()
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_maxsize,
+                limit_per_host=self.pool_connections,
+                force_close=not self.keep_alive,
+                ssl=self.use_ssl)
+            self.session = aiohttp.ClientSession(
+                connector=connector)
+        return self.session
+    # end of get_session
+
+    async def close(
+            self):
+        """close
+
+        Close the pooled session and release all open connections
+        """
+        if self.refresh_task and not self.refresh_task.done():
+            self.refresh_task.cancel()
+        self.refresh_task = None
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+    # end of close
+
+    async def __aenter__(
+            self):
+        """__aenter__"""
+        return self
+    # end of __aenter__
+
+    async def __aexit__(
+            self,
+            exc_type,
+            exc_value,
+            traceback):
+        """__aexit__
+
+        :param exc_type: exception type
+        :param exc_value: exception value
+        :param traceback: exception traceback
+        """
+        await self.close()
+    # end of __aexit__
+
+    def get_login_lock(
+            self):
+        """get_login_lock"""
+        if not self.login_lock:
+            self.login_lock = asyncio.Lock()
+        return self.login_lock
+    # end of get_login_lock
+
+    async def login(
+            self):
+        """login"""
+
+        async with self.get_login_lock():
+            return await self.login_unlocked()
+    # end of login
+
+    async def login_unlocked(
+            self):
+        """login_unlocked - call ``login`` to hold the login lock"""
+
+        auth_url = self.api_urls["login"]
+
+        if self.verbose:
+            log.info(("log in user={} url={} ca_dir={} cert={}")
+                     .format(
+                        self.user,
+                        auth_url,
+                        self.ca_dir,
+                        self.cert_file))
+
+        use_headers = {
+            "Content-type": "application/json"
+        }
+        login_data = {
+            "username": self.user,
+            "password": self.password
+        }
+
+        if self.debug:
+            log.info((
+                "LOGIN with body={} headers={} url={} "
+                "ssl={}").format(
+                    login_data,
+                    use_headers,
+                    auth_url,
+                    self.use_ssl))
+
+        status_code, content, reason, res_headers = await self.send_request(
+            "POST",
+            auth_url,
+            data=dumps(login_data),
+            headers=use_headers)
+
+        if self.debug:
+            log.info(("LOGIN response status_code={} text={} reason={}")
+                     .format(
+                        status_code,
+                        content.decode("utf-8", "replace"),
+                        reason))
+
+        user_token = ""
+        if status_code == 200:
+            user_token = loads(content)["token"]
+
+        if user_token != "":
+            self.set_token(
+                user_token)
+
+            if self.verbose:
+                log.debug("login success")
+        else:
+            log.error(("failed to login user={} to url={} text={}")
+                      .format(
+                        self.user,
+                        auth_url,
+                        content.decode("utf-8", "replace")))
+            self.login_status = LOGIN_FAILED
+        # if the user token exists
+
+        return self.login_status
+    # end of login_unlocked
+
+    async def refresh_token(
+            self,
+            old_token=None):
+        """refresh_token
+
+        :param old_token: token to replace - skipped if another
+                          caller already replaced it
+        """
+        return await self.retry_login(
+            failed_token=old_token or self.token)
+    # end of refresh_token
+
+    async def get_fresh_token(
+            self):
+        """get_fresh_token
+
+        Get the token and start one background refresh when it is
+        close to expiring - waits for the login if it already expired
+        """
+        if self.needs_refresh() and self.user and self.password:
+            if self.token_expires_at <= time.time():
+                await self.refresh_token(
+                    self.token)
+            elif not self.refresh_task or self.refresh_task.done():
+                self.refresh_task = asyncio.ensure_future(
+                    self.refresh_token(
+                        self.token))
+        return self.token
+    # end of get_fresh_token
+
+    async def send_request(
+            self,
+            method,
+            url,
+            data=None,
+            headers=None):
+        """send_request
+
+        Send one request over the pooled session and return a
+        ``(status_code, content, reason, headers)`` tuple once the
+        body has been read - ``content`` is the raw ``bytes`` body
+
+        :param method: HTTP method
+        :param url: url to call
+        :param data: optional request body
+        :param headers: optional request headers
+        """
+
+        async with self.get_session().request(
+                method,
+                url,
+                data=data,
+                headers=headers) as response:
+            content = await response.read()
+            return (
+                response.status,
+                content,
+                response.reason,
+                response.headers)
+    # end of send_request
+
+    async def retry_login(
+            self,
+            failed_token=None):
+        """retry_login
+
+        Log in again after a ``401`` - concurrent tasks wait on
+        one login and reuse its token instead of each logging in
+
+        :param failed_token: token the API rejected - no login is
+                             made if the client already has a
+                             different token
+        """
+
+        if not self.user or not self.password:
+            return self.build_response(
+                status=ERROR,
+                error="please set the user and password")
+
+        async with self.get_login_lock():
+            return await self.retry_login_unlocked(
+                failed_token=failed_token)
+    # end of retry_login
+
+    async def retry_login_unlocked(
+            self,
+            failed_token=None):
+        """retry_login_unlocked - call ``retry_login`` to hold the lock
+
+        :param failed_token: token the API rejected
+        """
+
+        retry = 0
+        not_done = True
+        while not_done:
+            if self.is_logged_in() \
+                    and (retry > 0 or self.token != failed_token):
+                return self.build_response(
+                    status=SUCCESS)
+            else:
+                if self.verbose:
+                    log.debug(("login attempt={} max={}")
+                              .format(
+                                retry,
+                                self.max_retries))
+
+                if await self.login_unlocked() == LOGIN_SUCCESS:
+                    return self.build_response(
+                        status=SUCCESS)
+                else:
+                    await asyncio.sleep(
+                        self.login_retry_wait_time)
+            # if able to login or not
+            retry += 1
+            if retry > self.max_retries:
+                return self.build_response(
+                    status=ERROR,
+                    error="failed logging in user={} retries={}".format(
+                            self.user,
+                            self.max_retries))
+        # if login worked or not
+
+        return self.build_response(
+            status=FAILED,
+            error="user={} not able to login attempts={}".format(
+                self.user,
+                retry))
+    # end of retry_login_unlocked
+
+    async def get_record(
+            self,
+            name,
+            url,
+            record_id,
+            all_records,
+            fields=None):
+        """get_record
+
+        Shared GET handler for the job, result and prepare records
+
+        :param name: record name for logging and errors
+        :param url: url for the record
+        :param record_id: record id in the database
+        :param all_records: dictionary to store the record in
+        :param fields: optional list of fields requested in ``url`` -
+                       projected records are not stored
+        """
+
+        not_done = True
+        while not_done:
+
+            token = await self.get_fresh_token()
+            headers = self.get_auth_header(
+                token=token)
+            # send validators from the last response if there are any
+            cached_entry = self.get_cached_entry(
+                record_id=record_id,
+                url=url,
+                all_records=all_records,
+                headers=headers,
+                fields=fields)
+
+            if self.debug:
+                log.info((
+                    "{} attempting to get={} to url={} "
+                    "ssl={}").format(
+                        name.upper(),
+                        record_id,
+                        url,
+                        self.use_ssl))
+
+            status_code, content, reason, res_headers = await self.send_request(
+                "GET",
+                url,
+                headers=headers)
+
+            if self.debug:
+                log.info(("{} response status_code={} text={} reason={}")
+                         .format(
+                            name.upper(),
+                            status_code,
+                            content.decode("utf-8", "replace"),
+                            reason))
+
+            if status_code == 401:
+                login_res = await self.retry_login(
+                    failed_token=token)
+                if login_res["status"] != SUCCESS:
+                    if self.verbose:
+                        log.error(
+                            "retry login attempts failed")
+                    return self.build_response(
+                        status=login_res["status"],
+                        error=login_res["error"])
+                # if able to log back in just retry the call
+            elif status_code == 304 and cached_entry:
+
+                if self.debug:
+                    log.info(("{}={} not modified using cached copy")
+                             .format(
+                                name,
+                                record_id))
+
+                self.touch_record(
+                    record_id=record_id,
+                    url=url,
+                    all_records=all_records,
+                    fields=fields)
+                return self.build_response(
+                    status=SUCCESS,
+                    error="",
+                    data=cached_entry[0])
+            elif status_code == 200:
+
+                if self.verbose:
+                    log.debug("deserializing")
+
+                record_data = loads(
+                    content)
+
+                found_id = record_data.get(
+                    "id",
+                    None)
+
+                if not found_id:
+                    return self.build_response(
+                        status=ERROR,
+                        error="missing {}.id".format(
+                            name),
+                        data="text={} reason={}".format(
+                            reason,
+                            content.decode("utf-8", "replace")))
+
+                self.store_record(
+                    name=name,
+                    record_data=record_data,
+                    url=url,
+                    all_records=all_records,
+                    response_headers=res_headers,
+                    size=len(content),
+                    fields=fields)
+
+                return self.build_response(
+                    status=SUCCESS,
+                    error="",
+                    data=record_data)
+            else:
+                err_msg = ("failed with "
+                           "status_code={} text={} reason={}").format(
+                               status_code,
+                               content.decode("utf-8", "replace"),
+                               reason)
+                if self.verbose:
+                    log.error(err_msg)
+                return self.build_response(
+                    status=ERROR,
+                    error=err_msg)
+            # end of handling response status codes
+        # end of while not_done
+    # end of get_record
+
+    async def get_prepare_by_id(
+            self,
+            prepare_id=None,
+            fields=None):
+        """get_prepare_by_id
+
+        :param prepare_id: MLPrepare.id in the database
+        :param fields: optional list of fields to fetch instead
+                       of the whole record
+        """
+
+        if not prepare_id:
+            log.error("missing prepare_id for get_prepare_by_id")
+            return self.build_response(
+                status=ERROR,
+                error="missing prepare_id for get_prepare_by_id")
+
+        return await self.get_record(
+            name="prepare",
+            url=self.build_record_url(
+                self.api_urls["prepare"],
+                prepare_id,
+                fields=fields),
+            record_id=prepare_id,
+            all_records=self.all_prepares,
+            fields=fields)
+    # end of get_prepare_by_id
+
+    async def get_job_by_id(
+            self,
+            job_id=None,
+            fields=None):
+        """get_job_by_id
+
+        :param job_id: MLJob.id in the database
+        :param fields: optional list of fields to fetch instead
+                       of the whole record
+        """
+
+        if not job_id:
+            log.error("missing job_id for get_job_by_id")
+            return self.build_response(
+                status=ERROR,
+                error="missing job_id for get_job_by_id")
+
+        return await self.get_record(
+            name="job",
+            url=self.build_record_url(
+                self.api_urls["job"],
+                job_id,
+                fields=fields),
+            record_id=job_id,
+            all_records=self.all_jobs,
+            fields=fields)
+    # end of get_job_by_id
+
+    async def get_result_by_id(
+            self,
+            result_id=None,
+            fields=None):
+        """get_result_by_id
+
+        :param result_id: MLJobResult.id in the database
+        :param fields: optional list of fields to fetch instead
+                       of the whole record
+        """
+
+        if not result_id:
+            log.error("missing result_id for get_result_by_id")
+            return self.build_response(
+                status=ERROR,
+                error="missing result_id for get_result_by_id")
+
+        return await self.get_record(
+            name="result",
+            url=self.build_record_url(
+                self.api_urls["results"],
+                result_id,
+                fields=fields),
+            record_id=result_id,
+            all_records=self.all_results,
+            fields=fields)
+    # end of get_result_by_id
+
+    async def run_job(
+            self,
+            body):
+        """run_job
+
+        :param body: dictionary to launch job or its JSON
+                     encoded ``bytes`` like from a ``RequestTemplate``
+        """
+
+        raw_data, data, content_encoding = self.encode_body(body)
+
+        if self.verbose:
+            log.info(("user={} starting job={}")
+                     .format(
+                        self.user,
+                        raw_data[0:32].decode("utf-8", "replace")))
+
+        url = "{}".format(
+                self.api_urls["job"])
+        start_time = time.time()
+
+        not_done = True
+        while not_done:
+
+            if self.debug:
+                log.info((
+                    "JOB attempting to post={} to url={} "
+                    "ssl={}").format(
+                        raw_data.decode("utf-8"),
+                        url,
+                        self.use_ssl))
+
+            token = await self.get_fresh_token()
+            headers = self.get_auth_header(
+                token=token)
+            if content_encoding:
+                headers["Content-Encoding"] = content_encoding
+
+            status_code, content, reason, res_headers = await self.send_request(
+                "POST",
+                url,
+                data=data,
+                headers=headers)
+
+            if self.debug:
+                log.info(("JOB response status_code={} text={} reason={}")
+                         .format(
+                            status_code,
+                            content.decode("utf-8", "replace"),
+                            reason))
+
+            if status_code == 401:
+                login_res = await self.retry_login(
+                    failed_token=token)
+                if login_res["status"] != SUCCESS:
+                    if self.verbose:
+                        log.error(
+                            "retry login attempts failed")
+                    return self.build_response(
+                        status=login_res["status"],
+                        error=login_res["error"])
+                # if able to log back in just retry the call
+            elif status_code == 201:
+
+                if self.verbose:
+                    log.debug("deserializing")
+
+                res_dict = loads(
+                    content)
+
+                job_data = res_dict.get(
+                    "job",
+                    None)
+                result_data = res_dict.get(
+                    "results",
+                    None)
+                if not job_data or not result_data:
+                    return self.build_response(
+                        status=ERROR,
+                        error="job failed",
+                        data="text={} reason={}".format(
+                            reason,
+                            content.decode("utf-8", "replace")))
+
+                job_id = job_data.get(
+                    "id",
+                    None)
+                result_id = result_data.get(
+                    "id",
+                    None)
+
+                if not job_id:
+                    return self.build_response(
+                        status=ERROR,
+                        error="missing job.id",
+                        data="text={} reason={}".format(
+                            reason,
+                            content.decode("utf-8", "replace")))
+                if not result_id:
+                    return self.build_response(
+                        status=ERROR,
+                        error="missing result.id",
+                        data="text={} reason={}".format(
+                            reason,
+                            content.decode("utf-8", "replace")))
+
+                self.all_jobs.set(
+                    str(job_id),
+                    job_data,
+                    size=len(content))
+                self.all_results.set(
+                    str(result_id),
+                    result_data,
+                    size=len(content))
+                self.track_job_start(
+                    job_id=job_id,
+                    body=body,
+                    start_time=start_time)
+
+                if self.verbose:
+                    log.info(("added job={} result={} "
+                              "all_jobs={} all_results={}")
+                             .format(
+                                job_id,
+                                result_id,
+                                len(self.all_jobs),
+                                len(self.all_results)))
+
+                return self.build_response(
+                    status=SUCCESS,
+                    error="",
+                    data=res_dict)
+            else:
+                err_msg = ("failed with "
+                           "status_code={} text={} reason={}").format(
+                               status_code,
+                               content.decode("utf-8", "replace"),
+                               reason)
+                if self.verbose:
+                    log.error(err_msg)
+                return self.build_response(
+                    status=ERROR,
+                    error=err_msg)
+            # end of handling response status codes
+        # end of while not_done
+    # end of run_job
+
+    def submit_many(
+            self,
+            bodies,
+            max_in_flight=10):
+        """submit_many
+
+        Run ``run_job`` for each request body with up to
+        ``max_in_flight`` posts at once and return an async
+        iterator over the ``run_job`` responses in the same order
+        as ``bodies``::
+
+            async for res in client.submit_many(bodies):
+                print(res["status"])
+
+        ``bodies`` is read lazily and only when there is room for
+        another post, so a generator of ``generate_ai_request``
+        bodies never has more than about ``max_in_flight`` bodies
+        in memory. Call ``aclose()`` on the iterator to stop
+        submitting early.
+
+        :param bodies: iterable of request body dictionaries
+        :param max_in_flight: max number of ``run_job`` posts
+                              running at once
+        """
+
+        return SubmitManyIterator(
+            client=self,
+            bodies=bodies,
+            max_in_flight=max_in_flight)
+    # end of submit_many
+
+    async def poll_job(
+            self,
+            job_id,
+            include_result=True):
+        """poll_job
+
+        Check a job and its result one time without sleeping
+
+        Returns a ``(is_done, response)`` tuple like
+        ``AIClient.poll_job`` including the ``status_probe``
+        polling
+
+        :param job_id: MLJob.id to check
+        :param include_result: download the full result when it is
+                               finished
+        """
+
+        job_fields, result_fields = self.get_poll_fields()
+
+        response = await self.get_job_by_id(
+            job_id,
+            fields=job_fields)
+
+        if response["status"] != SUCCESS:
+            log.error(("JOBSTATUS failed to get job.id={} with error={}")
+                      .format(
+                        job_id,
+                        response["error"]))
+            return True, self.build_response(
+                status=ERROR,
+                error=response["error"],
+                data=response["data"])
+        # stop if this failed getting the job details
+
+        job_data = response.get(
+            "data",
+            None)
+
+        if not job_data:
+            return True, self.build_response(
+                status=ERROR,
+                error="failed to find job dictionary in response",
+                data=response["data"])
+
+        job_status = job_data["status"]
+
+        if job_status != "finished" \
+           and job_status != "completed" \
+           and job_status != "launched":
+            return False, self.build_response(
+                status=NOT_SET,
+                error="",
+                data={
+                    "job": job_data,
+                    "result": None
+                })
+        # if the job is still running
+
+        result_id = job_data["predict_manifest"]["result_id"]
+
+        response = await self.get_result_by_id(
+            result_id,
+            fields=result_fields)
+
+        if response["status"] != SUCCESS:
+            log.error(("JOBRESULT failed to get "
+                       "result.id={} with error={}")
+                      .format(
+                        result_id,
+                        response["error"]))
+            return True, self.build_response(
+                status=ERROR,
+                error=response["error"],
+                data=response["data"])
+        # stop if this failed getting the result details
+
+        result_data = response.get(
+            "data",
+            None)
+
+        if result_data["status"] != "finished":
+            return False, self.build_response(
+                status=NOT_SET,
+                error="",
+                data={
+                    "job": job_data,
+                    "result": result_data
+                })
+        # wait while results are written to the db
+
+        # download the full records once now that both are done
+        if self.is_partial_record(
+                job_data,
+                job_fields):
+            response = await self.get_job_by_id(
+                job_id)
+            if response["status"] != SUCCESS:
+                log.error(("JOBRESULT failed to get full "
+                           "job.id={} with error={}")
+                          .format(
+                            job_id,
+                            response["error"]))
+                return True, self.build_response(
+                    status=ERROR,
+                    error=response["error"],
+                    data=response["data"])
+            job_data = response["data"]
+        # if the job was only probed
+
+        if include_result and self.is_partial_record(
+                result_data,
+                result_fields):
+            response = await self.get_result_by_id(
+                result_id)
+            if response["status"] != SUCCESS:
+                log.error(("JOBRESULT failed to get full "
+                           "result.id={} with error={}")
+                          .format(
+                            result_id,
+                            response["error"]))
+                return True, self.build_response(
+                    status=ERROR,
+                    error=response["error"],
+                    data=response["data"])
+            result_data = response["data"]
+        # if the result was only probed
+
+        full_response = {
+            "job": job_data,
+            "result": result_data
+        }
+
+        self.track_job_finished(
+            job_id=job_id)
+
+        return True, self.build_response(
+            status=SUCCESS,
+            error="",
+            data=full_response)
+    # end of poll_job
+
+    async def wait_for_job_to_finish(
+            self,
+            job_id,
+            sec_to_sleep=None,
+            max_retries=100000,
+            poll_policy=None,
+            semaphore=None,
+            include_result=True):
+        """wait_for_job_to_finish
+
+        :param job_id: MLJob.id to wait on
+        :param sec_to_sleep: optional fixed seconds to sleep during
+                             polling instead of the ``poll_policy``
+        :param max_retries: max retires until stopping
+        :param poll_policy: optional ``PollPolicy`` - defaults to
+                            the client's ``poll_policy``
+        :param semaphore: optional ``asyncio.Semaphore`` held
+                          only while a poll is in flight
+        :param include_result: download the full result once it is
+                               finished
+        """
+
+        use_policy = build_poll_policy(
+            sec_to_sleep=sec_to_sleep,
+            poll_policy=poll_policy,
+            default_policy=self.poll_policy)
+
+        first_delay = self.get_first_poll_delay(
+            job_id=job_id)
+        if first_delay > 0.0:
+            if self.debug:
+                log.info(("job.id={} first poll in {:.2f}s")
+                         .format(
+                            job_id,
+                            first_delay))
+            await asyncio.sleep(first_delay)
+
+        not_done = True
+        retry_attempt = 1
+        while not_done:
+
+            if semaphore:
+                async with semaphore:
+                    is_done, response = await self.poll_job(
+                        job_id,
+                        include_result=include_result)
+            else:
+                is_done, response = await self.poll_job(
+                    job_id,
+                    include_result=include_result)
+
+            if is_done:
+                not_done = False
+                return response
+
+            retry_attempt += 1
+            if retry_attempt > max_retries:
+                result_data = response["data"]["result"]
+                if result_data:
+                    err_msg = ("failed waiting "
+                               "for job.id={} result.id={} "
+                               "to finish").format(
+                                job_id,
+                                result_data["id"])
+                else:
+                    err_msg = ("failed waiting "
+                               "for job.id={} to finish").format(
+                                   job_id)
+                log.error(err_msg)
+                return self.build_response(
+                    status=ERROR,
+                    error=err_msg)
+            else:
+                if self.verbose:
+                    if retry_attempt % 100 == 0:
+                        log.info(("waiting on job.id={} retry={}")
+                                 .format(
+                                    job_id,
+                                    retry_attempt))
+                # if logging just to show this is running
+                await asyncio.sleep(
+                    use_policy.get_sleep(retry_attempt - 1))
+        # end of while waiting for the job to finish
+    # end of wait_for_job_to_finish
+
+    async def wait_for_jobs_to_finish(
+            self,
+            job_ids,
+            num_to_finish=None,
+            callback=None,
+            sec_to_sleep=None,
+            max_retries=100000,
+            max_concurrent=10,
+            poll_policy=None,
+            include_result=True):
+        """wait_for_jobs_to_finish
+
+        Wait on many jobs at once on the event loop. Returns the
+        same response as ``AIClient.wait_for_jobs_to_finish``
+        with ``jobs``, ``finished`` and ``pending`` in ``data``.
+
+        :param job_ids: list of MLJob.id values to wait on
+        :param num_to_finish: stop after this many jobs are done -
+                              ``None`` waits for all of them
+        :param callback: optional ``callback(job_id, response)``
+                         called as each job is done
+        :param sec_to_sleep: optional fixed seconds to sleep between
+                             polls of a job instead of the ``poll_policy``
+        :param max_retries: max polls per job until stopping
+        :param max_concurrent: max number of polls in flight
+        :param poll_policy: optional ``PollPolicy`` - defaults to
+                            the client's ``poll_policy``
+        :param include_result: download the full results once they
+                               are finished
+        """
+
+        use_job_ids = []
+        for job_id in job_ids:
+            if job_id not in use_job_ids:
+                use_job_ids.append(job_id)
+
+        if num_to_finish is None:
+            num_to_finish = len(use_job_ids)
+
+        semaphore = asyncio.Semaphore(max(1, max_concurrent))
+
+        async def wait_for_one(job_id):
+            response = await self.wait_for_job_to_finish(
+                job_id=job_id,
+                sec_to_sleep=sec_to_sleep,
+                max_retries=max_retries,
+                poll_policy=poll_policy,
+                semaphore=semaphore,
+                include_result=include_result)
+            return job_id, response
+        # end of wait_for_one
+
+        tasks = [
+            asyncio.ensure_future(wait_for_one(job_id))
+            for job_id in use_job_ids
+        ]
+
+        jobs = {}
+        finished = []
+        failed = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                job_id, response = await next_done
+                jobs[job_id] = response
+                finished.append(job_id)
+                if response["status"] != SUCCESS:
+                    failed.append(job_id)
+                if callback:
+                    callback(job_id, response)
+                if len(finished) >= num_to_finish:
+                    break
+            # end of for all finished jobs
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        pending = [
+            job_id
+            for job_id in use_job_ids
+            if job_id not in jobs
+        ]
+
+        res_data = {
+            "jobs": jobs,
+            "finished": finished,
+            "pending": pending
+        }
+
+        if len(failed) > 0:
+            return self.build_response(
+                status=ERROR,
+                error="failed waiting for job.ids={}".format(
+                    failed),
+                data=res_data)
+
+        return self.build_response(
+            status=SUCCESS,
+            error="",
+            data=res_data)
+    # end of wait_for_jobs_to_finish
+
+    async def wait_all(
+            self,
+            job_ids,
+            **kwargs):
+        """wait_all
+
+        :param job_ids: list of MLJob.id values to wait on
+        :param kwargs: arguments for ``wait_for_jobs_to_finish``
+        """
+        return await self.wait_for_jobs_to_finish(
+            job_ids=job_ids,
+            num_to_finish=None,
+            **kwargs)
+    # end of wait_all
+
+    async def wait_any(
+            self,
+            job_ids,
+            **kwargs):
+        """wait_any
+
+        :param job_ids: list of MLJob.id values to wait on
+        :param kwargs: arguments for ``wait_for_jobs_to_finish``
+        """
+        return await self.wait_for_jobs_to_finish(
+            job_ids=job_ids,
+            num_to_finish=1,
+            **kwargs)
+    # end of wait_any
+
+    async def wait_first_n(
+            self,
+            job_ids,
+            num_to_finish,
+            **kwargs):
+        """wait_first_n
+
+        :param job_ids: list of MLJob.id values to wait on
+        :param num_to_finish: number of jobs to wait on
+        :param kwargs: arguments for ``wait_for_jobs_to_finish``
+        """
+        return await self.wait_for_jobs_to_finish(
+            job_ids=job_ids,
+            num_to_finish=num_to_finish,
+            **kwargs)
+    # end of wait_first_n
+
+    async def run_prepare(
+            self,
+            body):
+        """run_prepare
+
+        :param body: dictionary to launch prepare or its JSON
+                     encoded ``bytes`` like from a ``RequestTemplate``
+        """
+
+        raw_data, data, content_encoding = self.encode_body(body)
+
+        if self.verbose:
+            log.info(("user={} starting prepare={}")
+                     .format(
+                        self.user,
+                        raw_data[0:32].decode("utf-8", "replace")))
+
+        url = "{}".format(
+                self.api_urls["prepare"])
+
+        not_done = True
+        while not_done:
+
+            if self.debug:
+                log.info((
+                    "PREPARE attempting to post={} to url={} "
+                    "ssl={}").format(
+                        raw_data.decode("utf-8"),
+                        url,
+                        self.use_ssl))
+
+            token = await self.get_fresh_token()
+            headers = self.get_auth_header(
+                token=token)
+            if content_encoding:
+                headers["Content-Encoding"] = content_encoding
+
+            status_code, content, reason, res_headers = await self.send_request(
+                "POST",
+                url,
+                data=data,
+                headers=headers)
+
+            if self.debug:
+                log.info(("PREPARE response status_code={} text={} "
+                          "reason={}")
+                         .format(
+                            status_code,
+                            content.decode("utf-8", "replace"),
+                            reason))
+
+            if status_code == 401:
+                login_res = await self.retry_login(
+                    failed_token=token)
+                if login_res["status"] != SUCCESS:
+                    if self.verbose:
+                        log.error(
+                            "retry login attempts failed")
+                    return self.build_response(
+                        status=login_res["status"],
+                        error=login_res["error"])
+                # if able to log back in just retry the call
+            elif status_code == 201:
+
+                prepare_data = loads(
+                    content)
+
+                if not prepare_data:
+                    return self.build_response(
+                        status=ERROR,
+                        error="prepare failed",
+                        data="text={} reason={}".format(
+                            reason,
+                            content.decode("utf-8", "replace")))
+
+                prepare_id = prepare_data.get(
+                    "id",
+                    None)
+
+                if not prepare_id:
+                    return self.build_response(
+                        status=ERROR,
+                        error="missing prepare.id",
+                        data="text={} reason={}".format(
+                            reason,
+                            content.decode("utf-8", "replace")))
+
+                self.all_prepares.set(
+                    str(prepare_id),
+                    prepare_data,
+                    size=len(content))
+
+                if self.verbose:
+                    log.info(("added prepare={} all_prepares={}")
+                             .format(
+                                prepare_id,
+                                len(self.all_prepares)))
+
+                return self.build_response(
+                    status=SUCCESS,
+                    error="",
+                    data=prepare_data)
+            else:
+                err_msg = ("failed with "
+                           "status_code={} text={} reason={}").format(
+                               status_code,
+                               content.decode("utf-8", "replace"),
+                               reason)
+                if self.verbose:
+                    log.error(err_msg)
+                return self.build_response(
+                    status=ERROR,
+                    error=err_msg)
+            # end of handling response status codes
+        # end of while not_done
+    # end of run_prepare
+
+    async def wait_for_prepare_to_finish(
+            self,
+            prepare_id,
+            sec_to_sleep=None,
+            max_retries=100000,
+            poll_policy=None):
+        """wait_for_prepare_to_finish
+
+        :param prepare_id: MLPrepare.id to wait on
+        :param sec_to_sleep: optional fixed seconds to sleep during
+                             polling instead of the ``poll_policy``
+        :param max_retries: max retires until stopping
+        :param poll_policy: optional ``PollPolicy`` - defaults to
+                            the client's ``poll_policy``
+        """
+
+        use_policy = build_poll_policy(
+            sec_to_sleep=sec_to_sleep,
+            poll_policy=poll_policy,
+            default_policy=self.poll_policy)
+
+        not_done = True
+        retry_attempt = 1
+        while not_done:
+
+            response = await self.get_prepare_by_id(prepare_id)
+
+            if response["status"] != SUCCESS:
+                log.error(("PREPSTATUS failed to get prepare.id={} "
+                           "with error={}")
+                          .format(
+                            prepare_id,
+                            response["error"]))
+                return self.build_response(
+                    status=ERROR,
+                    error=response["error"],
+                    data=response["data"])
+            # stop if this failed getting the prepare details
+
+            prepare_data = response.get(
+                "data",
+                None)
+
+            if not prepare_data:
+                return self.build_response(
+                    status=ERROR,
+                    error="failed to find prepare dictionary in response",
+                    data=response["data"])
+
+            prepare_status = prepare_data["status"]
+
+            if prepare_status == "finished" \
+               or prepare_status == "completed":
+
+                not_done = False
+                return self.build_response(
+                    status=SUCCESS,
+                    error="",
+                    data=prepare_data)
+            else:
+
+                retry_attempt += 1
+                if retry_attempt > max_retries:
+                    err_msg = ("failed waiting "
+                               "for prepare.id={} to finish").format(
+                                   prepare_id)
+                    log.error(err_msg)
+                    return self.build_response(
+                        status=ERROR,
+                        error=err_msg)
+                else:
+                    if self.verbose:
+                        if retry_attempt % 100 == 0:
+                            log.info(("waiting on prepare.id={} retry={}")
+                                     .format(
+                                        prepare_id,
+                                        retry_attempt))
+                    # if logging just to show this is running
+                    await asyncio.sleep(
+                        use_policy.get_sleep(retry_attempt - 1))
+        # end of while waiting for the prepare to finish
+    # end of wait_for_prepare_to_finish
+
+# end of AsyncAIClient
@@ -0,0 +1,716 @@
+import time
+import logging
+import threading
+import collections
+from spylunking.log.setup_logging import console_logger
+from antinex_client.utils import ev
+from antinex_client.utils import get_token_expiry
+from antinex_client.consts import LOGIN_SUCCESS
+from antinex_client.consts import LOGIN_NOT_ATTEMPTED
+from antinex_client.consts import NOT_SET
+from antinex_client.consts import ANTINEX_CACHE_MAX_ENTRIES
+from antinex_client.consts import ANTINEX_CACHE_MAX_BYTES
+from antinex_client.consts import ANTINEX_CACHE_TTL
+from antinex_client.consts import ANTINEX_CACHE_EVICTION
+from antinex_client.consts import ANTINEX_CACHE_SUMMARIES_ONLY
+from antinex_client.poll_policy import PollPolicy
+from antinex_client.record_cache import RecordCache
+from antinex_client.compression import compress_body
+from antinex_client.json_codec import dumps
+from antinex_client.token_cache import TokenCache
+from antinex_client.job_estimator import JobDurationEstimator
+from antinex_client.predict_format import get_num_predict_rows
+
+
+log_level = logging.INFO
+log_level_str = ev(
+    "AI_CLIENT_LEVEL",
+    "info").lower()
+if log_level_str == "info":
+    log_level = logging.INFO
+elif log_level_str == "debug":
+    log_level = logging.DEBUG
+elif log_level_str == "silent":
+    log_level = logging.CRITICAL
+elif log_level_str == "critical":
+    log_level = logging.CRITICAL
+elif log_level_str == "error":
+    log_level = logging.ERROR
+
+log = console_logger(
+    name='base_ai_client',
+    log_level=log_level)
+
+
+def get_pool_setting(
+        value,
+        key,
+        default=10):
+    """get_pool_setting
+
+    Use ``value`` when it is set or read the ``key`` environment
+    variable - a value that is not an integer logs an error and
+    uses ``default``
+
+    :param value: value passed to the client or ``None``
+    :param key: environment variable key
+    :param default: value to use when it is not set or not valid
+    """
+    use_value = value
+    if use_value is None:
+        use_value = ev(
+            key,
+            str(default))
+    try:
+        return int(use_value)
+    except (TypeError, ValueError):
+        log.error(("invalid {}={} using {}")
+                  .format(
+                    key,
+                    use_value,
+                    default))
+        return default
+# end of get_pool_setting
+
+
+class BaseAIClient:
+
+    """
+
+    Shared state and helpers for ``AIClient`` and ``AsyncAIClient``
+
+    Everything here is free of network I/O: request body encoding,
+    the record caches, token expiry checks, the job duration
+    estimator, conditional GET validators and building responses.
+    Each client only adds its own transport on top.
+
+    """
+
+    def __init__(
+            self,
+            user=None,
+            password=None,
+            url=None,
+            email=None,
+            verbose=True,
+            ca_dir=None,
+            cert_file=None,
+            key_file=None,
+            debug=False,
+            pool_connections=None,
+            pool_maxsize=None,
+            keep_alive=True,
+            poll_policy=None,
+            estimator=None,
+            eta_file=None,
+            status_probe=True,
+            conditional_get=True,
+            cache_max_entries=ANTINEX_CACHE_MAX_ENTRIES,
+            cache_max_bytes=ANTINEX_CACHE_MAX_BYTES,
+            cache_ttl=ANTINEX_CACHE_TTL,
+            cache_eviction=ANTINEX_CACHE_EVICTION,
+            cache_summaries_only=ANTINEX_CACHE_SUMMARIES_ONLY,
+            compress_requests=False,
+            compress_min_bytes=16384,
+            compress_encoding="gzip",
+            token_refresh_margin=30.0,
+            token_cache=None,
+            token_cache_file=None):
+        """__init__
+
+        See ``AIClient`` for the arguments
+        """
+
+        self.user = user
+        self.email = email
+        self.password = password
+        self.url = url
+        self.verbose = verbose
+        self.ca_dir = ca_dir
+        self.cert_file = cert_file
+        self.key_file = key_file
+        self.debug = debug
+
+        if self.debug:
+            self.verbose = True
+
+        self.api_urls = {
+            "login": "{}/api-token-auth/".format(self.url),
+            "job": "{}/ml/".format(self.url),
+            "prepare": "{}/mlprepare/".format(self.url),
+            "results": "{}/mlresults/".format(self.url),
+            "create_user": "{}/users/".format(self.url)
+        }
+        self.token = "not-logged-in-no-token"
+        self.login_status = LOGIN_NOT_ATTEMPTED
+        self.user_id = None
+        self.max_retries = 10
+        self.login_retry_wait_time = 0.1  # in seconds
+        self.token_expires_at = None
+        self.token_refresh_margin = token_refresh_margin
+        self.compress_requests = compress_requests
+        self.compress_min_bytes = compress_min_bytes
+        self.compress_encoding = compress_encoding
+        self.cache_max_entries = cache_max_entries
+        self.cache_max_bytes = cache_max_bytes
+        self.cache_ttl = cache_ttl
+        self.cache_eviction = cache_eviction
+        self.cache_summaries_only = cache_summaries_only
+        self.all_prepares = self.build_cache(
+            name="prepares")
+        self.all_jobs = self.build_cache(
+            name="jobs")
+        self.all_results = self.build_cache(
+            name="results")
+        # status probe responses by url for conditional polling
+        self.all_probes = RecordCache(
+            max_entries=self.cache_max_entries,
+            max_bytes=self.cache_max_bytes,
+            ttl=self.cache_ttl,
+            eviction=self.cache_eviction,
+            name="probes")
+        self.pool_connections = get_pool_setting(
+            pool_connections,
+            "API_POOL_CONNECTIONS")
+        self.pool_maxsize = get_pool_setting(
+            pool_maxsize,
+            "API_POOL_MAXSIZE")
+        self.keep_alive = keep_alive
+        self.poll_policy = poll_policy
+        if not self.poll_policy:
+            self.poll_policy = PollPolicy()
+        self.estimator = estimator
+        if not self.estimator:
+            self.estimator = JobDurationEstimator(
+                path=eta_file or None)
+        # first poll at this fraction of the estimated duration
+        self.eta_lead = 0.9
+        self.max_job_starts = 10000
+        self.job_starts = collections.OrderedDict()
+        self.job_starts_lock = threading.Lock()
+        self.status_probe = status_probe
+        self.conditional_get = conditional_get
+        self.job_status_fields = [
+            "id",
+            "status",
+            "predict_manifest"
+        ]
+        self.result_status_fields = [
+            "id",
+            "status"
+        ]
+        self.token_cache = token_cache
+        if not self.token_cache and token_cache_file:
+            self.token_cache = TokenCache(
+                path=token_cache_file,
+                min_ttl=self.token_refresh_margin)
+    # end of __init__
+
+    def load_cached_token(
+            self):
+        """load_cached_token
+
+        Start with a token from the ``token_cache`` if it has one
+        for this url and user that is not about to expire - a
+        revoked token is replaced by the ``401`` retry login
+        """
+        if not self.token_cache or not self.user:
+            return False
+        cached_token = self.token_cache.get(
+            self.url,
+            self.user)
+        if not cached_token:
+            return False
+        if self.verbose:
+            log.debug(("using cached token for user={} url={}")
+                      .format(
+                        self.user,
+                        self.url))
+        self.token = cached_token
+        self.token_expires_at = self.get_local_expiry(
+            cached_token)
+        self.login_status = LOGIN_SUCCESS
+        return True
+    # end of load_cached_token
+
+    def set_token(
+            self,
+            token):
+        """set_token
+
+        Use the token from a successful login
+
+        :param token: JWT token string
+        """
+        self.token = token
+        self.token_expires_at = self.get_local_expiry(
+            token)
+        self.login_status = LOGIN_SUCCESS
+        if self.token_cache:
+            self.token_cache.set(
+                self.url,
+                self.user,
+                token)
+    # end of set_token
+
+    def build_cache(
+            self,
+            name):
+        """build_cache
+
+        :param name: name of the records in the cache
+        """
+        return RecordCache(
+            max_entries=self.cache_max_entries,
+            max_bytes=self.cache_max_bytes,
+            ttl=self.cache_ttl,
+            eviction=self.cache_eviction,
+            summaries_only=self.cache_summaries_only,
+            name=name)
+    # end of build_cache
+
+    def encode_body(
+            self,
+            body):
+        """encode_body
+
+        Serialize a request body one time and compress it when
+        ``compress_requests`` is set and it is large enough
+
+        Returns a ``(raw_data, data, content_encoding)`` tuple with
+        the JSON bytes, the bytes to send and the optional
+        ``Content-Encoding`` header value
+
+        :param body: dictionary to post or its JSON encoded
+                     ``bytes`` or ``str``
+        """
+        if isinstance(body, (bytes, bytearray)):
+            raw_data = body
+        elif isinstance(body, str):
+            raw_data = body.encode("utf-8")
+        else:
+            raw_data = dumps(body)
+        if not self.compress_requests:
+            return raw_data, raw_data, None
+        data, content_encoding = compress_body(
+            raw_data,
+            encoding=self.compress_encoding,
+            min_bytes=self.compress_min_bytes)
+        if self.debug and content_encoding:
+            log.info(("compressed body={} to bytes={} with {}")
+                     .format(
+                        len(raw_data),
+                        len(data),
+                        content_encoding))
+        return raw_data, data, content_encoding
+    # end of encode_body
+
+    def get_cache_stats(
+            self):
+        """get_cache_stats
+
+        Get the hit, miss, eviction and size stats for the
+        ``all_jobs``, ``all_results``, ``all_prepares`` and
+        ``all_probes`` caches
+        """
+        return {
+            "jobs": self.all_jobs.get_stats(),
+            "results": self.all_results.get_stats(),
+            "prepares": self.all_prepares.get_stats(),
+            "probes": self.all_probes.get_stats()
+        }
+    # end of get_cache_stats
+
+    def is_logged_in(
+            self):
+        """is_logged_in"""
+        return self.login_status == LOGIN_SUCCESS
+    # end of is_logged_in
+
+    def get_local_expiry(
+            self,
+            token):
+        """get_local_expiry
+
+        Time the token expires from its ``exp`` claim - returns
+        ``None`` when it cannot be used for proactive refreshes
+        like tokens without an ``exp`` or a clock skewed so far
+        from the API's that the new token already looks expired
+
+        :param token: JWT token string
+        """
+        expires_at = get_token_expiry(
+            token)
+        if not expires_at or not self.token_refresh_margin:
+            return None
+        if expires_at - self.token_refresh_margin <= time.time():
+            log.error(("token for user={} expires in less than "
+                       "refresh_margin={}s - check the clock, only "
+                       "refreshing after 401s")
+                      .format(
+                        self.user,
+                        self.token_refresh_margin))
+            return None
+        return expires_at
+    # end of get_local_expiry
+
+    def needs_refresh(
+            self):
+        """needs_refresh
+
+        Check if the token is within ``token_refresh_margin``
+        seconds of expiring
+        """
+        if not self.token_expires_at or not self.is_logged_in():
+            return False
+        return (self.token_expires_at -
+                self.token_refresh_margin) <= time.time()
+    # end of needs_refresh
+
+    def get_token(
+            self):
+        """get_token"""
+        return self.token
+    # end of get_token
+
+    def get_auth_header(
+            self,
+            token=None):
+        """get_auth_header
+
+        :param token: optional token to use instead of ``get_token``
+        """
+        headers = {
+            "Content-type": "application/json",
+            "Authorization": "JWT {}".format(
+                token or self.get_token())
+        }
+        return headers
+    # end of get_auth_header
+
+    def build_response(
+            self,
+            status=NOT_SET,
+            error="",
+            data=None):
+        """build_response
+
+        :param status: status code
+        :param error: error message
+        :param data: dictionary to send back
+        """
+
+        res_node = {
+            "status": status,
+            "error": error,
+            "data": data
+        }
+        return res_node
+    # end of build_response
+
+    def build_record_url(
+            self,
+            base_url,
+            record_id,
+            fields=None):
+        """build_record_url
+
+        :param base_url: api url for the record type
+        :param record_id: record id in the database
+        :param fields: optional list of fields to ask the
+                       API to project the record down to
+        """
+        url = "{}{}".format(
+            base_url,
+            record_id)
+        if fields:
+            url = "{}?fields={}".format(
+                url,
+                ",".join(fields))
+        return url
+    # end of build_record_url
+
+    def is_partial_record(
+            self,
+            record,
+            fields=None):
+        """is_partial_record
+
+        Check if a record fetched with ``fields`` was projected
+        by the API - servers that ignore the ``fields`` query
+        send the full record back which can be used as-is
+
+        :param record: record dictionary from the API
+        :param fields: list of fields that were requested
+        """
+        if not fields or not isinstance(record, dict):
+            return False
+        for key in record:
+            if key not in fields:
+                return False
+        return True
+    # end of is_partial_record
+
+    def get_validator_cache(
+            self,
+            record_id,
+            url,
+            all_records,
+            fields=None):
+        """get_validator_cache
+
+        Get the ``(cache, key)`` holding the last response for a
+        record request - full records are kept in ``all_records``
+        by id and ``fields`` probes in ``all_probes`` by url so
+        status polling can be revalidated too. Returns
+        ``(None, None)`` when conditional GETs are off.
+
+        :param record_id: record id in the database
+        :param url: url for the record request
+        :param all_records: ``RecordCache`` for the record type
+        :param fields: optional list of fields in the request
+        """
+        if not self.conditional_get:
+            return None, None
+        if fields:
+            return self.all_probes, url
+        if all_records.summaries_only:
+            return None, None
+        return all_records, str(record_id)
+    # end of get_validator_cache
+
+    def get_cached_entry(
+            self,
+            record_id,
+            url,
+            all_records,
+            headers,
+            fields=None):
+        """get_cached_entry
+
+        Get the cached entry to revalidate with a conditional GET
+        and add its ``If-None-Match`` and ``If-Modified-Since``
+        validators to ``headers`` - returns ``None`` when there is
+        nothing to revalidate
+
+        :param record_id: record id in the database
+        :param url: url for the record request
+        :param all_records: ``RecordCache`` for the record type
+        :param headers: request headers to update
+        :param fields: optional list of fields in the request
+        """
+        cache, key = self.get_validator_cache(
+            record_id=record_id,
+            url=url,
+            all_records=all_records,
+            fields=fields)
+        if not cache:
+            return None
+        cached_entry = cache.get_entry(
+            key)
+        if not cached_entry or not cached_entry[3]:
+            return None
+        validators = cached_entry[3]
+        if validators.get("etag", None):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified", None):
+            headers["If-Modified-Since"] = \
+                validators["last_modified"]
+        return cached_entry
+    # end of get_cached_entry
+
+    def touch_record(
+            self,
+            record_id,
+            url,
+            all_records,
+            fields=None):
+        """touch_record
+
+        Restart the ``ttl`` of a cached response after a ``304``
+
+        :param record_id: record id in the database
+        :param url: url for the record request
+        :param all_records: ``RecordCache`` for the record type
+        :param fields: optional list of fields in the request
+        """
+        cache, key = self.get_validator_cache(
+            record_id=record_id,
+            url=url,
+            all_records=all_records,
+            fields=fields)
+        if cache:
+            cache.touch(
+                key)
+    # end of touch_record
+
+    def store_record(
+            self,
+            name,
+            record_data,
+            url,
+            all_records,
+            response_headers,
+            size,
+            fields=None):
+        """store_record
+
+        Cache a full record with the validators from its response
+        and keep ``fields`` probes with their validators in
+        ``all_probes`` - projected records are never stored in
+        ``all_records``
+
+        :param name: record name for logging
+        :param record_data: record dictionary from the API
+        :param url: url for the record request
+        :param all_records: ``RecordCache`` for the record type
+        :param response_headers: response headers
+        :param size: size of the response body in bytes
+        :param fields: optional list of fields in the request
+        """
+        validators = None
+        etag = response_headers.get(
+            "ETag",
+            None)
+        last_modified = response_headers.get(
+            "Last-Modified",
+            None)
+        if etag or last_modified:
+            validators = {
+                "etag": etag,
+                "last_modified": last_modified
+            }
+        is_partial = self.is_partial_record(
+            record_data,
+            fields)
+        # probes of servers that ignore fields get full records
+        if fields and validators and self.conditional_get and (
+                is_partial or not all_records.summaries_only):
+            self.all_probes.set(
+                url,
+                record_data,
+                size=size,
+                meta=validators)
+        if is_partial:
+            return
+        all_records.set(
+            str(record_data["id"]),
+            record_data,
+            size=size,
+            meta=validators)
+
+        if self.debug:
+            log.info(("added {}={} total={}")
+                     .format(
+                        name,
+                        record_data["id"],
+                        len(all_records)))
+    # end of store_record
+
+    def track_job_start(
+            self,
+            job_id,
+            body,
+            start_time):
+        """track_job_start
+
+        Remember when a job was submitted so its duration can be
+        learned once it finishes
+
+        :param job_id: MLJob.id that was started
+        :param body: request body used to start the job
+        :param start_time: ``time.time()`` before the job was posted
+        """
+        label = None
+        num_rows = 0
+        if isinstance(body, dict):
+            label = body.get(
+                "label",
+                None)
+            num_rows = get_num_predict_rows(
+                body)
+        else:
+            # encoded bodies from a RequestTemplate
+            label = getattr(
+                body,
+                "label",
+                None)
+            num_rows = getattr(
+                body,
+                "num_rows",
+                0)
+        if not label:
+            return
+        with self.job_starts_lock:
+            self.job_starts[str(job_id)] = (
+                start_time,
+                label,
+                num_rows)
+            while len(self.job_starts) > self.max_job_starts:
+                self.job_starts.popitem(last=False)
+    # end of track_job_start
+
+    def track_job_finished(
+            self,
+            job_id):
+        """track_job_finished
+
+        Record the duration of a job that was started by this
+        client with the ``estimator``
+
+        :param job_id: MLJob.id that finished
+        """
+        with self.job_starts_lock:
+            node = self.job_starts.pop(
+                str(job_id),
+                None)
+        if not node:
+            return
+        start_time, label, num_rows = node
+        self.estimator.record(
+            label=label,
+            num_rows=num_rows,
+            seconds=time.time() - start_time)
+    # end of track_job_finished
+
+    def get_first_poll_delay(
+            self,
+            job_id):
+        """get_first_poll_delay
+
+        Seconds to wait before the first poll of a job - this is
+        ``0.0`` unless the ``estimator`` has history for jobs
+        with the same label and a similar number of rows
+
+        :param job_id: MLJob.id to wait on
+        """
+        with self.job_starts_lock:
+            node = self.job_starts.get(
+                str(job_id),
+                None)
+        if not node:
+            return 0.0
+        start_time, label, num_rows = node
+        eta = self.estimator.estimate(
+            label=label,
+            num_rows=num_rows)
+        if not eta:
+            return 0.0
+        return max(
+            0.0,
+            start_time + eta * self.eta_lead - time.time())
+    # end of get_first_poll_delay
+
+    def get_poll_fields(
+            self):
+        """get_poll_fields
+
+        ``(job_fields, result_fields)`` to poll with - both are
+        ``None`` unless ``status_probe`` is set
+        """
+        if not self.status_probe:
+            return None, None
+        return self.job_status_fields, self.result_status_fields
+    # end of get_poll_fields
+
+# end of BaseAIClient
@@ -10,6 +10,9 @@ from antinex_client.consts import ANTINEX_EMAIL
 from antinex_client.consts import ANTINEX_PASSWORD
 from antinex_client.consts import ANTINEX_CLIENT_VERBOSE
 from antinex_client.consts import ANTINEX_CLIENT_DEBUG
+from antinex_client.consts import ANTINEX_ETA_FILE
+from antinex_client.consts import ANTINEX_TOKEN_CACHE_FILE
+from antinex_client.consts import ANTINEX_PREDICTION_CACHE_FILE
 
 
 log = console_logger(
@@ -21,7 +24,10 @@ def build_ai_client_from_env(
         debug=ANTINEX_CLIENT_DEBUG,
         ca_dir=None,
         cert_file=None,
-        key_file=None):
+        key_file=None,
+        eta_file=ANTINEX_ETA_FILE,
+        token_cache_file=ANTINEX_TOKEN_CACHE_FILE,
+        prediction_cache_file=ANTINEX_PREDICTION_CACHE_FILE):
     """build_ai_client_from_env
 
     Use environment variables to build a client
@@ -31,6 +37,11 @@ def build_ai_client_from_env(
     :param ca_dir: optional path to CA bundle dir
     :param cert_file: optional path to x509 ssl cert file
     :param key_file: optional path to x509 ssl key file
+    :param eta_file: optional file to persist job duration estimates
+    :param token_cache_file: optional file to reuse login tokens
+                             between runs
+    :param prediction_cache_file: optional ``sqlite`` file to reuse
+                                  predictions between runs
     """
 
     if not ANTINEX_PUBLISH_ENABLED:
@@ -75,5 +86,8 @@ def build_ai_client_from_env(
         cert_file=use_cert_file,
         key_file=use_key_file,
         verbose=verbose,
-        debug=debug)
+        debug=debug,
+        eta_file=eta_file,
+        token_cache_file=token_cache_file,
+        prediction_cache_file=prediction_cache_file)
 # end of build_ai_client_from_env
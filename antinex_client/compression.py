@@ -0,0 +1,66 @@
+import gzip
+import zlib
+
+
+GZIP = "gzip"
+DEFLATE = "deflate"
+SUPPORTED_ENCODINGS = [
+    GZIP,
+    DEFLATE
+]
+
+
+def compress_body(
+        data,
+        encoding=GZIP,
+        min_bytes=1024,
+        level=6):
+    """compress_body
+
+    Compress a request body if it is at least ``min_bytes`` long
+
+    Returns a ``(data, content_encoding)`` tuple where
+    ``content_encoding`` is ``None`` when the body was left as-is
+
+    :param data: request body as ``bytes`` or ``str``
+    :param encoding: ``gzip`` or ``deflate``
+    :param min_bytes: smallest body worth compressing
+    :param level: compression level from 1 (fast) to 9 (small)
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if encoding not in SUPPORTED_ENCODINGS:
+        raise ValueError(
+            "unsupported encoding={} use one of {}".format(
+                encoding,
+                SUPPORTED_ENCODINGS))
+    if len(data) < min_bytes:
+        return data, None
+    if encoding == GZIP:
+        return gzip.compress(data, compresslevel=level), GZIP
+    return zlib.compress(data, level), DEFLATE
+# end of compress_body
+
+
+def decompress_body(
+        data,
+        encoding=None):
+    """decompress_body
+
+    Reverse ``compress_body`` - for servers and tests that
+    receive a ``Content-Encoding`` request body
+
+    :param data: request body ``bytes``
+    :param encoding: ``Content-Encoding`` header value
+    """
+    if not encoding or encoding == "identity":
+        return data
+    if encoding == GZIP:
+        return gzip.decompress(data)
+    if encoding == DEFLATE:
+        return zlib.decompress(data)
+    raise ValueError(
+        "unsupported encoding={} use one of {}".format(
+            encoding,
+            SUPPORTED_ENCODINGS))
+# end of decompress_body
@@ -127,6 +127,93 @@ ANTINEX_CLIENT_VERBOSE = bool(ev(
 ANTINEX_CLIENT_DEBUG = bool(ev(
     "ANTINEX_CLIENT_DEBUG",
     "0") == "1")
+# use the fast predict row conversion for this many rows (0 disables)
+ANTINEX_FAST_CONVERT_MIN_ROWS = int(ev(
+    "ANTINEX_FAST_CONVERT_MIN_ROWS",
+    "1"))
+# cap each chunked request by rows and encoded bytes (0 disables)
+ANTINEX_REQUEST_MAX_ROWS = int(ev(
+    "ANTINEX_REQUEST_MAX_ROWS",
+    "1000"))
+ANTINEX_REQUEST_MAX_BYTES = int(ev(
+    "ANTINEX_REQUEST_MAX_BYTES",
+    "0"))
+# convert and encode rows across this many processes (0 disables)
+ANTINEX_CONVERT_WORKERS = int(ev(
+    "ANTINEX_CONVERT_WORKERS",
+    "0"))
+ANTINEX_CONVERT_BATCH_ROWS = int(ev(
+    "ANTINEX_CONVERT_BATCH_ROWS",
+    "5000"))
+# send predict rows as objects (rows) or value arrays (columnar)
+ANTINEX_PREDICT_FORMAT = ev(
+    "ANTINEX_PREDICT_FORMAT",
+    "rows")
+# round converted values to significant digits (0 disables) or float32
+ANTINEX_PRECISION = int(ev(
+    "ANTINEX_PRECISION",
+    "0"))
+ANTINEX_DTYPE = ev(
+    "ANTINEX_DTYPE",
+    "float64")
+# optional file to persist job duration estimates between runs
+ANTINEX_ETA_FILE = os.getenv(
+    "ANTINEX_ETA_FILE",
+    None)
+# json library for requests and responses:
+# auto, orjson, ujson, rapidjson or json
+ANTINEX_JSON_BACKEND = ev(
+    "ANTINEX_JSON_BACKEND",
+    "auto").lower()
+# optional file to reuse login tokens between runs
+ANTINEX_TOKEN_CACHE_FILE = os.getenv(
+    "ANTINEX_TOKEN_CACHE_FILE",
+    None)
+# predictions kept in memory and an optional sqlite file to reuse
+ANTINEX_PREDICTION_CACHE_MAX_ENTRIES = int(ev(
+    "ANTINEX_PREDICTION_CACHE_MAX_ENTRIES",
+    "100000"))
+ANTINEX_PREDICTION_CACHE_FILE = os.getenv(
+    "ANTINEX_PREDICTION_CACHE_FILE",
+    None)
+
+# polling backoff for the wait_for_* methods
+ANTINEX_POLL_FLOOR = float(ev(
+    "ANTINEX_POLL_FLOOR",
+    "0.5"))
+ANTINEX_POLL_CEILING = float(ev(
+    "ANTINEX_POLL_CEILING",
+    "30.0"))
+ANTINEX_POLL_MULTIPLIER = float(ev(
+    "ANTINEX_POLL_MULTIPLIER",
+    "1.5"))
+ANTINEX_POLL_JITTER = float(ev(
+    "ANTINEX_POLL_JITTER",
+    "0.25"))
+ANTINEX_POLL_FAST_POLLS = int(ev(
+    "ANTINEX_POLL_FAST_POLLS",
+    "3"))
+ANTINEX_POLL_FAST_SLEEP = float(ev(
+    "ANTINEX_POLL_FAST_SLEEP",
+    "0.2"))
+
+# bounds for the client's all_jobs, all_results and all_prepares caches
+# (0 disables a limit)
+ANTINEX_CACHE_MAX_ENTRIES = int(ev(
+    "ANTINEX_CACHE_MAX_ENTRIES",
+    "1000"))
+ANTINEX_CACHE_MAX_BYTES = int(ev(
+    "ANTINEX_CACHE_MAX_BYTES",
+    str(256 * 1024 * 1024)))
+ANTINEX_CACHE_TTL = float(ev(
+    "ANTINEX_CACHE_TTL",
+    "0"))
+ANTINEX_CACHE_EVICTION = ev(
+    "ANTINEX_CACHE_EVICTION",
+    "lru").lower()
+ANTINEX_CACHE_SUMMARIES_ONLY = bool(ev(
+    "ANTINEX_CACHE_SUMMARIES_ONLY",
+    "0") == "1")
 
 # set empty defaults
 ANTINEX_FEATURES_TO_PROCESS = []
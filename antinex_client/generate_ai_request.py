@@ -1,6 +1,10 @@
 import os
 import json
 import copy
+import operator
+import itertools
+import collections
+import concurrent.futures
 from spylunking.log.setup_logging import console_logger
 from antinex_client.utils import ppj
 from antinex_client.consts import FAILED
@@ -35,12 +39,628 @@ from antinex_client.consts import ANTINEX_CHECK_MISSING_PREDICT
 from antinex_client.consts import ANTINEX_MISSING_VALUE
 from antinex_client.consts import ANTINEX_VERSION
 from antinex_client.consts import ANTINEX_CLIENT_DEBUG
+from antinex_client.consts import ANTINEX_FAST_CONVERT_MIN_ROWS
+from antinex_client.consts import ANTINEX_CONVERT_WORKERS
+from antinex_client.consts import ANTINEX_CONVERT_BATCH_ROWS
+from antinex_client.consts import ANTINEX_PREDICT_FORMAT
+from antinex_client.consts import ANTINEX_PRECISION
+from antinex_client.consts import ANTINEX_DTYPE
+from antinex_client.predict_format import set_predict_rows
+from antinex_client.precision import ValueRounder
 
 
 log = console_logger(
     name='gen_ai_req')
 
 
+def load_request_body(
+        req_dict=None,
+        req_file=ANTINEX_PUBLISH_REQUEST_FILE):
+    """load_request_body
+
+    Copy the request template from ``req_dict`` or load it from
+    ``req_file`` - any ``predict_rows`` in the template are not
+    copied since they are always replaced
+
+    :param req_dict: request dictionary to copy
+    :param req_file: file holding a request dict
+    """
+    body = None
+    if not req_dict:
+        if os.path.exists(req_file):
+            with open(req_file, "r") as f:
+                body = json.loads(f.read())
+    else:
+        body = copy.deepcopy({
+            k: v
+            for k, v in req_dict.items()
+            if k != "predict_rows"
+        })
+    return body
+# end of load_request_body
+
+
+def convert_predict_rows_loop(
+        predict_rows,
+        filter_features_dict=FILTER_FEATURES_DICT,
+        filter_features=FILTER_FEATURES,
+        predict_feature=ANTINEX_PREDICT_FEATURE,
+        convert_to_type=ANTINEX_CONVERT_DATA_TYPE,
+        include_failed_conversions=ANTINEX_INCLUDE_FAILED_CONVERSIONS,
+        value_for_missing=ANTINEX_MISSING_VALUE,
+        check_missing_predict_feature=ANTINEX_CHECK_MISSING_PREDICT):
+    """convert_predict_rows_loop
+
+    Filter, convert and fill in missing values one row and one
+    column at a time
+
+    :param predict_rows: list of predict rows to convert
+    :param filter_features_dict: dictionary of features to use
+    :param filter_features: list of features to use
+    :param predict_feature: predict the values of this feature
+    :param convert_to_type: convert predict_row values to scaler-ready values
+    :param include_failed_conversions: should the predict rows include fails
+    :param value_for_missing: set this value to any columns that are missing
+    :param check_missing_predict_feature: fill in the predict feature
+    """
+    use_predict_rows = []
+    for r in predict_rows:
+        new_row = {}
+        for col in r:
+            cur_value = r[col]
+            if col in filter_features_dict:
+                if not cur_value:
+                    cur_value = value_for_missing
+                if ANTINEX_CONVERT_DATA:
+                    try:
+                        if convert_to_type == "float":
+                            new_row[col] = float(cur_value)
+                        elif convert_to_type == "int":
+                            new_row[col] = int(cur_value)
+                    except Exception:
+                        if include_failed_conversions:
+                            new_row[col] = cur_value
+                        else:
+                            log.error(("failed converting {}={} type={}")
+                                      .format(
+                                        col,
+                                        cur_value,
+                                        convert_to_type))
+                    # if conversion failed
+                else:
+                    new_row[col] = cur_value
+                # if not converting data
+            # if the column is in the filtered features
+        # for all columns in the row dictionary
+
+        for col in filter_features:
+            if col not in new_row:
+                new_row[col] = value_for_missing
+        # make sure to fill in missing columns with a default
+
+        if check_missing_predict_feature:
+            if predict_feature not in new_row:
+                new_row[predict_feature] = value_for_missing
+
+        use_predict_rows.append(new_row)
+    # for all predict rows to convert and fileter
+
+    return use_predict_rows
+# end of convert_predict_rows_loop
+
+
+class RowSchema:
+
+    """
+
+    Compiled predict row conversion for one set of features
+
+    The converter function, converted missing value, kept
+    columns and fill columns are worked out once. Each row key
+    layout (like the header of a CSV) gets a plan with an
+    ``itemgetter`` for its kept columns so a row is converted
+    with one list comprehension and rebuilt with one
+    ``dict(zip())``. The output is the same as
+    ``convert_predict_rows_loop`` - rows with a failed
+    conversion are handed to the loop so their values, key
+    order and error logs do not change.
+
+    A schema is never changed after it is built other than
+    adding plans, so one schema can be shared across calls
+    and threads.
+
+    """
+
+    def __init__(
+            self,
+            filter_features_dict=FILTER_FEATURES_DICT,
+            filter_features=FILTER_FEATURES,
+            predict_feature=ANTINEX_PREDICT_FEATURE,
+            convert_to_type=ANTINEX_CONVERT_DATA_TYPE,
+            include_failed_conversions=ANTINEX_INCLUDE_FAILED_CONVERSIONS,
+            value_for_missing=ANTINEX_MISSING_VALUE,
+            check_missing_predict_feature=ANTINEX_CHECK_MISSING_PREDICT):
+        """__init__
+
+        :param filter_features_dict: dictionary of features to use
+        :param filter_features: list of features to use
+        :param predict_feature: predict the values of this feature
+        :param convert_to_type: convert predict_row values to
+                                scaler-ready values
+        :param include_failed_conversions: should the predict rows include fails
+        :param value_for_missing: set this value to any columns that are missing
+        :param check_missing_predict_feature: fill in the predict feature
+        """
+        self.filter_features_dict = filter_features_dict
+        self.filter_features = filter_features
+        self.predict_feature = predict_feature
+        self.convert_to_type = convert_to_type
+        self.include_failed_conversions = include_failed_conversions
+        self.value_for_missing = value_for_missing
+        self.check_missing_predict_feature = check_missing_predict_feature
+        self.max_plans = 64
+        self.plans = {}
+
+        # conversions the plans cannot reproduce use the loop
+        self.use_loop = False
+        self.converter = None
+        self.missing_value = value_for_missing
+        if ANTINEX_CONVERT_DATA:
+            if convert_to_type == "float":
+                self.converter = float
+            elif convert_to_type == "int":
+                self.converter = int
+            else:
+                # nothing is converted so every cell is filled at the end
+                self.use_loop = True
+        if self.converter:
+            try:
+                self.missing_value = self.converter(
+                    value_for_missing)
+            except Exception:
+                # the loop keeps the unconverted value if it is
+                # included and moves the dropped cell to the end if not
+                self.use_loop = not include_failed_conversions
+    # end of __init__
+
+    def get_plan(
+            self,
+            row_keys):
+        """get_plan
+
+        Get the ``(get_values, out_cols, fill_values)`` plan for
+        rows with these keys in this order
+
+        :param row_keys: tuple of the row's keys
+        """
+        plan = self.plans.get(
+            row_keys,
+            None)
+        if plan:
+            return plan
+
+        cols = [
+            col
+            for col in row_keys
+            if col in self.filter_features_dict
+        ]
+        # missing filter features then the predict feature go last
+        fill_cols = []
+        for col in self.filter_features:
+            if col not in cols and col not in fill_cols:
+                fill_cols.append(col)
+        if self.check_missing_predict_feature \
+                and self.predict_feature not in cols \
+                and self.predict_feature not in fill_cols:
+            fill_cols.append(self.predict_feature)
+
+        if len(cols) == 1:
+            def get_values(r):
+                return (r[cols[0]],)
+        elif len(cols) > 1:
+            get_values = operator.itemgetter(*cols)
+        else:
+            def get_values(r):
+                return ()
+        # end of building the getter
+
+        plan = (
+            get_values,
+            cols + fill_cols,
+            [self.value_for_missing] * len(fill_cols))
+        if len(self.plans) < self.max_plans:
+            self.plans[row_keys] = plan
+        return plan
+    # end of get_plan
+
+    def get_columns(
+            self):
+        """get_columns
+
+        Keys of a converted row that had every filter feature -
+        the ``predict_columns`` header for ``columnar`` requests
+        """
+        return list(self.get_plan(
+            tuple(self.filter_features))[1])
+    # end of get_columns
+
+    def __getstate__(
+            self):
+        """__getstate__
+
+        Plans hold getters that cannot be pickled so a schema sent
+        to a worker process rebuilds them
+        """
+        state = dict(self.__dict__)
+        state["plans"] = {}
+        return state
+    # end of __getstate__
+
+    def convert_loop(
+            self,
+            predict_rows):
+        """convert_loop
+
+        :param predict_rows: list of predict rows to convert
+        """
+        return convert_predict_rows_loop(
+            predict_rows=predict_rows,
+            filter_features_dict=self.filter_features_dict,
+            filter_features=self.filter_features,
+            predict_feature=self.predict_feature,
+            convert_to_type=self.convert_to_type,
+            include_failed_conversions=self.include_failed_conversions,
+            value_for_missing=self.value_for_missing,
+            check_missing_predict_feature=self.check_missing_predict_feature)
+    # end of convert_loop
+
+    def convert(
+            self,
+            predict_rows):
+        """convert
+
+        :param predict_rows: list of predict rows to convert
+        """
+        if self.use_loop:
+            return self.convert_loop(
+                predict_rows)
+
+        converter = self.converter
+        missing_value = self.missing_value
+        last_keys = None
+        plan = None
+        use_predict_rows = []
+        for r in predict_rows:
+            try:
+                row_keys = tuple(r)
+                if row_keys != last_keys:
+                    plan = self.get_plan(
+                        row_keys)
+                    last_keys = row_keys
+                get_values, out_cols, fill_values = plan
+                if converter:
+                    values = [
+                        converter(v) if v else missing_value
+                        for v in get_values(r)
+                    ]
+                else:
+                    values = [
+                        v if v else missing_value
+                        for v in get_values(r)
+                    ]
+            except Exception:
+                use_predict_rows.extend(self.convert_loop(
+                    [r]))
+                continue
+            use_predict_rows.append(dict(zip(
+                out_cols,
+                values + fill_values)))
+        # for all predict rows to convert and filter
+
+        return use_predict_rows
+    # end of convert
+
+# end of RowSchema
+
+
+ROW_SCHEMAS = {}
+MAX_ROW_SCHEMAS = 32
+
+
+def get_row_schema(
+        filter_features_dict=FILTER_FEATURES_DICT,
+        filter_features=FILTER_FEATURES,
+        predict_feature=ANTINEX_PREDICT_FEATURE,
+        convert_to_type=ANTINEX_CONVERT_DATA_TYPE,
+        include_failed_conversions=ANTINEX_INCLUDE_FAILED_CONVERSIONS,
+        value_for_missing=ANTINEX_MISSING_VALUE,
+        check_missing_predict_feature=ANTINEX_CHECK_MISSING_PREDICT):
+    """get_row_schema
+
+    Get the shared ``RowSchema`` for these arguments and build
+    it on the first call
+
+    :param filter_features_dict: dictionary of features to use
+    :param filter_features: list of features to use
+    :param predict_feature: predict the values of this feature
+    :param convert_to_type: convert predict_row values to scaler-ready values
+    :param include_failed_conversions: should the predict rows include fails
+    :param value_for_missing: set this value to any columns that are missing
+    :param check_missing_predict_feature: fill in the predict feature
+    """
+    try:
+        # -1 == -1.0 and 0 == False so the types are part of the key
+        scalars = (
+            predict_feature,
+            convert_to_type,
+            include_failed_conversions,
+            value_for_missing,
+            check_missing_predict_feature,
+            ANTINEX_CONVERT_DATA)
+        key = (
+            frozenset(filter_features_dict),
+            tuple(filter_features),
+            scalars,
+            tuple(type(v) for v in scalars))
+        schema = ROW_SCHEMAS.get(
+            key,
+            None)
+    except TypeError:
+        # unhashable values are not cached
+        key = None
+        schema = None
+    if schema:
+        return schema
+
+    schema = RowSchema(
+        filter_features_dict=filter_features_dict,
+        filter_features=filter_features,
+        predict_feature=predict_feature,
+        convert_to_type=convert_to_type,
+        include_failed_conversions=include_failed_conversions,
+        value_for_missing=value_for_missing,
+        check_missing_predict_feature=check_missing_predict_feature)
+    if key:
+        if len(ROW_SCHEMAS) >= MAX_ROW_SCHEMAS:
+            ROW_SCHEMAS.clear()
+        ROW_SCHEMAS[key] = schema
+    return schema
+# end of get_row_schema
+
+
+def convert_predict_rows_fast(
+        predict_rows,
+        filter_features_dict=FILTER_FEATURES_DICT,
+        filter_features=FILTER_FEATURES,
+        predict_feature=ANTINEX_PREDICT_FEATURE,
+        convert_to_type=ANTINEX_CONVERT_DATA_TYPE,
+        include_failed_conversions=ANTINEX_INCLUDE_FAILED_CONVERSIONS,
+        value_for_missing=ANTINEX_MISSING_VALUE,
+        check_missing_predict_feature=ANTINEX_CHECK_MISSING_PREDICT):
+    """convert_predict_rows_fast
+
+    Convert rows with the shared ``RowSchema`` for the features -
+    same output as ``convert_predict_rows_loop``
+
+    :param predict_rows: list of predict rows to convert
+    :param filter_features_dict: dictionary of features to use
+    :param filter_features: list of features to use
+    :param predict_feature: predict the values of this feature
+    :param convert_to_type: convert predict_row values to scaler-ready values
+    :param include_failed_conversions: should the predict rows include fails
+    :param value_for_missing: set this value to any columns that are missing
+    :param check_missing_predict_feature: fill in the predict feature
+    """
+    return get_row_schema(
+        filter_features_dict=filter_features_dict,
+        filter_features=filter_features,
+        predict_feature=predict_feature,
+        convert_to_type=convert_to_type,
+        include_failed_conversions=include_failed_conversions,
+        value_for_missing=value_for_missing,
+        check_missing_predict_feature=check_missing_predict_feature).convert(
+            predict_rows)
+# end of convert_predict_rows_fast
+
+
+def convert_predict_rows(
+        predict_rows,
+        filter_features_dict=FILTER_FEATURES_DICT,
+        filter_features=FILTER_FEATURES,
+        predict_feature=ANTINEX_PREDICT_FEATURE,
+        convert_to_type=ANTINEX_CONVERT_DATA_TYPE,
+        include_failed_conversions=ANTINEX_INCLUDE_FAILED_CONVERSIONS,
+        value_for_missing=ANTINEX_MISSING_VALUE,
+        check_missing_predict_feature=ANTINEX_CHECK_MISSING_PREDICT,
+        fast_min_rows=ANTINEX_FAST_CONVERT_MIN_ROWS):
+    """convert_predict_rows
+
+    Filter, convert and fill in missing values for the predict rows
+
+    :param predict_rows: list of predict rows to convert
+    :param filter_features_dict: dictionary of features to use
+    :param filter_features: list of features to use
+    :param predict_feature: predict the values of this feature
+    :param convert_to_type: convert predict_row values to scaler-ready values
+    :param include_failed_conversions: should the predict rows include fails
+    :param value_for_missing: set this value to any columns that are missing
+    :param check_missing_predict_feature: fill in the predict feature
+    :param fast_min_rows: use ``convert_predict_rows_fast`` for
+                          this many rows or more - ``0`` always
+                          uses the cell by cell loop
+    """
+    if fast_min_rows and len(predict_rows) >= fast_min_rows:
+        return convert_predict_rows_fast(
+            predict_rows=predict_rows,
+            filter_features_dict=filter_features_dict,
+            filter_features=filter_features,
+            predict_feature=predict_feature,
+            convert_to_type=convert_to_type,
+            include_failed_conversions=include_failed_conversions,
+            value_for_missing=value_for_missing,
+            check_missing_predict_feature=check_missing_predict_feature)
+    return convert_predict_rows_loop(
+        predict_rows=predict_rows,
+        filter_features_dict=filter_features_dict,
+        filter_features=filter_features,
+        predict_feature=predict_feature,
+        convert_to_type=convert_to_type,
+        include_failed_conversions=include_failed_conversions,
+        value_for_missing=value_for_missing,
+        check_missing_predict_feature=check_missing_predict_feature)
+# end of convert_predict_rows
+
+
+def run_row_batch(
+        convert_func,
+        predict_rows):
+    """run_row_batch
+
+    Worker entry point for ``map_row_batches``
+
+    :param convert_func: picklable callable taking a list of rows
+    :param predict_rows: list of predict rows
+    """
+    return convert_func(
+        predict_rows)
+# end of run_row_batch
+
+
+def map_row_batches(
+        convert_func,
+        predict_rows,
+        num_workers=ANTINEX_CONVERT_WORKERS,
+        batch_rows=ANTINEX_CONVERT_BATCH_ROWS,
+        executor=None):
+    """map_row_batches
+
+    Lazily call ``convert_func`` on ``batch_rows`` rows at a time
+    and yield each batch's output in the original order. With
+    more than one worker or an ``executor`` the batches run in a
+    ``ProcessPoolExecutor`` with at most two batches per worker
+    in flight, so rows are only pulled from ``predict_rows`` as
+    results are handed back.
+
+    :param convert_func: picklable callable taking a list of rows
+                         like ``RowSchema.convert``
+    :param predict_rows: iterable of predict rows
+    :param num_workers: number of worker processes - ``0`` or
+                        ``1`` converts in this process
+    :param batch_rows: rows sent to a worker at a time
+    :param executor: optional ``concurrent.futures`` executor to
+                     reuse across calls
+    """
+    rows_iter = iter(predict_rows)
+    use_batch_rows = max(
+        batch_rows,
+        1)
+
+    def next_batch():
+        return list(itertools.islice(
+            rows_iter,
+            use_batch_rows))
+    # end of next_batch
+
+    if num_workers <= 1 and not executor:
+        batch = next_batch()
+        while batch:
+            yield convert_func(
+                batch)
+            batch = next_batch()
+        return
+
+    use_executor = executor
+    if not use_executor:
+        use_executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=num_workers)
+    max_pending = max(
+        num_workers or os.cpu_count() or 1,
+        1) * 2
+    pending = collections.deque()
+    try:
+        batch = next_batch()
+        while batch or pending:
+            while batch and len(pending) < max_pending:
+                pending.append(use_executor.submit(
+                    run_row_batch,
+                    convert_func,
+                    batch))
+                batch = next_batch()
+            yield pending.popleft().result()
+        # end of handing back batches in order
+    finally:
+        for future in pending:
+            future.cancel()
+        if not executor:
+            use_executor.shutdown(
+                wait=True)
+# end of map_row_batches
+
+
+def set_request_values(
+        body,
+        use_model_name=ANTINEX_USE_MODEL_NAME,
+        predict_feature=ANTINEX_PREDICT_FEATURE,
+        publish_to_core=ANTINEX_PUBLISH_TO_CORE,
+        seed=ANTINEX_SEED,
+        test_size=ANTINEX_TEST_SIZE,
+        batch_size=ANTINEX_BATCH_SIZE,
+        epochs=ANTINEX_EPOCHS,
+        num_splits=ANTINEX_NUM_SPLITS,
+        loss=ANTINEX_LOSS,
+        optimizer=ANTINEX_OPTIMIZER,
+        metrics=ANTINEX_METRICS,
+        histories=ANTINEX_HISTORIES,
+        ml_type=ANTINEX_ML_TYPE,
+        sort_values=ANTINEX_SORT_VALUES,
+        filter_features=FILTER_FEATURES,
+        ignore_features=ANTINEX_IGNORE_FEATURES):
+    """set_request_values
+
+    Set the model and dataset fields that are the same for
+    every request on ``body``
+
+    :param body: request dictionary to update
+    :param use_model_name: use a pre-trained model by name
+    :param predict_feature: predict the values of this feature
+    :param publish_to_core: want to publish it to the core or the worker
+    :param seed: seed for randomness reproducability
+    :param test_size: split train/test data
+    :param batch_size: batch size for processing
+    :param epochs: test epochs
+    :param num_splits: test splits for cross validation
+    :param loss: loss function
+    :param optimizer: optimizer
+    :param metrics: metrics to apply
+    :param histories: historical values to test
+    :param ml_type: machine learning type - classification/regression
+    :param sort_values: optional - order rows for scaler normalization
+    :param filter_features: list of features to use
+    :param ignore_features: features to ignore in the data (non-numerics)
+    """
+    body["label"] = use_model_name
+    body["predict_feature"] = predict_feature
+    body["publish_to_core"] = publish_to_core
+    body["seed"] = seed
+    body["test_size"] = test_size
+    body["batch_size"] = batch_size
+    body["epochs"] = epochs
+    body["num_splits"] = num_splits
+    body["loss"] = loss
+    body["optimizer"] = optimizer
+    body["metrics"] = metrics
+    body["histories"] = histories
+    body["ml_type"] = ml_type
+    if sort_values:
+        body["sort_values"] = sort_values
+    if filter_features:
+        body["features_to_process"] = filter_features
+    if ignore_features:
+        body["ignore_features"] = ignore_features
+    return body
+# end of set_request_values
+
+
 def generate_ai_request(
         predict_rows,
         req_dict=None,
@@ -69,7 +689,12 @@ def generate_ai_request(
         version=ANTINEX_VERSION,
         publish_to_core=ANTINEX_PUBLISH_TO_CORE,
         check_missing_predict_feature=ANTINEX_CHECK_MISSING_PREDICT,
-        debug=ANTINEX_CLIENT_DEBUG):
+        debug=ANTINEX_CLIENT_DEBUG,
+        num_workers=ANTINEX_CONVERT_WORKERS,
+        executor=None,
+        predict_format=ANTINEX_PREDICT_FORMAT,
+        precision=ANTINEX_PRECISION,
+        dtype=ANTINEX_DTYPE):
     """generate_ai_request
 
     :param predict_rows: list of predict rows to build into the request
@@ -98,6 +723,19 @@ def generate_ai_request(
     :param version: version of the API request
     :param publish_to_core: want to publish it to the core or the worker
     :param debug: log debug messages
+    :param num_workers: convert the rows across this many processes
+                        with ``map_row_batches`` - ``0`` or ``1``
+                        converts in this process
+    :param executor: optional process pool to reuse for converting
+    :param predict_format: ``rows`` sends a list of dictionaries,
+                           ``columnar`` sends one ``predict_columns``
+                           header with ``predict_values`` arrays and
+                           ``sparse`` leaves ``value_for_missing``
+                           out of the arrays
+    :param precision: round converted floats to this many
+                      significant digits - ``0`` keeps every digit
+    :param dtype: ``float32`` sends the shortest decimal of each
+                  converted float as a 32-bit float
     """
 
     status = NOT_SET
@@ -130,15 +768,9 @@ def generate_ai_request(
             return res
         # stop if there's no new rows
 
-        body = None
-        if not req_dict:
-            if os.path.exists(req_file):
-                with open(req_file, "r") as f:
-                    body = json.loads(f.read())
-        else:
-            body = copy.deepcopy(
-                req_dict)
-        # end of loading body from requested
+        body = load_request_body(
+            req_dict=req_dict,
+            req_file=req_file)
 
         if not body:
             err = ("failed to load request body "
@@ -155,55 +787,47 @@ def generate_ai_request(
             return res
         # if body is empty
 
-        err = ("setting values rows={} body={} features={}").format(
-            len(predict_rows),
-            body,
-            filter_features)
+        err = "setting values"
 
         if debug:
-            log.info(err)
+            log.info(("setting values rows={} body={} features={}")
+                     .format(
+                        len(predict_rows),
+                        body,
+                        filter_features))
 
-        use_predict_rows = []
-        for r in predict_rows:
-            new_row = {}
-            for col in r:
-                cur_value = r[col]
-                if col in filter_features_dict:
-                    if not cur_value:
-                        cur_value = value_for_missing
-                    if ANTINEX_CONVERT_DATA:
-                        try:
-                            if convert_to_type == "float":
-                                new_row[col] = float(cur_value)
-                            elif convert_to_type == "int":
-                                new_row[col] = int(cur_value)
-                        except Exception:
-                            if include_failed_conversions:
-                                new_row[col] = cur_value
-                            else:
-                                log.error(("failed converting {}={} type={}")
-                                          .format(
-                                            col,
-                                            cur_value,
-                                            convert_to_type))
-                        # if conversion failed
-                    else:
-                        new_row[col] = cur_value
-                    # if not converting data
-                # if the column is in the filtered features
-            # for all columns in the row dictionary
-
-            for col in filter_features:
-                if col not in new_row:
-                    new_row[col] = value_for_missing
-            # make sure to fill in missing columns with a default
-
-            if check_missing_predict_feature:
-                if predict_feature not in new_row:
-                    new_row[predict_feature] = value_for_missing
-
-            use_predict_rows.append(new_row)
-        # for all predict rows to convert and fileter
+        schema = get_row_schema(
+            filter_features_dict=filter_features_dict,
+            filter_features=filter_features,
+            predict_feature=predict_feature,
+            convert_to_type=convert_to_type,
+            include_failed_conversions=include_failed_conversions,
+            value_for_missing=value_for_missing,
+            check_missing_predict_feature=check_missing_predict_feature)
+        if num_workers > 1 or executor:
+            use_predict_rows = []
+            for converted_rows in map_row_batches(
+                    schema.convert,
+                    predict_rows,
+                    num_workers=num_workers,
+                    executor=executor):
+                use_predict_rows.extend(converted_rows)
+        else:
+            use_predict_rows = convert_predict_rows(
+                predict_rows=predict_rows,
+                filter_features_dict=filter_features_dict,
+                filter_features=filter_features,
+                predict_feature=predict_feature,
+                convert_to_type=convert_to_type,
+                include_failed_conversions=include_failed_conversions,
+                value_for_missing=value_for_missing,
+                check_missing_predict_feature=check_missing_predict_feature)
+
+        rounder = ValueRounder(
+            precision=precision,
+            dtype=dtype)
+        use_predict_rows = rounder.round_rows(
+            use_predict_rows)
 
         err = ("converted rows={} to use_rows={}").format(
             len(predict_rows),
@@ -211,26 +835,31 @@ def generate_ai_request(
 
         log.info(err)
 
-        body["label"] = use_model_name
-        body["predict_feature"] = predict_feature
-        body["predict_rows"] = use_predict_rows
-        body["publish_to_core"] = publish_to_core
-        body["seed"] = seed
-        body["test_size"] = test_size
-        body["batch_size"] = batch_size
-        body["epochs"] = epochs
-        body["num_splits"] = num_splits
-        body["loss"] = loss
-        body["optimizer"] = optimizer
-        body["metrics"] = metrics
-        body["histories"] = histories
-        body["ml_type"] = ml_type
-        if sort_values:
-            body["sort_values"] = sort_values
-        if filter_features:
-            body["features_to_process"] = filter_features
-        if ignore_features:
-            body["ignore_features"] = ignore_features
+        set_request_values(
+            body=body,
+            use_model_name=use_model_name,
+            predict_feature=predict_feature,
+            publish_to_core=publish_to_core,
+            seed=seed,
+            test_size=test_size,
+            batch_size=batch_size,
+            epochs=epochs,
+            num_splits=num_splits,
+            loss=loss,
+            optimizer=optimizer,
+            metrics=metrics,
+            histories=histories,
+            ml_type=ml_type,
+            sort_values=sort_values,
+            filter_features=filter_features,
+            ignore_features=ignore_features)
+        set_predict_rows(
+            body=body,
+            predict_rows=use_predict_rows,
+            predict_format=predict_format,
+            columns=schema.get_columns(),
+            default=rounder.round_value(
+                schema.missing_value))
 
         data = body
 
@@ -0,0 +1,173 @@
+import os
+import json
+import math
+import threading
+from spylunking.log.setup_logging import console_logger
+
+
+log = console_logger(
+    name='job_estimator')
+
+
+class JobDurationEstimator:
+
+    """
+
+    Online estimate of how long jobs take to finish
+
+    Durations are tracked as an exponentially weighted moving
+    average keyed by the model ``label`` (``use_model_name``)
+    and a power-of-two bucket of the number of predict rows.
+    Estimates can be saved to a local JSON file so short-lived
+    CLI runs start with what earlier runs learned.
+
+    """
+
+    def __init__(
+            self,
+            path=None,
+            alpha=0.3,
+            min_samples=1):
+        """__init__
+
+        :param path: optional JSON file to load and save estimates
+        :param alpha: weight of the newest duration in the average
+        :param min_samples: samples needed before estimating
+        """
+        self.path = path
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+        self.estimates = {}
+        if self.path:
+            self.load()
+    # end of __init__
+
+    def build_key(
+            self,
+            label,
+            num_rows):
+        """build_key
+
+        :param label: model label or name
+        :param num_rows: number of predict rows in the job
+        """
+        bucket = 0
+        if num_rows and num_rows > 1:
+            bucket = int(math.log(num_rows, 2))
+        return "{}:{}".format(
+            label,
+            bucket)
+    # end of build_key
+
+    def estimate(
+            self,
+            label,
+            num_rows):
+        """estimate
+
+        Expected seconds from submit until the job's result is
+        finished or ``None`` if there is not enough history
+
+        :param label: model label or name
+        :param num_rows: number of predict rows in the job
+        """
+        key = self.build_key(
+            label,
+            num_rows)
+        with self.lock:
+            node = self.estimates.get(
+                key,
+                None)
+        if not node or node["samples"] < self.min_samples:
+            return None
+        return node["seconds"]
+    # end of estimate
+
+    def record(
+            self,
+            label,
+            num_rows,
+            seconds):
+        """record
+
+        Add one observed job duration and save the estimates
+        if a ``path`` is set
+
+        :param label: model label or name
+        :param num_rows: number of predict rows in the job
+        :param seconds: seconds from submit until finished
+        """
+        key = self.build_key(
+            label,
+            num_rows)
+        with self.lock:
+            node = self.estimates.get(
+                key,
+                None)
+            if not node:
+                node = {
+                    "seconds": float(seconds),
+                    "samples": 0
+                }
+                self.estimates[key] = node
+            else:
+                node["seconds"] = (
+                    self.alpha * float(seconds) +
+                    (1.0 - self.alpha) * node["seconds"])
+            node["samples"] += 1
+        if self.path:
+            self.save()
+    # end of record
+
+    def load(
+            self):
+        """load
+
+        Load estimates from ``path`` - a missing or unreadable
+        file starts with empty estimates
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                estimates = json.loads(f.read())
+            with self.lock:
+                self.estimates = estimates
+        except Exception as e:
+            log.error(("failed loading job estimates path={} ex={}")
+                      .format(
+                        self.path,
+                        e))
+    # end of load
+
+    def save(
+            self):
+        """save
+
+        Write estimates to ``path`` with an atomic rename so
+        concurrent CLI runs never read a partial file
+        """
+        with self.lock:
+            data = json.dumps(self.estimates)
+        tmp_path = "{}.{}.{}.tmp".format(
+            self.path,
+            os.getpid(),
+            threading.get_ident())
+        try:
+            use_dir = os.path.dirname(self.path)
+            if use_dir and not os.path.exists(use_dir):
+                os.makedirs(use_dir)
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(
+                tmp_path,
+                self.path)
+        except Exception as e:
+            log.error(("failed saving job estimates path={} ex={}")
+                      .format(
+                        self.path,
+                        e))
+    # end of save
+
+# end of JobDurationEstimator
@@ -0,0 +1,203 @@
+import json
+import math
+import importlib
+from spylunking.log.setup_logging import console_logger
+from antinex_client.consts import ANTINEX_JSON_BACKEND
+
+
+log = console_logger(
+    name='json_codec')
+
+
+def has_non_finite(
+        data):
+    """has_non_finite
+
+    ``True`` if ``data`` holds a ``NaN`` or infinite float anywhere
+
+    :param data: object to check
+    """
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, dict):
+        return any(has_non_finite(v) for v in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(has_non_finite(v) for v in data)
+    return False
+# end of has_non_finite
+
+
+SUPPORTED_BACKENDS = [
+    "orjson",
+    "ujson",
+    "rapidjson",
+    "json"
+]
+
+
+class JSONCodec:
+
+    """
+
+    Encode request bodies to ``bytes`` and decode ``bytes``
+    responses with the fastest installed JSON library
+
+    ``orjson``, ``ujson`` and ``rapidjson`` are used when
+    installed (in that order) and the stdlib ``json`` module is
+    the fallback. Bodies a fast library cannot encode (like
+    ``numpy`` values or non-finite floats with ``ujson``) are
+    encoded with the stdlib so results match ``json.dumps``.
+    ``orjson`` writes ``NaN`` and ``Infinity`` as ``null`` so any
+    ``orjson`` output holding a ``null`` is checked for
+    non-finite floats and re-encoded with the stdlib if it has any.
+
+    """
+
+    def __init__(
+            self,
+            backend=ANTINEX_JSON_BACKEND):
+        """__init__
+
+        :param backend: ``auto`` or one of ``SUPPORTED_BACKENDS``
+        """
+        self.backend = "json"
+        self.module = json
+        use_backends = SUPPORTED_BACKENDS
+        if backend and backend != "auto":
+            if backend not in SUPPORTED_BACKENDS:
+                raise ValueError(
+                    "unsupported json backend={} use one of {}".format(
+                        backend,
+                        SUPPORTED_BACKENDS))
+            use_backends = [backend]
+        for name in use_backends:
+            if name == "json":
+                break
+            try:
+                self.module = importlib.import_module(name)
+                self.backend = name
+                break
+            except ImportError:
+                if backend == name:
+                    log.error(("json backend={} is not installed "
+                               "using json")
+                              .format(
+                                name))
+        # end of finding the first installed backend
+    # end of __init__
+
+    def dumps(
+            self,
+            data):
+        """dumps
+
+        Encode ``data`` to UTF-8 JSON ``bytes``
+
+        :param data: object to encode
+        """
+        try:
+            if self.backend == "orjson":
+                encoded = self.module.dumps(
+                    data,
+                    option=self.module.OPT_NON_STR_KEYS)
+                # keep NaN and Infinity like json.dumps
+                if b"null" not in encoded or not has_non_finite(data):
+                    return encoded
+                return json.dumps(data).encode("utf-8")
+            if self.backend == "ujson":
+                return self.module.dumps(
+                    data,
+                    ensure_ascii=False,
+                    escape_forward_slashes=False).encode("utf-8")
+            if self.backend == "rapidjson":
+                return self.module.dumps(
+                    data,
+                    ensure_ascii=False).encode("utf-8")
+        except (TypeError, ValueError, OverflowError):
+            pass
+        return json.dumps(data).encode("utf-8")
+    # end of dumps
+
+    def pretty(
+            self,
+            data):
+        """pretty
+
+        Encode ``data`` with sorted keys and indentation for logs -
+        ``orjson`` indents by 2 spaces and the stdlib by 4
+
+        :param data: object to encode
+        """
+        if self.backend == "orjson":
+            try:
+                encoded = self.module.dumps(
+                    data,
+                    option=(
+                        self.module.OPT_NON_STR_KEYS |
+                        self.module.OPT_SORT_KEYS |
+                        self.module.OPT_INDENT_2))
+                if b"null" not in encoded or not has_non_finite(data):
+                    return encoded
+            except (TypeError, ValueError, OverflowError):
+                pass
+        return json.dumps(
+            data,
+            sort_keys=True,
+            indent=4,
+            separators=(',', ': ')).encode("utf-8")
+    # end of pretty
+
+    def loads(
+            self,
+            data):
+        """loads
+
+        Decode JSON from ``bytes`` or ``str``
+
+        :param data: JSON document
+        """
+        if self.backend == "json":
+            return json.loads(data)
+        return self.module.loads(data)
+    # end of loads
+
+# end of JSONCodec
+
+
+codec = JSONCodec()
+
+
+def dumps(
+        data):
+    """dumps
+
+    Encode ``data`` to JSON ``bytes`` with the default codec
+
+    :param data: object to encode
+    """
+    return codec.dumps(data)
+# end of dumps
+
+
+def pretty(
+        data):
+    """pretty
+
+    Encode ``data`` for logs with the default codec
+
+    :param data: object to encode
+    """
+    return codec.pretty(data)
+# end of pretty
+
+
+def loads(
+        data):
+    """loads
+
+    Decode JSON ``bytes`` or ``str`` with the default codec
+
+    :param data: JSON document
+    """
+    return codec.loads(data)
+# end of loads
@@ -0,0 +1,174 @@
+import random
+from antinex_client.consts import ANTINEX_POLL_FLOOR
+from antinex_client.consts import ANTINEX_POLL_CEILING
+from antinex_client.consts import ANTINEX_POLL_MULTIPLIER
+from antinex_client.consts import ANTINEX_POLL_JITTER
+from antinex_client.consts import ANTINEX_POLL_FAST_POLLS
+from antinex_client.consts import ANTINEX_POLL_FAST_SLEEP
+
+
+class PollPolicy:
+
+    """
+
+    Exponential backoff with jitter for polling waits
+
+    The first ``fast_polls`` sleeps use ``fast_sleep`` so short
+    jobs are picked up quickly, then each sleep grows from
+    ``floor`` by ``multiplier`` until it reaches ``ceiling``.
+    Every sleep is reduced by a random amount of up to
+    ``jitter`` (as a fraction) so many clients polling the same
+    API do not line up into synchronized load spikes.
+
+    Policies are stateless - ``get_sleep`` only depends on the
+    attempt number - so one policy can be shared across waits.
+
+    """
+
+    def __init__(
+            self,
+            floor=ANTINEX_POLL_FLOOR,
+            ceiling=ANTINEX_POLL_CEILING,
+            multiplier=ANTINEX_POLL_MULTIPLIER,
+            jitter=ANTINEX_POLL_JITTER,
+            fast_polls=ANTINEX_POLL_FAST_POLLS,
+            fast_sleep=ANTINEX_POLL_FAST_SLEEP,
+            seed=None):
+        """__init__
+
+        :param floor: smallest sleep in seconds after the fast polls
+        :param ceiling: largest sleep in seconds
+        :param multiplier: growth factor between sleeps
+        :param jitter: fraction of each sleep to randomly remove
+                       (``0.0`` disables jitter)
+        :param fast_polls: number of quick polls to start with
+        :param fast_sleep: seconds to sleep for the quick polls
+        :param seed: optional seed for reproducible jitter
+        """
+        self.floor = floor
+        self.ceiling = ceiling
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.fast_polls = fast_polls
+        self.fast_sleep = fast_sleep
+        self.rand = random.Random(seed)
+    # end of __init__
+
+    def get_base_sleep(
+            self,
+            attempt):
+        """get_base_sleep
+
+        Sleep before jitter is applied
+
+        :param attempt: number of polls made so far (starts at 1)
+        """
+        if attempt <= self.fast_polls:
+            return min(self.fast_sleep, self.ceiling)
+        exponent = attempt - self.fast_polls - 1
+        base = self.floor
+        # stop multiplying once past the ceiling to avoid overflows
+        while exponent > 0 and base < self.ceiling:
+            base *= self.multiplier
+            exponent -= 1
+        return min(base, self.ceiling)
+    # end of get_base_sleep
+
+    def get_sleep(
+            self,
+            attempt):
+        """get_sleep
+
+        Seconds to sleep after poll number ``attempt``
+
+        :param attempt: number of polls made so far (starts at 1)
+        """
+        base = self.get_base_sleep(attempt)
+        if self.jitter <= 0.0:
+            return base
+        return base * (1.0 - self.jitter * self.rand.random())
+    # end of get_sleep
+
+    def __repr__(
+            self):
+        """__repr__"""
+        return ("PollPolicy(floor={} ceiling={} multiplier={} "
+                "jitter={} fast_polls={} fast_sleep={})").format(
+                    self.floor,
+                    self.ceiling,
+                    self.multiplier,
+                    self.jitter,
+                    self.fast_polls,
+                    self.fast_sleep)
+    # end of __repr__
+
+# end of PollPolicy
+
+
+class FixedPollPolicy(PollPolicy):
+
+    """
+
+    Sleep the same number of seconds between every poll
+
+    """
+
+    def __init__(
+            self,
+            sec_to_sleep=5.0):
+        """__init__
+
+        :param sec_to_sleep: seconds to sleep between polls
+        """
+        super(FixedPollPolicy, self).__init__(
+            floor=sec_to_sleep,
+            ceiling=sec_to_sleep,
+            multiplier=1.0,
+            jitter=0.0,
+            fast_polls=0,
+            fast_sleep=sec_to_sleep)
+        self.sec_to_sleep = sec_to_sleep
+    # end of __init__
+
+    def get_sleep(
+            self,
+            attempt):
+        """get_sleep
+
+        :param attempt: number of polls made so far (starts at 1)
+        """
+        return self.sec_to_sleep
+    # end of get_sleep
+
+    def __repr__(
+            self):
+        """__repr__"""
+        return "FixedPollPolicy(sec_to_sleep={})".format(
+            self.sec_to_sleep)
+    # end of __repr__
+
+# end of FixedPollPolicy
+
+
+def build_poll_policy(
+        sec_to_sleep=None,
+        poll_policy=None,
+        default_policy=None):
+    """build_poll_policy
+
+    Pick the policy for a wait call: an explicit ``poll_policy``
+    wins, then a fixed ``sec_to_sleep``, then ``default_policy``
+
+    :param sec_to_sleep: optional fixed seconds between polls
+    :param poll_policy: optional ``PollPolicy``
+    :param default_policy: policy to use when neither is set
+    """
+    if poll_policy:
+        return poll_policy
+    if sec_to_sleep is not None:
+        return FixedPollPolicy(
+            sec_to_sleep=sec_to_sleep)
+    if default_policy:
+        return default_policy
+    return PollPolicy()
+# end of build_poll_policy
@@ -0,0 +1,95 @@
+import math
+import numpy as np
+
+
+DTYPE_FLOAT64 = "float64"
+DTYPE_FLOAT32 = "float32"
+SUPPORTED_DTYPES = [
+    DTYPE_FLOAT64,
+    DTYPE_FLOAT32
+]
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+
+class ValueRounder:
+
+    """
+
+    Shorten the float values of converted predict rows before they
+    are encoded
+
+    ``float32`` keeps the shortest decimal that reads back as the
+    same 32-bit float (``0.1`` instead of ``0.100000001...``) and
+    ``precision`` rounds to that many significant digits. Both can
+    be used together. Integers, strings, non-finite floats and
+    values too large for a 32-bit float are never changed.
+
+    """
+
+    def __init__(
+            self,
+            precision=0,
+            dtype=DTYPE_FLOAT64):
+        """__init__
+
+        :param precision: significant digits to keep - ``0`` keeps
+                          every digit
+        :param dtype: ``float64`` or ``float32``
+        """
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(
+                "unsupported dtype={} use one of {}".format(
+                    dtype,
+                    SUPPORTED_DTYPES))
+        self.precision = int(precision or 0)
+        self.dtype = dtype
+        self.use_float32 = dtype == DTYPE_FLOAT32
+        self.fmt = None
+        if self.precision > 0:
+            self.fmt = "{{:.{}g}}".format(
+                self.precision)
+    # end of __init__
+
+    def is_enabled(
+            self):
+        """is_enabled"""
+        return self.use_float32 or self.fmt is not None
+    # end of is_enabled
+
+    def round_value(
+            self,
+            value):
+        """round_value
+
+        :param value: converted cell value
+        """
+        if type(value) is not float or not math.isfinite(value):
+            return value
+        use_value = value
+        if self.use_float32 and abs(use_value) <= FLOAT32_MAX:
+            use_value = float(str(np.float32(use_value)))
+        if self.fmt:
+            use_value = float(self.fmt.format(use_value))
+        return use_value
+    # end of round_value
+
+    def round_rows(
+            self,
+            predict_rows):
+        """round_rows
+
+        :param predict_rows: list of converted predict rows
+        """
+        if not self.is_enabled():
+            return predict_rows
+        round_value = self.round_value
+        return [
+            {
+                k: round_value(v)
+                for k, v in r.items()
+            }
+            for r in predict_rows
+        ]
+    # end of round_rows
+
+# end of ValueRounder
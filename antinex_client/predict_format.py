@@ -0,0 +1,304 @@
+import operator
+
+
+PREDICT_FORMAT_ROWS = "rows"
+PREDICT_FORMAT_COLUMNAR = "columnar"
+PREDICT_FORMAT_SPARSE = "sparse"
+SUPPORTED_PREDICT_FORMATS = [
+    PREDICT_FORMAT_ROWS,
+    PREDICT_FORMAT_COLUMNAR,
+    PREDICT_FORMAT_SPARSE
+]
+
+
+class ColumnarEncoder:
+
+    """
+
+    Pack converted predict rows into value arrays that share one
+    ``predict_columns`` header instead of repeating every feature
+    name in every row
+
+    A row with exactly the header's keys is sent as a list of its
+    values in header order. Any other row (like one with a
+    dropped failed conversion) is sent as-is as an object so no
+    row is ever changed by the encoding.
+
+    """
+
+    def __init__(
+            self,
+            columns):
+        """__init__
+
+        :param columns: list of feature names in the header
+        """
+        self.columns = list(columns)
+        self.num_columns = len(self.columns)
+        self.get_values = None
+        if self.num_columns > 1:
+            self.get_values = operator.itemgetter(
+                *self.columns)
+    # end of __init__
+
+    def get_header(
+            self):
+        """get_header
+
+        Request fields that describe the ``predict_values``
+        """
+        return {
+            "predict_format": PREDICT_FORMAT_COLUMNAR,
+            "predict_columns": self.columns
+        }
+    # end of get_header
+
+    def encode_row(
+            self,
+            row):
+        """encode_row
+
+        :param row: converted predict row dictionary
+        """
+        if len(row) != self.num_columns:
+            return row
+        try:
+            if self.get_values:
+                return list(self.get_values(row))
+            if self.num_columns == 1:
+                return [row[self.columns[0]]]
+            return []
+        except KeyError:
+            return row
+    # end of encode_row
+
+    def encode_rows(
+            self,
+            predict_rows):
+        """encode_rows
+
+        :param predict_rows: list of converted predict rows
+        """
+        return [
+            self.encode_row(r)
+            for r in predict_rows
+        ]
+    # end of encode_rows
+
+# end of ColumnarEncoder
+
+
+class SparseEncoder(ColumnarEncoder):
+
+    """
+
+    Columnar encoding that only sends the values that are not the
+    ``predict_default`` (the converted ``value_for_missing``)
+
+    Each row is a flat ``[index, value, index, value...]`` list of
+    the header columns holding other values. Network capture rows
+    usually only fill one protocol's columns so most of each row
+    is left out. A value only matches the default if it has the
+    same type so ``1`` and ``1.0`` are never mixed up.
+
+    """
+
+    def __init__(
+            self,
+            columns,
+            default):
+        """__init__
+
+        :param columns: list of feature names in the header
+        :param default: value left out of the rows
+        """
+        super(SparseEncoder, self).__init__(
+            columns)
+        self.default = default
+        self.default_type = type(default)
+    # end of __init__
+
+    def get_header(
+            self):
+        """get_header
+
+        Request fields that describe the ``predict_values``
+        """
+        return {
+            "predict_format": PREDICT_FORMAT_SPARSE,
+            "predict_columns": self.columns,
+            "predict_default": self.default
+        }
+    # end of get_header
+
+    def encode_row(
+            self,
+            row):
+        """encode_row
+
+        :param row: converted predict row dictionary
+        """
+        values = super(SparseEncoder, self).encode_row(
+            row)
+        if not isinstance(values, list):
+            return values
+        default = self.default
+        default_type = self.default_type
+        sparse_values = []
+        for idx, v in enumerate(values):
+            if v != default or type(v) is not default_type:
+                sparse_values.append(idx)
+                sparse_values.append(v)
+        return sparse_values
+    # end of encode_row
+
+# end of SparseEncoder
+
+
+def build_encoder(
+        predict_format,
+        columns,
+        default=None):
+    """build_encoder
+
+    Get the encoder for the ``predict_format`` or ``None`` for
+    ``rows``
+
+    :param predict_format: one of ``SUPPORTED_PREDICT_FORMATS``
+    :param columns: list of feature names in the header
+    :param default: value left out of ``sparse`` rows
+    """
+    if predict_format == PREDICT_FORMAT_ROWS:
+        return None
+    if predict_format == PREDICT_FORMAT_COLUMNAR:
+        return ColumnarEncoder(
+            columns)
+    if predict_format == PREDICT_FORMAT_SPARSE:
+        return SparseEncoder(
+            columns,
+            default)
+    raise ValueError(
+        "unsupported predict_format={} use one of {}".format(
+            predict_format,
+            SUPPORTED_PREDICT_FORMATS))
+# end of build_encoder
+
+
+def expand_sparse_row(
+        values,
+        columns,
+        default):
+    """expand_sparse_row
+
+    Reference expander for one ``sparse`` row
+
+    :param values: flat ``[index, value...]`` list
+    :param columns: list of feature names in the header
+    :param default: value for the columns left out
+    """
+    row_values = [default] * len(columns)
+    for pos in range(0, len(values), 2):
+        row_values[values[pos]] = values[pos + 1]
+    return dict(zip(
+        columns,
+        row_values))
+# end of expand_sparse_row
+
+
+def set_predict_rows(
+        body,
+        predict_rows,
+        predict_format=PREDICT_FORMAT_ROWS,
+        columns=None,
+        default=None):
+    """set_predict_rows
+
+    Store converted rows in the request ``body`` with the
+    ``predict_format`` encoding
+
+    :param body: request dictionary to update
+    :param predict_rows: list of converted predict rows
+    :param predict_format: one of ``SUPPORTED_PREDICT_FORMATS``
+    :param columns: header for ``columnar`` and ``sparse`` -
+                    defaults to the first row's keys
+    :param default: value left out of ``sparse`` rows
+    """
+    use_columns = columns
+    if use_columns is None:
+        use_columns = list(predict_rows[0]) if predict_rows else []
+    encoder = build_encoder(
+        predict_format=predict_format,
+        columns=use_columns,
+        default=default)
+    if not encoder:
+        body["predict_rows"] = predict_rows
+        return body
+    body.pop(
+        "predict_rows",
+        None)
+    body.update(encoder.get_header())
+    body["predict_values"] = encoder.encode_rows(
+        predict_rows)
+    return body
+# end of set_predict_rows
+
+
+def decode_predict_rows(
+        body):
+    """decode_predict_rows
+
+    Server side helper that turns a ``columnar`` or ``sparse``
+    request back into the ``predict_rows`` list of dictionaries -
+    other requests are returned unchanged
+
+    :param body: decoded request dictionary
+    """
+    predict_format = body.get(
+        "predict_format",
+        None)
+    if predict_format not in [
+            PREDICT_FORMAT_COLUMNAR,
+            PREDICT_FORMAT_SPARSE]:
+        return body
+    use_body = dict(body)
+    use_body.pop(
+        "predict_format")
+    columns = use_body.pop(
+        "predict_columns",
+        [])
+    default = use_body.pop(
+        "predict_default",
+        None)
+    predict_rows = []
+    for values in use_body.pop("predict_values", []):
+        if not isinstance(values, list):
+            predict_rows.append(values)
+        elif predict_format == PREDICT_FORMAT_SPARSE:
+            predict_rows.append(expand_sparse_row(
+                values,
+                columns,
+                default))
+        else:
+            predict_rows.append(dict(zip(
+                columns,
+                values)))
+    use_body["predict_rows"] = predict_rows
+    return use_body
+# end of decode_predict_rows
+
+
+def get_num_predict_rows(
+        body):
+    """get_num_predict_rows
+
+    :param body: request dictionary in any ``predict_format``
+    """
+    rows = body.get(
+        "predict_rows",
+        None)
+    if rows is None:
+        rows = body.get(
+            "predict_values",
+            None)
+    return len(rows or [])
+# end of get_num_predict_rows
@@ -0,0 +1,246 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+import collections
+from spylunking.log.setup_logging import console_logger
+from antinex_client.json_codec import dumps
+from antinex_client.json_codec import loads
+from antinex_client.consts import ANTINEX_PREDICTION_CACHE_MAX_ENTRIES
+
+
+log = console_logger(
+    name='prediction_cache')
+
+
+def build_row_key(
+        label,
+        row):
+    """build_row_key
+
+    Hash of the model label and the converted row's features -
+    the key order of the row does not change the hash. The row is
+    always hashed from the stdlib's canonical JSON so every JSON
+    backend builds the same key for a shared ``db_file`` and
+    ``NaN`` never hashes like ``None``.
+
+    :param label: model label or ``use_model_name``
+    :param row: converted predict row dictionary
+    """
+    data = json.dumps(
+        [label, row],
+        sort_keys=True,
+        separators=(",", ":"))
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+# end of build_row_key
+
+
+class PredictionCache:
+
+    """
+
+    Predictions for converted predict rows keyed by the model
+    label and a hash of the row's features
+
+    Recent predictions are kept in an in-memory LRU of at most
+    ``max_entries`` rows. With a ``db_file`` every prediction is
+    also stored in a local ``sqlite`` file so later runs and other
+    processes can reuse it - disk hits are moved back into memory.
+
+    """
+
+    def __init__(
+            self,
+            max_entries=ANTINEX_PREDICTION_CACHE_MAX_ENTRIES,
+            db_file=None):
+        """__init__
+
+        :param max_entries: max predictions kept in memory
+        :param db_file: optional ``sqlite`` file for the disk tier -
+                        ``~`` is expanded
+        """
+        self.max_entries = max_entries
+        self.db_file = None
+        if db_file:
+            self.db_file = os.path.expanduser(db_file)
+        self.lock = threading.Lock()
+        self.memory = collections.OrderedDict()
+        self.db = None
+        self.hits = 0
+        self.misses = 0
+        if self.db_file:
+            self.open_db()
+    # end of __init__
+
+    def open_db(
+            self):
+        """open_db"""
+        try:
+            use_dir = os.path.dirname(self.db_file)
+            if use_dir and not os.path.exists(use_dir):
+                os.makedirs(use_dir, mode=0o700)
+            self.db = sqlite3.connect(
+                self.db_file,
+                timeout=30.0,
+                check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "key TEXT PRIMARY KEY, "
+                "label TEXT, "
+                "prediction TEXT)")
+            self.db.commit()
+        except Exception as e:
+            log.error(("failed opening prediction cache db={} ex={}")
+                      .format(
+                        self.db_file,
+                        e))
+            self.db = None
+    # end of open_db
+
+    def close(
+            self):
+        """close"""
+        with self.lock:
+            if self.db:
+                self.db.close()
+                self.db = None
+    # end of close
+
+    def remember(
+            self,
+            key,
+            prediction):
+        """remember
+
+        Add to the in-memory LRU - the caller holds the ``lock``
+
+        :param key: row key
+        :param prediction: prediction for the row
+        """
+        self.memory[key] = prediction
+        self.memory.move_to_end(key)
+        while self.max_entries > 0 and len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+    # end of remember
+
+    def get_many(
+            self,
+            keys):
+        """get_many
+
+        Look up many rows at once - returns a dictionary of the
+        keys that were found
+
+        :param keys: list of row keys from ``build_row_key``
+        """
+        found = {}
+        with self.lock:
+            missing = []
+            for key in keys:
+                if key in found:
+                    continue
+                prediction = self.memory.get(
+                    key,
+                    None)
+                if prediction is not None:
+                    self.memory.move_to_end(key)
+                    found[key] = prediction
+                else:
+                    missing.append(key)
+            if self.db and missing:
+                for pos in range(0, len(missing), 500):
+                    use_keys = missing[pos:pos + 500]
+                    try:
+                        cursor = self.db.execute(
+                            ("SELECT key, prediction FROM predictions "
+                             "WHERE key IN ({})").format(
+                                ",".join(["?"] * len(use_keys))),
+                            use_keys)
+                        for key, data in cursor.fetchall():
+                            found[key] = loads(data)
+                            self.remember(
+                                key,
+                                found[key])
+                    except Exception as e:
+                        log.error(("failed reading prediction cache "
+                                   "db={} ex={}")
+                                  .format(
+                                    self.db_file,
+                                    e))
+                        break
+                # end of reading the disk tier in batches
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+    # end of get_many
+
+    def set_many(
+            self,
+            label,
+            items):
+        """set_many
+
+        :param label: model label for the predictions
+        :param items: list of ``(key, prediction)`` tuples
+        """
+        with self.lock:
+            for key, prediction in items:
+                self.remember(
+                    key,
+                    prediction)
+            if self.db and items:
+                try:
+                    self.db.executemany(
+                        ("INSERT OR REPLACE INTO predictions "
+                         "(key, label, prediction) VALUES (?, ?, ?)"),
+                        [
+                            (key, label, dumps(prediction).decode("utf-8"))
+                            for key, prediction in items
+                        ])
+                    self.db.commit()
+                except Exception as e:
+                    log.error(("failed writing prediction cache "
+                               "db={} ex={}")
+                              .format(
+                                self.db_file,
+                                e))
+    # end of set_many
+
+    def clear(
+            self,
+            label=None):
+        """clear
+
+        Drop every prediction - or only the disk predictions for
+        one ``label`` and all of memory
+
+        :param label: optional model label to drop
+        """
+        with self.lock:
+            self.memory.clear()
+            if self.db:
+                if label is None:
+                    self.db.execute(
+                        "DELETE FROM predictions")
+                else:
+                    self.db.execute(
+                        "DELETE FROM predictions WHERE label = ?",
+                        (label,))
+                self.db.commit()
+    # end of clear
+
+    def get_stats(
+            self):
+        """get_stats"""
+        with self.lock:
+            return {
+                "entries": len(self.memory),
+                "hits": self.hits,
+                "misses": self.misses,
+                "db_file": self.db_file
+            }
+    # end of get_stats
+
+# end of PredictionCache
@@ -0,0 +1,337 @@
+import threading
+import collections
+import pandas as pd
+from spylunking.log.setup_logging import console_logger
+from antinex_client.consts import SUCCESS
+from antinex_client.predict_format import get_num_predict_rows
+
+
+log = console_logger(
+    name='prediction_merger')
+
+
+def get_num_rows(
+        body):
+    """get_num_rows
+
+    :param body: request dictionary or ``EncodedRequest``
+    """
+    if isinstance(body, dict):
+        return get_num_predict_rows(
+            body)
+    return getattr(
+        body,
+        "num_rows",
+        0)
+# end of get_num_rows
+
+
+class PredictionMerger:
+
+    """
+
+    Reassemble the predictions of one logical batch that was
+    split across many ``run_job`` calls
+
+    Each chunk is tracked by the ``offset`` of its first row and
+    its number of rows. Predictions can be added in any order as
+    jobs finish and are always handed back in the original row
+    order. Partial results are available while slower chunks
+    are still running with ``pop_ready`` (the finished rows
+    before the first unfinished chunk) or ``get_predictions``
+    and ``get_df`` (all finished rows). Chunks handed back by
+    ``pop_ready`` are dropped so a long stream does not keep
+    every prediction in memory.
+
+    Typical use with chunked requests::
+
+        merger = PredictionMerger()
+        job_ids = []
+        for res in client.submit_many(
+                merger.track(generate_ai_requests_iter(rows))):
+            job_ids.append(merger.add_job(res))
+        for job_id, res in client.iter_jobs_to_finish(job_ids):
+            merger.add_result(job_id, res)
+        df = merger.get_df()
+
+    """
+
+    def __init__(
+            self,
+            fill_value=None):
+        """__init__
+
+        :param fill_value: value for rows of unfinished chunks when
+                           ``fill_missing`` is set
+        """
+        self.fill_value = fill_value
+        self.lock = threading.Lock()
+        self.next_offset = 0
+        self.ready_offset = 0
+        self.submitted = collections.deque()
+        self.sizes = {}
+        self.chunks = {}
+        self.jobs = {}
+        self.failed = {}
+    # end of __init__
+
+    def track_body(
+            self,
+            body):
+        """track_body
+
+        Record the rows of a request before it is submitted and
+        return its ``(offset, num_rows)``. ``EncodedRequest``
+        bodies keep their ``offset`` and dictionaries follow the
+        previous body.
+
+        :param body: request dictionary or ``EncodedRequest``
+        """
+        num_rows = get_num_rows(
+            body)
+        with self.lock:
+            offset = getattr(
+                body,
+                "offset",
+                None)
+            if offset is None:
+                offset = self.next_offset
+            self.next_offset = max(
+                self.next_offset,
+                offset + num_rows)
+            self.sizes[offset] = num_rows
+            self.submitted.append((offset, num_rows))
+        return offset, num_rows
+    # end of track_body
+
+    def track(
+            self,
+            bodies):
+        """track
+
+        Lazily ``track_body`` each request as it is consumed - pass
+        this to ``submit_many`` and then each response in order to
+        ``add_job``
+
+        :param bodies: iterable of requests
+        """
+        for body in bodies:
+            self.track_body(
+                body)
+            yield body
+    # end of track
+
+    def add_job(
+            self,
+            response,
+            offset=None,
+            num_rows=None):
+        """add_job
+
+        Map a ``run_job`` response to its chunk and return the
+        MLJob.id or ``None`` if the job failed to start. Without an
+        ``offset`` the oldest tracked body is used so responses
+        must be added in submission order.
+
+        :param response: ``run_job`` response
+        :param offset: optional index of the chunk's first row
+        :param num_rows: optional number of rows in the chunk
+        """
+        with self.lock:
+            if offset is None:
+                if not self.submitted:
+                    log.error(("job response without a tracked body "
+                               "error={}")
+                              .format(
+                                response["error"]))
+                    return None
+                offset, num_rows = self.submitted.popleft()
+            else:
+                if num_rows is None:
+                    num_rows = self.sizes.get(
+                        offset,
+                        0)
+                self.sizes[offset] = num_rows
+                self.next_offset = max(
+                    self.next_offset,
+                    offset + num_rows)
+            if response["status"] != SUCCESS:
+                log.error(("chunk offset={} rows={} failed to start "
+                           "error={}")
+                          .format(
+                            offset,
+                            num_rows,
+                            response["error"]))
+                self.failed[offset] = response["error"]
+                return None
+            job_id = response["data"]["job"]["id"]
+            self.jobs[job_id] = offset
+        return job_id
+    # end of add_job
+
+    def add_predictions(
+            self,
+            offset,
+            predictions):
+        """add_predictions
+
+        :param offset: index of the chunk's first row
+        :param predictions: list of predictions for the chunk
+        """
+        use_predictions = list(predictions)
+        with self.lock:
+            if offset < self.ready_offset:
+                log.error(("chunk offset={} was already returned "
+                           "by pop_ready")
+                          .format(
+                            offset))
+                return
+            num_rows = self.sizes.get(
+                offset,
+                None)
+            if num_rows is None:
+                num_rows = len(use_predictions)
+                self.sizes[offset] = num_rows
+                self.next_offset = max(
+                    self.next_offset,
+                    offset + num_rows)
+            elif num_rows != len(use_predictions):
+                log.error(("chunk offset={} sent rows={} "
+                           "but got predictions={}")
+                          .format(
+                            offset,
+                            num_rows,
+                            len(use_predictions)))
+            self.chunks[offset] = use_predictions
+            self.failed.pop(
+                offset,
+                None)
+    # end of add_predictions
+
+    def add_result(
+            self,
+            job_id,
+            response):
+        """add_result
+
+        Add the predictions from a ``wait_for_job_to_finish`` or
+        ``iter_jobs_to_finish`` response - returns ``True`` if the
+        chunk's predictions were added
+
+        :param job_id: MLJob.id returned by ``add_job``
+        :param response: finished job response
+        """
+        offset = self.jobs.get(
+            job_id,
+            None)
+        if offset is None:
+            log.error(("job.id={} is not tracked")
+                      .format(
+                        job_id))
+            return False
+        result = None
+        if response["status"] == SUCCESS and response["data"]:
+            result = response["data"].get(
+                "result",
+                None)
+        if not result:
+            with self.lock:
+                self.failed[offset] = response["error"] or "missing result"
+            return False
+        predictions_json = result.get(
+            "predictions_json",
+            None) or {}
+        self.add_predictions(
+            offset,
+            predictions_json.get(
+                "predictions",
+                []))
+        return True
+    # end of add_result
+
+    def is_done(
+            self):
+        """is_done
+
+        ``True`` once every tracked chunk has predictions
+        """
+        with self.lock:
+            return len(self.chunks) == len(self.sizes)
+    # end of is_done
+
+    def get_pending(
+            self):
+        """get_pending
+
+        Sorted offsets of chunks without predictions
+        """
+        with self.lock:
+            return sorted(
+                offset
+                for offset in self.sizes
+                if offset not in self.chunks)
+    # end of get_pending
+
+    def get_predictions(
+            self,
+            fill_missing=False):
+        """get_predictions
+
+        All finished predictions in the original row order
+
+        :param fill_missing: keep row positions by using
+                             ``fill_value`` for unfinished chunks
+        """
+        predictions = []
+        with self.lock:
+            for offset in sorted(self.sizes):
+                chunk = self.chunks.get(
+                    offset,
+                    None)
+                if chunk is not None:
+                    predictions.extend(chunk)
+                elif fill_missing:
+                    predictions.extend(
+                        [self.fill_value] * self.sizes[offset])
+        return predictions
+    # end of get_predictions
+
+    def pop_ready(
+            self):
+        """pop_ready
+
+        Return the predictions finished since the last call that
+        come before the first unfinished chunk - returned chunks
+        are dropped from the merger
+        """
+        predictions = []
+        with self.lock:
+            while self.ready_offset in self.chunks:
+                offset = self.ready_offset
+                predictions.extend(self.chunks.pop(offset))
+                self.ready_offset = offset + self.sizes.pop(offset)
+        return predictions
+    # end of pop_ready
+
+    def get_df(
+            self):
+        """get_df
+
+        Finished predictions in a ``pandas.DataFrame`` indexed by
+        each row's position in the original predict rows
+        """
+        rows = []
+        index = []
+        with self.lock:
+            for offset in sorted(self.chunks):
+                chunk = self.chunks[offset]
+                rows.extend(chunk)
+                index.extend(range(
+                    offset,
+                    offset + len(chunk)))
+        return pd.DataFrame(
+            rows,
+            index=index)
+    # end of get_df
+
+# end of PredictionMerger
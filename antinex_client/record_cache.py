@@ -0,0 +1,391 @@
+import json
+import time
+import threading
+import collections
+import collections.abc
+from antinex_client.consts import ANTINEX_CACHE_MAX_ENTRIES
+from antinex_client.consts import ANTINEX_CACHE_MAX_BYTES
+from antinex_client.consts import ANTINEX_CACHE_TTL
+from antinex_client.consts import ANTINEX_CACHE_EVICTION
+from antinex_client.consts import ANTINEX_CACHE_SUMMARIES_ONLY
+
+
+EVICT_LRU = "lru"
+EVICT_FIFO = "fifo"
+
+
+def summarize_record(
+        record):
+    """summarize_record
+
+    Keep only the scalar fields of a record like ``id``,
+    ``status`` and ``label`` and drop nested payloads like
+    ``predictions_json`` or the job's request
+
+    :param record: record dictionary from the API
+    """
+    if not isinstance(record, dict):
+        return record
+    return {
+        k: v
+        for k, v in record.items()
+        if not isinstance(v, (dict, list))
+    }
+# end of summarize_record
+
+
+def estimate_size(
+        record):
+    """estimate_size
+
+    Estimate the number of bytes a record takes by its
+    serialized JSON length
+
+    :param record: record to measure
+    """
+    try:
+        return len(json.dumps(record))
+    except Exception:
+        return len(str(record))
+# end of estimate_size
+
+
+class RecordCache(collections.abc.MutableMapping):
+
+    """
+
+    Bounded dictionary for the records an ``AIClient`` fetches
+
+    Entries are evicted once there are more than
+    ``max_entries``, once their estimated sizes add up to more
+    than ``max_bytes`` or once they are older than ``ttl``
+    seconds. Eviction order is least recently used (``lru``)
+    or insertion order (``fifo``). Setting any limit to ``0``
+    disables it. With ``summaries_only`` only the scalar fields
+    of each record are kept.
+
+    The cache is a ``MutableMapping`` so it can replace the
+    client's record dictionaries (``cache[key] = value``,
+    ``cache[key]``, ``del``, ``get``, ``in``, ``len``,
+    iteration, ``items``, ``values``, ``pop`` and ``update``)
+    and is safe to share across threads. Iterating, ``keys``,
+    ``items`` and ``values`` work on a snapshot and do not
+    count as hits or misses.
+
+    """
+
+    def __init__(
+            self,
+            max_entries=ANTINEX_CACHE_MAX_ENTRIES,
+            max_bytes=ANTINEX_CACHE_MAX_BYTES,
+            ttl=ANTINEX_CACHE_TTL,
+            eviction=ANTINEX_CACHE_EVICTION,
+            summaries_only=ANTINEX_CACHE_SUMMARIES_ONLY,
+            name="records"):
+        """__init__
+
+        :param max_entries: max number of records - ``0`` is unbounded
+        :param max_bytes: max estimated bytes - ``0`` is unbounded
+        :param ttl: seconds to keep a record - ``0`` keeps it forever
+        :param eviction: ``lru`` or ``fifo``
+        :param summaries_only: only store the scalar record fields
+        :param name: name for the stats
+        """
+        if eviction not in (EVICT_LRU, EVICT_FIFO):
+            raise ValueError(
+                "unsupported eviction={} use lru or fifo".format(
+                    eviction))
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.eviction = eviction
+        self.summaries_only = summaries_only
+        self.name = name
+        self.lock = threading.RLock()
+        # key -> [value, size, stored_at, meta]
+        self.entries = collections.OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    # end of __init__
+
+    def set(
+            self,
+            key,
+            value,
+            size=None,
+            meta=None):
+        """set
+
+        :param key: record key
+        :param value: record to store
+        :param size: optional size in bytes - estimated when
+                     ``max_bytes`` is set and this is ``None``
+        :param meta: optional dictionary stored with the record
+        """
+        if self.summaries_only:
+            value = summarize_record(value)
+            size = None
+        if size is None:
+            if self.max_bytes:
+                size = estimate_size(value)
+            else:
+                size = 0
+        with self.lock:
+            self.remove(key)
+            self.entries[key] = [
+                value,
+                size,
+                time.time(),
+                meta
+            ]
+            self.total_bytes += size
+            self.evict()
+    # end of set
+
+    def __setitem__(
+            self,
+            key,
+            value):
+        """__setitem__
+
+        :param key: record key
+        :param value: record to store
+        """
+        self.set(
+            key,
+            value)
+    # end of __setitem__
+
+    def get_entry(
+            self,
+            key):
+        """get_entry
+
+        Get the ``[value, size, stored_at, meta]`` entry for a key
+        and count the hit or miss - returns ``None`` on a miss
+
+        :param key: record key
+        """
+        with self.lock:
+            entry = self.entries.get(
+                key,
+                None)
+            if entry and self.is_expired(entry):
+                self.remove(key)
+                self.expirations += 1
+                entry = None
+            if not entry:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.eviction == EVICT_LRU:
+                self.entries.move_to_end(key)
+            return entry
+    # end of get_entry
+
+    def touch(
+            self,
+            key):
+        """touch
+
+        Reset the ``stored_at`` time of a record the API confirmed
+        is unchanged so the ``ttl`` starts over - returns ``False``
+        if the record is not cached
+
+        :param key: record key
+        """
+        with self.lock:
+            entry = self.entries.get(
+                key,
+                None)
+            if not entry:
+                return False
+            entry[2] = time.time()
+            return True
+    # end of touch
+
+    def get(
+            self,
+            key,
+            default=None):
+        """get
+
+        :param key: record key
+        :param default: value to return on a miss
+        """
+        entry = self.get_entry(
+            key)
+        if not entry:
+            return default
+        return entry[0]
+    # end of get
+
+    def __getitem__(
+            self,
+            key):
+        """__getitem__
+
+        :param key: record key
+        """
+        entry = self.get_entry(
+            key)
+        if not entry:
+            raise KeyError(key)
+        return entry[0]
+    # end of __getitem__
+
+    def __contains__(
+            self,
+            key):
+        """__contains__ - does not count as a hit or miss
+
+        :param key: record key
+        """
+        with self.lock:
+            entry = self.entries.get(
+                key,
+                None)
+            return bool(entry) and not self.is_expired(entry)
+    # end of __contains__
+
+    def __len__(
+            self):
+        """__len__"""
+        with self.lock:
+            return len(self.entries)
+    # end of __len__
+
+    def __delitem__(
+            self,
+            key):
+        """__delitem__
+
+        :param key: record key
+        """
+        if not self.remove(key):
+            raise KeyError(key)
+    # end of __delitem__
+
+    def __iter__(
+            self):
+        """__iter__ - iterates over a snapshot of the keys"""
+        return iter(self.keys())
+    # end of __iter__
+
+    def keys(
+            self):
+        """keys"""
+        with self.lock:
+            return list(self.entries.keys())
+    # end of keys
+
+    def items(
+            self):
+        """items
+
+        Get a snapshot list of ``(key, record)`` tuples for the
+        records that have not expired
+        """
+        with self.lock:
+            return [
+                (key, entry[0])
+                for key, entry in self.entries.items()
+                if not self.is_expired(entry)
+            ]
+    # end of items
+
+    def values(
+            self):
+        """values
+
+        Get a snapshot list of the records that have not expired
+        """
+        return [
+            value
+            for key, value in self.items()
+        ]
+    # end of values
+
+    def remove(
+            self,
+            key):
+        """remove
+
+        Remove a record without counting it as an eviction
+
+        :param key: record key
+        """
+        with self.lock:
+            entry = self.entries.pop(
+                key,
+                None)
+            if entry:
+                self.total_bytes -= entry[1]
+            return entry
+    # end of remove
+
+    def clear(
+            self):
+        """clear"""
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+    # end of clear
+
+    def is_expired(
+            self,
+            entry):
+        """is_expired
+
+        :param entry: ``[value, size, stored_at, meta]`` entry
+        """
+        if not self.ttl:
+            return False
+        return (time.time() - entry[2]) > self.ttl
+    # end of is_expired
+
+    def evict(
+            self):
+        """evict
+
+        Drop expired records then the oldest records until the
+        cache is within ``max_entries`` and ``max_bytes``
+        """
+        with self.lock:
+            if self.ttl:
+                for key in [
+                        k
+                        for k, entry in self.entries.items()
+                        if self.is_expired(entry)]:
+                    self.remove(key)
+                    self.expirations += 1
+            # always keep the newest record even if it is too large
+            while len(self.entries) > 1 and (
+                    (self.max_entries and
+                     len(self.entries) > self.max_entries) or
+                    (self.max_bytes and
+                     self.total_bytes > self.max_bytes)):
+                key = next(iter(self.entries))
+                self.remove(key)
+                self.evictions += 1
+    # end of evict
+
+    def get_stats(
+            self):
+        """get_stats"""
+        with self.lock:
+            return {
+                "name": self.name,
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+    # end of get_stats
+
+# end of RecordCache
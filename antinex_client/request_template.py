@@ -0,0 +1,407 @@
+from antinex_client.json_codec import dumps
+from antinex_client.generate_ai_request import load_request_body
+from antinex_client.generate_ai_request import RowSchema
+from antinex_client.generate_ai_request import set_request_values
+from antinex_client.generate_ai_request import map_row_batches
+from antinex_client.predict_format import build_encoder
+from antinex_client.precision import ValueRounder
+from antinex_client.consts import ANTINEX_PUBLISH_REQUEST_FILE
+from antinex_client.consts import ANTINEX_FEATURES_TO_PROCESS
+from antinex_client.consts import ANTINEX_IGNORE_FEATURES
+from antinex_client.consts import ANTINEX_SORT_VALUES
+from antinex_client.consts import ANTINEX_ML_TYPE
+from antinex_client.consts import ANTINEX_USE_MODEL_NAME
+from antinex_client.consts import ANTINEX_PREDICT_FEATURE
+from antinex_client.consts import ANTINEX_SEED
+from antinex_client.consts import ANTINEX_TEST_SIZE
+from antinex_client.consts import ANTINEX_BATCH_SIZE
+from antinex_client.consts import ANTINEX_EPOCHS
+from antinex_client.consts import ANTINEX_NUM_SPLITS
+from antinex_client.consts import ANTINEX_LOSS
+from antinex_client.consts import ANTINEX_OPTIMIZER
+from antinex_client.consts import ANTINEX_METRICS
+from antinex_client.consts import ANTINEX_HISTORIES
+from antinex_client.consts import FILTER_FEATURES_DICT
+from antinex_client.consts import FILTER_FEATURES
+from antinex_client.consts import ANTINEX_CONVERT_DATA_TYPE
+from antinex_client.consts import ANTINEX_INCLUDE_FAILED_CONVERSIONS
+from antinex_client.consts import ANTINEX_PUBLISH_TO_CORE
+from antinex_client.consts import ANTINEX_CHECK_MISSING_PREDICT
+from antinex_client.consts import ANTINEX_MISSING_VALUE
+from antinex_client.consts import ANTINEX_REQUEST_MAX_ROWS
+from antinex_client.consts import ANTINEX_REQUEST_MAX_BYTES
+from antinex_client.consts import ANTINEX_CONVERT_WORKERS
+from antinex_client.consts import ANTINEX_CONVERT_BATCH_ROWS
+from antinex_client.consts import ANTINEX_PREDICT_FORMAT
+from antinex_client.consts import ANTINEX_PRECISION
+from antinex_client.consts import ANTINEX_DTYPE
+
+
+class EncodedRequest(bytes):
+
+    """
+
+    JSON encoded request body that remembers the ``label`` and
+    number of predict rows so ``AIClient.run_job`` can learn
+    job durations without decoding it. Chunked requests also
+    remember the ``offset`` of their first row in the original
+    predict rows.
+
+    """
+
+    def __new__(
+            cls,
+            data,
+            label=None,
+            num_rows=0,
+            offset=0):
+        """__new__
+
+        :param data: JSON ``bytes``
+        :param label: model label in the request
+        :param num_rows: number of predict rows in the request
+        :param offset: index of the first row in the original rows
+        """
+        obj = super(EncodedRequest, cls).__new__(
+            cls,
+            data)
+        obj.label = label
+        obj.num_rows = num_rows
+        obj.offset = offset
+        return obj
+    # end of __new__
+
+# end of EncodedRequest
+
+
+class RequestTemplate:
+
+    """
+
+    Compiled ``generate_ai_request`` body for long-running
+    predictors that send many requests with the same model
+
+    Everything except ``predict_rows`` (the model settings,
+    ``features_to_process``, ``sort_values``, ``histories``...)
+    is loaded, filled in and encoded once. Each ``build`` call
+    only converts and encodes the new rows between the prebuilt
+    prefix and suffix bytes. The encoded body is the same
+    request ``generate_ai_request`` builds with the same
+    arguments and can be passed directly to ``run_job``.
+
+    """
+
+    def __init__(
+            self,
+            req_dict=None,
+            req_file=ANTINEX_PUBLISH_REQUEST_FILE,
+            features=ANTINEX_FEATURES_TO_PROCESS,
+            ignore_features=ANTINEX_IGNORE_FEATURES,
+            sort_values=ANTINEX_SORT_VALUES,
+            ml_type=ANTINEX_ML_TYPE,
+            use_model_name=ANTINEX_USE_MODEL_NAME,
+            predict_feature=ANTINEX_PREDICT_FEATURE,
+            seed=ANTINEX_SEED,
+            test_size=ANTINEX_TEST_SIZE,
+            batch_size=ANTINEX_BATCH_SIZE,
+            epochs=ANTINEX_EPOCHS,
+            num_splits=ANTINEX_NUM_SPLITS,
+            loss=ANTINEX_LOSS,
+            optimizer=ANTINEX_OPTIMIZER,
+            metrics=ANTINEX_METRICS,
+            histories=ANTINEX_HISTORIES,
+            filter_features_dict=FILTER_FEATURES_DICT,
+            filter_features=FILTER_FEATURES,
+            convert_to_type=ANTINEX_CONVERT_DATA_TYPE,
+            include_failed_conversions=ANTINEX_INCLUDE_FAILED_CONVERSIONS,
+            value_for_missing=ANTINEX_MISSING_VALUE,
+            publish_to_core=ANTINEX_PUBLISH_TO_CORE,
+            check_missing_predict_feature=ANTINEX_CHECK_MISSING_PREDICT,
+            predict_format=ANTINEX_PREDICT_FORMAT,
+            precision=ANTINEX_PRECISION,
+            dtype=ANTINEX_DTYPE):
+        """__init__
+
+        Arguments match ``generate_ai_request``
+
+        :param req_dict: request dictionary to start from
+        :param req_file: file holding a request dict to start from
+        :param features: features to process in the data
+        :param ignore_features: features to ignore in the data (non-numerics)
+        :param sort_values: optional - order rows for scaler normalization
+        :param ml_type: machine learning type - classification/regression
+        :param use_model_name: use a pre-trained model by name
+        :param predict_feature: predict the values of this feature
+        :param seed: seed for randomness reproducability
+        :param test_size: split train/test data
+        :param batch_size: batch size for processing
+        :param epochs: test epochs
+        :param num_splits: test splits for cross validation
+        :param loss: loss function
+        :param optimizer: optimizer
+        :param metrics: metrics to apply
+        :param histories: historical values to test
+        :param filter_features_dict: dictionary of features to use
+        :param filter_features: list of features to use
+        :param convert_to_type: convert predict_row values to
+                                scaler-ready values
+        :param include_failed_conversions: should the predict rows include fails
+        :param value_for_missing: set this value to any columns that are missing
+        :param publish_to_core: want to publish it to the core or the worker
+        :param check_missing_predict_feature: fill in the predict feature
+        :param predict_format: ``rows``, ``columnar`` or ``sparse``
+        :param precision: significant digits to keep - ``0`` keeps
+                          every digit
+        :param dtype: ``float64`` or ``float32``
+        """
+        rounder = ValueRounder(
+            precision=precision,
+            dtype=dtype)
+        body = load_request_body(
+            req_dict=req_dict,
+            req_file=req_file)
+        if not body:
+            raise ValueError((
+                "failed to load request body "
+                "req_dict={} req_file={}").format(
+                    req_dict,
+                    req_file))
+        set_request_values(
+            body=body,
+            use_model_name=use_model_name,
+            predict_feature=predict_feature,
+            publish_to_core=publish_to_core,
+            seed=seed,
+            test_size=test_size,
+            batch_size=batch_size,
+            epochs=epochs,
+            num_splits=num_splits,
+            loss=loss,
+            optimizer=optimizer,
+            metrics=metrics,
+            histories=histories,
+            ml_type=ml_type,
+            sort_values=sort_values,
+            filter_features=filter_features,
+            ignore_features=ignore_features)
+        body.pop(
+            "predict_rows",
+            None)
+        self.body = body
+        self.label = use_model_name
+        self.schema = RowSchema(
+            filter_features_dict=filter_features_dict,
+            filter_features=filter_features,
+            predict_feature=predict_feature,
+            convert_to_type=convert_to_type,
+            include_failed_conversions=include_failed_conversions,
+            value_for_missing=value_for_missing,
+            check_missing_predict_feature=check_missing_predict_feature)
+        self.predict_format = predict_format
+        self.rounder = rounder
+        self.rows_key = "predict_rows"
+        self.encoder = build_encoder(
+            predict_format=predict_format,
+            columns=self.schema.get_columns(),
+            default=rounder.round_value(
+                self.schema.missing_value))
+        if self.encoder:
+            self.body.update(self.encoder.get_header())
+            self.rows_key = "predict_values"
+
+        # splice the rows in as the last key of the static body
+        static_data = dumps(self.body)
+        if len(self.body) > 0:
+            self.prefix = static_data[:-1] + \
+                ', "{}": '.format(self.rows_key).encode("utf-8")
+        else:
+            self.prefix = '{{"{}": '.format(
+                self.rows_key).encode("utf-8")
+        self.suffix = b"}"
+    # end of __init__
+
+    def convert_rows(
+            self,
+            predict_rows):
+        """convert_rows
+
+        Convert the rows and pack them for the ``predict_format``
+
+        :param predict_rows: list of predict rows to convert
+        """
+        use_predict_rows = self.rounder.round_rows(
+            self.schema.convert(
+                predict_rows))
+        if self.encoder:
+            return self.encoder.encode_rows(
+                use_predict_rows)
+        return use_predict_rows
+    # end of convert_rows
+
+    def build(
+            self,
+            predict_rows):
+        """build
+
+        Build the encoded request for ``run_job``
+
+        :param predict_rows: list of predict rows to send
+        """
+        use_predict_rows = self.convert_rows(
+            predict_rows)
+        return EncodedRequest(
+            b"".join([
+                self.prefix,
+                dumps(use_predict_rows),
+                self.suffix
+            ]),
+            label=self.label,
+            num_rows=len(use_predict_rows))
+    # end of build
+
+    def build_body(
+            self,
+            predict_rows):
+        """build_body
+
+        Build the request as a dictionary - the static fields
+        are shared with the template and should not be changed
+
+        :param predict_rows: list of predict rows to send
+        """
+        body = dict(self.body)
+        body[self.rows_key] = self.convert_rows(
+            predict_rows)
+        return body
+    # end of build_body
+
+    def encode_rows(
+            self,
+            predict_rows):
+        """encode_rows
+
+        Convert and encode each row on its own so chunked
+        requests can be packed by size
+
+        :param predict_rows: list of predict rows to encode
+        """
+        return [
+            dumps(row)
+            for row in self.convert_rows(
+                predict_rows)
+        ]
+    # end of encode_rows
+
+    def build_encoded(
+            self,
+            encoded_rows,
+            offset=0):
+        """build_encoded
+
+        Build the request for ``run_job`` from rows that were
+        already encoded with ``encode_rows``
+
+        :param encoded_rows: list of JSON ``bytes`` rows
+        :param offset: index of the first row in the original rows
+        """
+        return EncodedRequest(
+            b"".join([
+                self.prefix,
+                b"[",
+                b", ".join(encoded_rows),
+                b"]",
+                self.suffix
+            ]),
+            label=self.label,
+            num_rows=len(encoded_rows),
+            offset=offset)
+    # end of build_encoded
+
+# end of RequestTemplate
+
+
+def generate_ai_requests_iter(
+        predict_rows,
+        max_rows=ANTINEX_REQUEST_MAX_ROWS,
+        max_bytes=ANTINEX_REQUEST_MAX_BYTES,
+        template=None,
+        convert_batch_rows=ANTINEX_CONVERT_BATCH_ROWS,
+        num_workers=ANTINEX_CONVERT_WORKERS,
+        executor=None,
+        **kwargs):
+    """generate_ai_requests_iter
+
+    Lazily split any iterable of predict rows into encoded
+    requests holding at most ``max_rows`` rows and at most
+    ``max_bytes`` bytes. Rows are pulled, converted and encoded
+    ``convert_batch_rows`` at a time so memory stays flat for generators
+    of any length. Each yielded ``EncodedRequest`` can be posted
+    with ``run_job`` or ``submit_many`` and knows the ``offset``
+    of its first row. A single row larger than ``max_bytes`` is
+    sent in a request of its own.
+
+    With ``num_workers`` or an ``executor`` the batches are
+    converted and encoded in worker processes by
+    ``map_row_batches`` - the requests are the same as the
+    single process output.
+
+    :param predict_rows: iterable of predict row dictionaries
+    :param max_rows: most rows per request (0 disables)
+    :param max_bytes: most encoded bytes per request (0 disables)
+    :param template: optional ``RequestTemplate`` to reuse
+    :param convert_batch_rows: rows to convert at a time
+    :param num_workers: number of processes for converting and
+                        encoding - ``0`` or ``1`` stays in this
+                        process
+    :param executor: optional process pool to reuse
+    :param kwargs: ``RequestTemplate`` arguments when no
+                   ``template`` is set
+    """
+    use_template = template
+    if not use_template:
+        use_template = RequestTemplate(
+            **kwargs)
+    if max_rows > 0 and num_workers <= 1 and not executor:
+        convert_batch_rows = min(
+            convert_batch_rows,
+            max_rows)
+    empty_bytes = (
+        len(use_template.prefix) +
+        len(use_template.suffix) +
+        2)
+
+    offset = 0
+    chunk = []
+    num_bytes = empty_bytes
+    for encoded_rows in map_row_batches(
+            use_template.encode_rows,
+            predict_rows,
+            num_workers=num_workers,
+            batch_rows=convert_batch_rows,
+            executor=executor):
+        for row_data in encoded_rows:
+            row_bytes = len(row_data)
+            if chunk:
+                # the ", " separator
+                row_bytes += 2
+            if chunk and (
+                    (max_rows > 0 and len(chunk) >= max_rows) or
+                    (max_bytes > 0 and
+                     num_bytes + row_bytes > max_bytes)):
+                yield use_template.build_encoded(
+                    chunk,
+                    offset=offset)
+                offset += len(chunk)
+                chunk = []
+                num_bytes = empty_bytes
+                row_bytes = len(row_data)
+            chunk.append(row_data)
+            num_bytes += row_bytes
+        # end of packing the encoded batch
+    # end of pulling rows
+
+    if chunk:
+        yield use_template.build_encoded(
+            chunk,
+            offset=offset)
+# end of generate_ai_requests_iter
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+
+import sys
+import time
+import random
+import hashlib
+import argparse
+import concurrent.futures
+from spylunking.log.setup_logging import console_logger
+from antinex_client.generate_ai_request import generate_ai_request
+from antinex_client.request_template import generate_ai_requests_iter
+from antinex_client.consts import SUCCESS
+
+
+log = console_logger(
+    name='bench_build_requests')
+
+
+def build_rows(
+        num_rows,
+        features,
+        seed=42):
+    """build_rows
+
+    Build network-capture like rows with string values where
+    most columns of each row are missing
+
+    :param num_rows: number of rows to build
+    :param features: list of feature names
+    :param seed: random seed so every run builds the same rows
+    """
+    rnd = random.Random(seed)
+    num_features = len(features)
+    rows = []
+    for idx in range(num_rows):
+        start = rnd.randrange(num_features)
+        row = {
+            f: "0"
+            for f in features
+        }
+        for f in features[start:start + 10]:
+            row[f] = str(rnd.randint(1, 65535))
+        row["idx"] = idx
+        rows.append(row)
+    return rows
+# end of build_rows
+
+
+def bench_build_requests():
+    """bench_build_requests
+
+    Time building prediction requests with 1 to N worker
+    processes and check the output does not change with the
+    number of workers.
+
+    """
+
+    parser = argparse.ArgumentParser(
+            description=(
+                "Benchmark converting and encoding predict rows "
+                "across worker processes"))
+    parser.add_argument(
+        "-n",
+        help="number of rows with default 200000",
+        required=False,
+        dest="num_rows",
+        default="200000")
+    parser.add_argument(
+        "-f",
+        help="number of features per row with default 66",
+        required=False,
+        dest="num_features",
+        default="66")
+    parser.add_argument(
+        "-w",
+        help="comma separated worker counts with default 1,2,4,8",
+        required=False,
+        dest="workers",
+        default="1,2,4,8")
+    parser.add_argument(
+        "-r",
+        help="rows per chunked request with default 10000",
+        required=False,
+        dest="max_rows",
+        default="10000")
+    args = parser.parse_args()
+
+    num_rows = int(args.num_rows)
+    features = [
+        "feature_{}".format(i)
+        for i in range(int(args.num_features))
+    ]
+    worker_counts = [
+        int(w)
+        for w in args.workers.split(",")
+    ]
+    kwargs = {
+        "req_dict": {
+            "label": "bench",
+            "dataset": "bench.csv"
+        },
+        "use_model_name": "bench",
+        "filter_features": features,
+        "filter_features_dict": {
+            f: idx
+            for idx, f in enumerate(features)
+        },
+        "convert_to_type": "float"
+    }
+
+    log.info(("building rows={} features={}")
+             .format(
+                num_rows,
+                len(features)))
+    rows = build_rows(
+        num_rows,
+        features)
+
+    base_convert = None
+    base_encode = None
+    for num_workers in worker_counts:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=num_workers) as executor:
+            # warm up the worker processes
+            list(executor.map(abs, range(num_workers)))
+            use_executor = executor
+            if num_workers <= 1:
+                use_executor = None
+
+            start = time.time()
+            res = generate_ai_request(
+                predict_rows=rows,
+                executor=use_executor,
+                **kwargs)
+            convert_time = time.time() - start
+            if res["status"] != SUCCESS:
+                log.error(("failed building request error={}")
+                          .format(
+                            res["error"]))
+                sys.exit(1)
+
+            start = time.time()
+            digest = hashlib.sha256()
+            num_requests = 0
+            for body in generate_ai_requests_iter(
+                    iter(rows),
+                    max_rows=int(args.max_rows),
+                    convert_batch_rows=5000,
+                    executor=use_executor,
+                    **kwargs):
+                digest.update(body)
+                num_requests += 1
+            encode_time = time.time() - start
+        # end of using the pool
+
+        if base_convert is None:
+            base_convert = convert_time
+            base_encode = encode_time
+            first_rows = res["data"]["predict_rows"]
+            first_digest = digest.hexdigest()
+        elif (res["data"]["predict_rows"] != first_rows or
+                digest.hexdigest() != first_digest):
+            log.error(("workers={} changed the output")
+                      .format(
+                        num_workers))
+            sys.exit(1)
+
+        log.info((
+            "workers={} generate_ai_request={:.2f}s speedup={:.2f}x "
+            "generate_ai_requests_iter={:.2f}s requests={} "
+            "speedup={:.2f}x")
+            .format(
+                num_workers,
+                convert_time,
+                base_convert / convert_time,
+                encode_time,
+                num_requests,
+                base_encode / encode_time))
+    # end of timing each worker count
+
+# end of bench_build_requests
+
+
+if __name__ == "__main__":
+    bench_build_requests()
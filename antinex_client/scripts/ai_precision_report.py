@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+
+import sys
+import math
+import time
+import random
+import argparse
+import pandas as pd
+from spylunking.log.setup_logging import console_logger
+from antinex_client.generate_ai_request import generate_ai_request
+from antinex_client.predict_format import decode_predict_rows
+from antinex_client.json_codec import dumps
+from antinex_client.json_codec import loads
+from antinex_client.consts import SUCCESS
+
+
+log = console_logger(
+    name='precision_report')
+
+
+class StandInScorer:
+
+    """
+
+    Deterministic stand-in for a trained model - a seeded logistic
+    score over squashed feature values so small changes in the
+    inputs can move scores near the threshold
+
+    """
+
+    def __init__(
+            self,
+            features,
+            seed=7):
+        """__init__
+
+        :param features: list of feature names to score
+        :param seed: seed for the weights
+        """
+        rnd = random.Random(seed)
+        self.weights = {
+            f: rnd.uniform(-1.0, 1.0)
+            for f in features
+        }
+    # end of __init__
+
+    def score(
+            self,
+            row):
+        """score
+
+        :param row: converted predict row
+        """
+        total = 0.0
+        for f, w in self.weights.items():
+            v = row.get(f, 0.0)
+            if not isinstance(v, (int, float)) or not math.isfinite(v):
+                continue
+            total += w * math.log1p(abs(v)) * (1.0 if v >= 0 else -1.0)
+        return 1.0 / (1.0 + math.exp(-max(min(total, 50.0), -50.0)))
+    # end of score
+
+# end of StandInScorer
+
+
+def build_rows(
+        num_rows,
+        features,
+        seed=42):
+    """build_rows
+
+    Build rows of full precision float strings where most columns
+    of each row are missing
+
+    :param num_rows: number of rows to build
+    :param features: list of feature names
+    :param seed: random seed so every run builds the same rows
+    """
+    rnd = random.Random(seed)
+    num_features = len(features)
+    rows = []
+    for idx in range(num_rows):
+        start = rnd.randrange(num_features)
+        row = {
+            f: ""
+            for f in features
+        }
+        for f in features[start:start + 10]:
+            row[f] = repr(rnd.uniform(-1000.0, 65535.0))
+        rows.append(row)
+    return rows
+# end of build_rows
+
+
+def score_request(
+        kwargs,
+        rows,
+        scorer,
+        precision,
+        dtype):
+    """score_request
+
+    Build, encode and decode one request like the API would and
+    score the decoded rows - returns the scores, encoded bytes,
+    encode seconds and decode seconds
+
+    :param kwargs: ``generate_ai_request`` arguments
+    :param rows: predict rows
+    :param scorer: ``StandInScorer``
+    :param precision: significant digits to keep
+    :param dtype: ``float64`` or ``float32``
+    """
+    res = generate_ai_request(
+        predict_rows=rows,
+        precision=precision,
+        dtype=dtype,
+        **kwargs)
+    if res["status"] != SUCCESS:
+        log.error(("failed building request precision={} dtype={} "
+                   "error={}")
+                  .format(
+                    precision,
+                    dtype,
+                    res["error"]))
+        sys.exit(1)
+    start = time.time()
+    data = dumps(res["data"])
+    encode_time = time.time() - start
+    start = time.time()
+    body = decode_predict_rows(
+        loads(data))
+    decode_time = time.time() - start
+    scores = [
+        scorer.score(r)
+        for r in body["predict_rows"]
+    ]
+    return scores, len(data), encode_time, decode_time
+# end of score_request
+
+
+def precision_report():
+    """precision_report
+
+    Compare request size, JSON encode and decode time and the
+    predictions of a stand-in scorer at full precision against
+    ``float32`` and each significant digit ``precision``.
+
+    """
+
+    parser = argparse.ArgumentParser(
+            description=(
+                "Report the accuracy impact of sending predict rows "
+                "with less numeric precision"))
+    parser.add_argument(
+        "-f",
+        help="optional - CSV file of predict rows to use",
+        required=False,
+        dest="csv_file")
+    parser.add_argument(
+        "-n",
+        help="number of generated rows with default 20000",
+        required=False,
+        dest="num_rows",
+        default="20000")
+    parser.add_argument(
+        "-p",
+        help="comma separated significant digits with default 3,4,5,6,7",
+        required=False,
+        dest="precisions",
+        default="3,4,5,6,7")
+    parser.add_argument(
+        "-t",
+        help="predicted label threshold with default 0.5",
+        required=False,
+        dest="threshold",
+        default="0.5")
+    args = parser.parse_args()
+
+    if args.csv_file:
+        df = pd.read_csv(
+            args.csv_file)
+        features = [
+            str(c)
+            for c in df.columns
+        ]
+        rows = df.to_dict("records")
+    else:
+        features = [
+            "feature_{}".format(i)
+            for i in range(66)
+        ]
+        rows = build_rows(
+            int(args.num_rows),
+            features)
+    threshold = float(args.threshold)
+
+    kwargs = {
+        "req_dict": {
+            "label": "precision-report",
+            "dataset": "report.csv"
+        },
+        "use_model_name": "precision-report",
+        "filter_features": features,
+        "filter_features_dict": {
+            f: idx
+            for idx, f in enumerate(features)
+        },
+        "convert_to_type": "float"
+    }
+    scorer = StandInScorer(
+        features)
+
+    base_scores, base_bytes, base_encode, base_decode = score_request(
+        kwargs,
+        rows,
+        scorer,
+        precision=0,
+        dtype="float64")
+    log.info(("rows={} float64 bytes={} encode={:.3f}s decode={:.3f}s")
+             .format(
+                len(rows),
+                base_bytes,
+                base_encode,
+                base_decode))
+
+    settings = [(0, "float32")] + [
+        (int(p), "float64")
+        for p in args.precisions.split(",")
+    ]
+    for precision, dtype in settings:
+        scores, num_bytes, encode_time, decode_time = score_request(
+            kwargs,
+            rows,
+            scorer,
+            precision=precision,
+            dtype=dtype)
+        changed = sum(
+            1
+            for a, b in zip(base_scores, scores)
+            if (a >= threshold) != (b >= threshold))
+        max_diff = max(
+            [abs(a - b) for a, b in zip(base_scores, scores)] or [0.0])
+        log.info((
+            "dtype={} precision={} bytes={} ({:.1f}%) encode={:.3f}s "
+            "decode={:.3f}s changed_predictions={} ({:.4f}%) "
+            "max_score_diff={:.3g}")
+            .format(
+                dtype,
+                precision,
+                num_bytes,
+                100.0 * num_bytes / base_bytes,
+                encode_time,
+                decode_time,
+                changed,
+                100.0 * changed / max(len(rows), 1),
+                max_diff))
+    # end of comparing each setting
+
+# end of precision_report
+
+
+if __name__ == "__main__":
+    precision_report()
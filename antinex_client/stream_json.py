@@ -0,0 +1,193 @@
+import re
+import json
+import codecs
+
+
+STRUCT_OR_QUOTE = re.compile(r'["\[\]{}:,]')
+JSON_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class StreamReader:
+
+    """
+
+    Decode an iterable of ``bytes`` chunks into a sliding
+    ``str`` buffer that only holds the unparsed tail
+
+    """
+
+    def __init__(
+            self,
+            chunks):
+        """__init__
+
+        :param chunks: iterable of ``bytes`` chunks
+        """
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.done = False
+    # end of __init__
+
+    def read_more(
+            self):
+        """read_more
+
+        Drop the parsed part of the buffer and append the next
+        chunk - returns ``False`` once the stream is exhausted
+        """
+        if self.done:
+            return False
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.done = True
+            self.buf = self.buf[self.pos:] + self.decoder.decode(
+                b"",
+                final=True)
+            self.pos = 0
+            return False
+        self.buf = self.buf[self.pos:] + self.decoder.decode(chunk)
+        self.pos = 0
+        return True
+    # end of read_more
+
+    def skip_whitespace(
+            self):
+        """skip_whitespace
+
+        Move past whitespace and return the next character or
+        ``None`` at the end of the stream
+        """
+        while True:
+            self.pos = WHITESPACE.match(
+                self.buf,
+                self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.read_more():
+                return None
+    # end of skip_whitespace
+
+# end of StreamReader
+
+
+def find_array_key(
+        reader,
+        key):
+    """find_array_key
+
+    Scan forward until the object key ``key`` followed by
+    ``[`` and leave the reader just inside the array - returns
+    ``False`` if the stream ends first
+
+    :param reader: ``StreamReader``
+    :param key: object key holding the array
+    """
+    target = json.dumps(key)
+    while True:
+        match = STRUCT_OR_QUOTE.search(
+            reader.buf,
+            reader.pos)
+        if not match:
+            reader.pos = len(reader.buf)
+            if not reader.read_more():
+                return False
+            continue
+        if match.group() != '"':
+            reader.pos = match.end()
+            continue
+        string_match = JSON_STRING.match(
+            reader.buf,
+            match.start())
+        if not string_match:
+            # the string ends in a later chunk
+            reader.pos = match.start()
+            if not reader.read_more():
+                return False
+            continue
+        reader.pos = string_match.end()
+        if string_match.group() != target:
+            continue
+        # a string followed by a colon and a bracket is the array key
+        next_char = reader.skip_whitespace()
+        if next_char != ":":
+            continue
+        reader.pos += 1
+        next_char = reader.skip_whitespace()
+        if next_char == "[":
+            reader.pos += 1
+            return True
+        if next_char is None:
+            return False
+    # end of scanning for the key
+# end of find_array_key
+
+
+def iter_json_array(
+        chunks,
+        key="predictions"):
+    """iter_json_array
+
+    Lazily yield each item of the first JSON array stored under
+    the object key ``key`` from a stream of ``bytes`` chunks.
+    Only the current item is decoded at a time so peak memory
+    stays near one chunk plus one item instead of the whole
+    document.
+
+    :param chunks: iterable of ``bytes`` chunks like
+                   ``response.iter_content(chunk_size)``
+    :param key: object key holding the array
+    """
+    decoder = json.JSONDecoder()
+    reader = StreamReader(chunks)
+    if not find_array_key(
+            reader,
+            key):
+        return
+
+    next_char = reader.skip_whitespace()
+    if next_char == "]":
+        return
+
+    while True:
+        if next_char is None:
+            raise ValueError(
+                "stream ended inside the {} array".format(
+                    key))
+        try:
+            item, end = decoder.raw_decode(
+                reader.buf,
+                reader.pos)
+        except ValueError:
+            if not reader.read_more():
+                raise
+            next_char = reader.skip_whitespace()
+            continue
+        after = WHITESPACE.match(
+            reader.buf,
+            end).end()
+        if not reader.done and (
+                after == len(reader.buf) or
+                reader.buf[after] not in ",]"):
+            # a number like 1.5e3 may continue in the next chunk
+            reader.read_more()
+            next_char = reader.skip_whitespace()
+            continue
+        reader.pos = end
+        yield item
+
+        next_char = reader.skip_whitespace()
+        if next_char == "]":
+            return
+        if next_char != ",":
+            raise ValueError(
+                "expected , or ] in the {} array found={}".format(
+                    key,
+                    next_char))
+        reader.pos += 1
+        next_char = reader.skip_whitespace()
+    # end of decoding items
+# end of iter_json_array
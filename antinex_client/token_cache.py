@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import threading
+from spylunking.log.setup_logging import console_logger
+from antinex_client.utils import get_token_expiry
+
+
+log = console_logger(
+    name='token_cache')
+
+
+class TokenCache:
+
+    """
+
+    Local file of JWT tokens keyed by API url and user
+
+    Lets short-lived CLI runs reuse a token from an earlier run
+    instead of logging in again. The file is only readable by
+    the owner (``0600``) and tokens within ``min_ttl`` seconds
+    of their ``exp`` are treated as missing. Writes use an
+    atomic rename so concurrent runs never read a partial file.
+
+    """
+
+    def __init__(
+            self,
+            path,
+            min_ttl=30.0):
+        """__init__
+
+        :param path: JSON file to store tokens in - ``~`` is expanded
+        :param min_ttl: seconds a token must have left to be reused
+        """
+        self.path = os.path.expanduser(path)
+        self.min_ttl = min_ttl
+        self.lock = threading.Lock()
+    # end of __init__
+
+    def build_key(
+            self,
+            url,
+            user):
+        """build_key
+
+        :param url: API url
+        :param user: API user
+        """
+        return "{} {}".format(
+            url.rstrip("/"),
+            user)
+    # end of build_key
+
+    def load(
+            self):
+        """load
+
+        Read all tokens - a missing or unreadable file is empty
+        """
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                tokens = json.loads(f.read())
+            if isinstance(tokens, dict):
+                return tokens
+        except Exception as e:
+            log.error(("failed loading token cache path={} ex={}")
+                      .format(
+                        self.path,
+                        e))
+        return {}
+    # end of load
+
+    def save(
+            self,
+            tokens):
+        """save
+
+        :param tokens: dictionary of all tokens to write
+        """
+        tmp_path = "{}.{}.{}.tmp".format(
+            self.path,
+            os.getpid(),
+            threading.get_ident())
+        try:
+            use_dir = os.path.dirname(self.path)
+            if use_dir and not os.path.exists(use_dir):
+                os.makedirs(use_dir, mode=0o700)
+            fd = os.open(
+                tmp_path,
+                os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(json.dumps(tokens))
+            os.replace(
+                tmp_path,
+                self.path)
+        except Exception as e:
+            log.error(("failed saving token cache path={} ex={}")
+                      .format(
+                        self.path,
+                        e))
+    # end of save
+
+    def get(
+            self,
+            url,
+            user):
+        """get
+
+        Get a cached token or ``None`` if there is no token or
+        it expires within ``min_ttl`` seconds
+
+        :param url: API url
+        :param user: API user
+        """
+        with self.lock:
+            node = self.load().get(
+                self.build_key(
+                    url,
+                    user),
+                None)
+        if not node or not node.get("token", None):
+            return None
+        expires_at = node.get(
+            "expires_at",
+            None)
+        if expires_at and (expires_at - self.min_ttl) <= time.time():
+            return None
+        return node["token"]
+    # end of get
+
+    def set(
+            self,
+            url,
+            user,
+            token):
+        """set
+
+        Store a token and drop any expired tokens from the file
+
+        :param url: API url
+        :param user: API user
+        :param token: JWT token
+        """
+        now = time.time()
+        with self.lock:
+            tokens = {
+                k: v
+                for k, v in self.load().items()
+                if not v.get("expires_at", None) or v["expires_at"] > now
+            }
+            tokens[self.build_key(url, user)] = {
+                "token": token,
+                "expires_at": get_token_expiry(token)
+            }
+            self.save(tokens)
+    # end of set
+
+    def remove(
+            self,
+            url,
+            user):
+        """remove
+
+        :param url: API url
+        :param user: API user
+        """
+        with self.lock:
+            tokens = self.load()
+            if tokens.pop(self.build_key(url, user), None):
+                self.save(tokens)
+    # end of remove
+
+# end of TokenCache
@@ -1,5 +1,6 @@
 import os
 import json
+import base64
 import datetime
 
 
@@ -43,9 +44,28 @@ def ppj(json_data):
 
     :param json_data: dictionary to print
     """
-    return str(json.dumps(
-                json_data,
-                sort_keys=True,
-                indent=4,
-                separators=(',', ': ')))
+    # json_codec reads its backend from consts which imports utils
+    from antinex_client.json_codec import pretty
+    return pretty(json_data).decode("utf-8")
 # end of ppj
+
+
+def get_token_expiry(
+        token):
+    """get_token_expiry
+
+    Read the ``exp`` claim (seconds since the epoch) from a JWT
+    without verifying it - returns ``None`` if the token is not
+    a JWT or has no expiry
+
+    :param token: JWT token string
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(
+            payload.encode("ascii")).decode("utf-8"))
+        return float(claims["exp"])
+    except Exception:
+        return None
+# end of get_token_expiry
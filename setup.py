@@ -87,8 +87,17 @@ setup(
     ],
     package_data={},
     install_requires=install_requires,
+    extras_require={
+        "async": [
+            "aiohttp"
+        ],
+        "fastjson": [
+            "orjson"
+        ]
+    },
     test_suite="setup.antinex_client_test_suite",
     tests_require=[
+        "aiohttp",
         "pytest"
     ],
     scripts=[
@@ -98,7 +107,9 @@ setup(
         "./antinex_client/scripts/ai_get_job.py",
         "./antinex_client/scripts/ai_get_results.py",
         "./antinex_client/scripts/ai_prepare_dataset.py",
-        "./antinex_client/scripts/ai_train_dnn.py"
+        "./antinex_client/scripts/ai_train_dnn.py",
+        "./antinex_client/scripts/ai_bench_build_requests.py",
+        "./antinex_client/scripts/ai_precision_report.py"
     ],
     use_2to3=True,
     classifiers=[
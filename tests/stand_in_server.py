@@ -0,0 +1,326 @@
+import json
+import time
+import base64
+import hashlib
+import threading
+import http.server
+import socketserver
+import urllib.parse
+from antinex_client.compression import decompress_body
+from antinex_client.predict_format import decode_predict_rows
+
+
+class StandInState:
+
+    """
+
+    Records held by the stand-in AntiNex REST API
+
+    Jobs and results report ``finished`` after they have been
+    fetched ``finish_after`` times so tests can exercise polling.
+
+    """
+
+    def __init__(
+            self,
+            finish_after=2,
+            token="stand-in-token",
+            honor_fields=True,
+            use_etags=True,
+            token_lifetime=None):
+        """__init__
+
+        :param finish_after: number of GETs before a record finishes
+        :param token: JWT token handed out on login
+        :param honor_fields: project records down to the
+                             ``?fields=`` query like the client asks
+        :param use_etags: send ``ETag`` headers and answer
+                          ``If-None-Match`` with ``304``
+        :param token_lifetime: optional seconds until each login's
+                               JWT expires - each login gets a new
+                               token when this is set
+        """
+        self.finish_after = finish_after
+        self.token = token
+        self.token_lifetime = token_lifetime
+        self.tokens = {}
+        self.honor_fields = honor_fields
+        self.use_etags = use_etags
+        self.not_modified = 0
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.jobs = {}
+        self.results = {}
+        self.prepares = {}
+        self.polls = {}
+        self.requests = []
+        self.client_ports = []
+        self.logins = 0
+        self.encodings = []
+        self.bodies = []
+    # end of __init__
+
+    def new_id(
+            self):
+        """new_id"""
+        with self.lock:
+            use_id = self.next_id
+            self.next_id += 1
+        return use_id
+    # end of new_id
+
+    def issue_token(
+            self):
+        """issue_token
+
+        Log in and return the token to hand back
+        """
+        with self.lock:
+            self.logins += 1
+            if not self.token_lifetime:
+                return self.token
+            expires_at = time.time() + self.token_lifetime
+            claims = base64.urlsafe_b64encode(json.dumps({
+                "user_id": 1,
+                "login": self.logins,
+                "exp": expires_at
+            }).encode("utf-8")).decode("ascii").rstrip("=")
+            token = "header.{}.signature".format(
+                claims)
+            self.tokens[token] = expires_at
+            return token
+    # end of issue_token
+
+    def is_valid_token(
+            self,
+            token):
+        """is_valid_token
+
+        :param token: token from the ``Authorization`` header
+        """
+        if not self.token_lifetime:
+            return token == self.token
+        with self.lock:
+            expires_at = self.tokens.get(
+                token,
+                0)
+        return expires_at > time.time()
+    # end of is_valid_token
+
+    def poll(
+            self,
+            key,
+            record):
+        """poll
+
+        :param key: unique key for the record
+        :param record: record dictionary to update
+        """
+        with self.lock:
+            self.polls[key] = self.polls.get(key, 0) + 1
+            if self.polls[key] >= self.finish_after:
+                record["status"] = "finished"
+        return record
+    # end of poll
+
+# end of StandInState
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+
+    """
+
+    Minimal handler for the AntiNex endpoints used by the client
+
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(
+            self,
+            *args):
+        """log_message - keep test output quiet"""
+    # end of log_message
+
+    def send_json(
+            self,
+            status_code,
+            data,
+            etag=False):
+        """send_json
+
+        :param status_code: HTTP status code
+        :param data: dictionary to send back
+        :param etag: send an ``ETag`` and honor ``If-None-Match``
+        """
+        body = json.dumps(data).encode("utf-8")
+        tag = None
+        if etag:
+            tag = '"{}"'.format(hashlib.sha1(body).hexdigest())
+            if self.headers.get("If-None-Match", None) == tag:
+                self.server.state.not_modified += 1
+                self.send_response(304)
+                self.send_header("ETag", tag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if tag:
+            self.send_header("ETag", tag)
+        self.end_headers()
+        self.wfile.write(body)
+    # end of send_json
+
+    def read_body(
+            self):
+        """read_body - decodes ``Content-Encoding`` bodies"""
+        length = int(self.headers.get("Content-Length", 0))
+        encoding = self.headers.get("Content-Encoding", None)
+        self.server.state.encodings.append(encoding)
+        return decompress_body(
+            self.rfile.read(length),
+            encoding)
+    # end of read_body
+
+    def is_authorized(
+            self):
+        """is_authorized"""
+        header = self.headers.get("Authorization", "")
+        return header.startswith("JWT ") and \
+            self.server.state.is_valid_token(header[4:])
+    # end of is_authorized
+
+    def do_POST(
+            self):
+        """do_POST"""
+        state = self.server.state
+        state.requests.append(("POST", self.path))
+        state.client_ports.append(self.client_address[1])
+        raw = self.read_body()
+        if self.path == "/api-token-auth/":
+            self.send_json(200, {"token": state.issue_token()})
+            return
+        if not self.is_authorized():
+            self.send_json(401, {"detail": "not authorized"})
+            return
+        body = decode_predict_rows(
+            json.loads(raw.decode("utf-8")))
+        state.bodies.append(body)
+        if self.path == "/ml/":
+            job_id = state.new_id()
+            result_id = state.new_id()
+            job = {
+                "id": job_id,
+                "status": "initial",
+                "label": body.get("label", ""),
+                "predict_manifest": {
+                    "result_id": result_id
+                }
+            }
+            result = {
+                "id": result_id,
+                "job_id": job_id,
+                "status": "initial",
+                "predictions_json": {
+                    "predictions": [
+                        dict(r, row=idx, label_value=1)
+                        for idx, r in enumerate(
+                            body.get("predict_rows", []))
+                    ]
+                }
+            }
+            state.jobs[str(job_id)] = job
+            state.results[str(result_id)] = result
+            self.send_json(201, {"job": job, "results": result})
+        elif self.path == "/mlprepare/":
+            prepare_id = state.new_id()
+            prepare = {
+                "id": prepare_id,
+                "status": "initial"
+            }
+            state.prepares[str(prepare_id)] = prepare
+            self.send_json(201, prepare)
+        else:
+            self.send_json(404, {"detail": "not found"})
+    # end of do_POST
+
+    def do_GET(
+            self):
+        """do_GET"""
+        state = self.server.state
+        state.requests.append(("GET", self.path))
+        state.client_ports.append(self.client_address[1])
+        if not self.is_authorized():
+            self.send_json(401, {"detail": "not authorized"})
+            return
+        path, _, query = self.path.partition("?")
+        parts = path.strip("/").split("/")
+        if len(parts) != 2:
+            self.send_json(404, {"detail": "not found"})
+            return
+        records = {
+            "ml": state.jobs,
+            "mlresults": state.results,
+            "mlprepare": state.prepares
+        }.get(parts[0], {})
+        record = records.get(parts[1], None)
+        if not record:
+            self.send_json(404, {"detail": "not found"})
+            return
+        record = state.poll(path, record)
+        fields = urllib.parse.parse_qs(query).get("fields", None)
+        if fields and state.honor_fields:
+            use_fields = fields[0].split(",")
+            record = {
+                k: v
+                for k, v in record.items()
+                if k in use_fields
+            }
+        self.send_json(200, record, etag=state.use_etags)
+    # end of do_GET
+
+# end of StandInHandler
+
+
+class ThreadingServer(
+        socketserver.ThreadingMixIn,
+        http.server.HTTPServer):
+
+    """
+
+    Threaded ``HTTPServer`` - same as the Python 3.7
+    ``http.server.ThreadingHTTPServer``
+
+    """
+
+    daemon_threads = True
+
+# end of ThreadingServer
+
+
+def start_stand_in_server(
+        state=None,
+        handler=StandInHandler):
+    """start_stand_in_server
+
+    Start the stand-in API on a random local port and return
+    ``(server, url)`` - call ``server.shutdown()`` when done
+
+    :param state: optional ``StandInState``
+    :param handler: request handler class
+    """
+    server = ThreadingServer(
+        ("127.0.0.1", 0),
+        handler)
+    server.state = state or StandInState()
+    thread = threading.Thread(
+        target=server.serve_forever,
+        daemon=True)
+    thread.start()
+    url = "http://127.0.0.1:{}".format(
+        server.server_address[1])
+    return server, url
+# end of start_stand_in_server
@@ -0,0 +1,616 @@
+import os
+import json
+import time
+import mock
+import tempfile
+import concurrent.futures
+from tests.base_test import BaseTestCase
+from tests.stand_in_server import StandInState
+from tests.stand_in_server import start_stand_in_server
+from antinex_client.ai_client import AIClient
+from antinex_client.request_template import RequestTemplate
+from antinex_client.request_template import generate_ai_requests_iter
+from antinex_client.prediction_merger import PredictionMerger
+from antinex_client.generate_ai_request import generate_ai_request
+from antinex_client.consts import SUCCESS
+
+
+class AIClientTest(BaseTestCase):
+
+    def setUp(self):
+        super(AIClientTest, self).setUp()
+        self.server, self.url = start_stand_in_server(
+            state=StandInState(
+                finish_after=3))
+        self.client = AIClient(
+            url=self.url,
+            user="user",
+            password="password",
+            verbose=False)
+    # end of setUp
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        super(AIClientTest, self).tearDown()
+    # end of tearDown
+
+    def start_jobs(
+            self,
+            num_jobs):
+        job_ids = []
+        for i in range(num_jobs):
+            res = self.client.run_job({
+                "label": "test",
+                "predict_rows": [{"a": i}]})
+            self.assertEqual(res["status"], SUCCESS)
+            job_ids.append(res["data"]["job"]["id"])
+        return job_ids
+    # end of start_jobs
+
+    def test_pooled_session_reuses_connections(self):
+        self.start_jobs(5)
+        self.assertEqual(len(self.server.state.client_ports), 7)
+        self.assertEqual(len(set(self.server.state.client_ports)), 1)
+    # end of test_pooled_session_reuses_connections
+
+    def test_keep_alive_disabled(self):
+        self.client.close()
+        self.client = AIClient(
+            url=self.url,
+            user="user",
+            password="password",
+            verbose=False,
+            keep_alive=False)
+        self.assertEqual(
+            self.client.get_session().headers["Connection"],
+            "close")
+        self.start_jobs(3)
+        self.assertEqual(len(set(self.server.state.client_ports)), 5)
+    # end of test_keep_alive_disabled
+
+    def test_close_and_rebuild_session(self):
+        self.start_jobs(1)
+        first_session = self.client.get_session()
+        self.client.close()
+        self.assertIsNone(self.client.adapter)
+        self.start_jobs(1)
+        self.assertIsNot(self.client.get_session(), first_session)
+        # the second job used a new connection on the new adapter
+        self.assertEqual(len(set(self.server.state.client_ports)), 2)
+    # end of test_close_and_rebuild_session
+
+    def test_invalid_pool_env_values(self):
+        with mock.patch.dict(
+                os.environ,
+                {
+                    "API_POOL_CONNECTIONS": "not-a-number",
+                    "API_POOL_MAXSIZE": "4"
+                }):
+            client = AIClient(
+                url=self.url,
+                verbose=False)
+        self.assertEqual(client.pool_connections, 10)
+        self.assertEqual(client.pool_maxsize, 4)
+        client.close()
+    # end of test_invalid_pool_env_values
+
+    def test_wait_for_job_to_finish(self):
+        job_id = self.start_jobs(1)[0]
+        res = self.client.wait_for_job_to_finish(
+            job_id,
+            sec_to_sleep=0.01)
+        self.assertEqual(res["status"], SUCCESS)
+        self.assertEqual(res["data"]["job"]["id"], job_id)
+        self.assertEqual(res["data"]["result"]["status"], "finished")
+    # end of test_wait_for_job_to_finish
+
+    def test_wait_all(self):
+        job_ids = self.start_jobs(8)
+        seen = []
+        res = self.client.wait_all(
+            job_ids,
+            callback=lambda job_id, response: seen.append(job_id),
+            sec_to_sleep=0.01,
+            max_concurrent=3)
+        self.assertEqual(res["status"], SUCCESS)
+        self.assertEqual(sorted(res["data"]["finished"]), sorted(job_ids))
+        self.assertEqual(res["data"]["pending"], [])
+        self.assertEqual(seen, res["data"]["finished"])
+        for job_id in job_ids:
+            self.assertEqual(
+                res["data"]["jobs"][job_id]["data"]["result"]["status"],
+                "finished")
+    # end of test_wait_all
+
+    def test_wait_any_and_first_n(self):
+        job_ids = self.start_jobs(5)
+        res = self.client.wait_any(
+            job_ids,
+            sec_to_sleep=0.01)
+        self.assertEqual(len(res["data"]["finished"]), 1)
+        self.assertEqual(len(res["data"]["pending"]), 4)
+        res = self.client.wait_first_n(
+            job_ids,
+            3,
+            sec_to_sleep=0.01)
+        self.assertEqual(len(res["data"]["finished"]), 3)
+        self.assertEqual(len(res["data"]["pending"]), 2)
+    # end of test_wait_any_and_first_n
+
+    def test_job_durations_persist_between_clients(self):
+        eta_file = os.path.join(
+            tempfile.mkdtemp(),
+            "eta.json")
+        first = AIClient(
+            url=self.url,
+            verbose=False,
+            eta_file=eta_file)
+        res = first.run_job({
+            "label": "eta-model",
+            "predict_rows": [{"a": 1}]})
+        job_id = res["data"]["job"]["id"]
+        self.assertEqual(first.get_first_poll_delay(job_id), 0.0)
+        first.wait_for_job_to_finish(
+            job_id,
+            sec_to_sleep=0.05)
+        first.close()
+        self.assertTrue(os.path.exists(eta_file))
+
+        second = AIClient(
+            url=self.url,
+            verbose=False,
+            eta_file=eta_file)
+        self.assertIsNotNone(second.estimator.estimate("eta-model", 1))
+        self.assertIsNone(second.estimator.estimate("other-model", 1))
+        res = second.run_job({
+            "label": "eta-model",
+            "predict_rows": [{"a": 1}]})
+        job_id = res["data"]["job"]["id"]
+        self.assertGreater(second.get_first_poll_delay(job_id), 0.0)
+        res = second.wait_for_job_to_finish(
+            job_id,
+            sec_to_sleep=0.05)
+        self.assertEqual(res["status"], SUCCESS)
+        second.close()
+    # end of test_job_durations_persist_between_clients
+
+    def test_status_probe_fetches_full_records_once(self):
+        job_id = self.start_jobs(1)[0]
+        res = self.client.wait_for_job_to_finish(
+            job_id,
+            sec_to_sleep=0.01)
+        self.assertEqual(res["status"], SUCCESS)
+        result = res["data"]["result"]
+        self.assertIn("predictions_json", result)
+        self.assertIn("label", res["data"]["job"])
+        full_gets = [
+            path
+            for method, path in self.server.state.requests
+            if method == "GET" and "?" not in path
+        ]
+        self.assertEqual(
+            sorted(full_gets),
+            sorted([
+                "/ml/{}".format(job_id),
+                "/mlresults/{}".format(result["id"])
+            ]))
+        self.assertEqual(len(self.client.all_results), 1)
+    # end of test_status_probe_fetches_full_records_once
+
+    def test_status_probe_with_server_ignoring_fields(self):
+        self.server.state.honor_fields = False
+        job_id = self.start_jobs(1)[0]
+        res = self.client.wait_for_job_to_finish(
+            job_id,
+            sec_to_sleep=0.01)
+        self.assertEqual(res["status"], SUCCESS)
+        self.assertIn("predictions_json", res["data"]["result"])
+        full_gets = [
+            path
+            for method, path in self.server.state.requests
+            if method == "GET" and "?" not in path
+        ]
+        self.assertEqual(full_gets, [])
+    # end of test_status_probe_with_server_ignoring_fields
+
+    def test_conditional_get_uses_cached_copy(self):
+        job_id = self.start_jobs(1)[0]
+        self.client.wait_for_job_to_finish(
+            job_id,
+            sec_to_sleep=0.01)
+        # only count the revalidations of the full record
+        self.server.state.not_modified = 0
+        first = self.client.get_job_by_id(job_id)
+        second = self.client.get_job_by_id(job_id)
+        self.assertEqual(second["status"], SUCCESS)
+        self.assertEqual(first["data"], second["data"])
+        self.assertEqual(self.server.state.not_modified, 2)
+        self.assertGreaterEqual(
+            self.client.get_cache_stats()["jobs"]["hits"],
+            2)
+    # end of test_conditional_get_uses_cached_copy
+
+    def test_not_modified_refreshes_cache_ttl(self):
+        self.client.all_jobs.ttl = 0.5
+        job_id = self.start_jobs(1)[0]
+        self.client.wait_for_job_to_finish(
+            job_id,
+            sec_to_sleep=0.01)
+        self.server.state.not_modified = 0
+        self.client.get_job_by_id(job_id)
+        for i in range(3):
+            time.sleep(0.3)
+            res = self.client.get_job_by_id(job_id)
+            self.assertEqual(res["status"], SUCCESS)
+        # every GET was answered from the revalidated cached copy
+        self.assertEqual(self.server.state.not_modified, 4)
+    # end of test_not_modified_refreshes_cache_ttl
+
+    def test_conditional_get_disabled(self):
+        self.client.conditional_get = False
+        job_id = self.start_jobs(1)[0]
+        self.client.get_job_by_id(job_id)
+        self.client.get_job_by_id(job_id)
+        self.assertEqual(self.server.state.not_modified, 0)
+    # end of test_conditional_get_disabled
+
+    def test_status_probe_polls_are_revalidated(self):
+        for honor_fields in [False, True]:
+            self.server.state.honor_fields = honor_fields
+            self.server.state.not_modified = 0
+            job_id = self.start_jobs(1)[0]
+            res = self.client.wait_for_job_to_finish(
+                job_id,
+                sec_to_sleep=0.01)
+            self.assertEqual(res["status"], SUCCESS)
+            self.assertIn("predictions_json", res["data"]["result"])
+            self.assertGreater(self.server.state.not_modified, 0)
+    # end of test_status_probe_polls_are_revalidated
+
+    def test_stream_result_predictions(self):
+        res = self.client.run_job({
+            "label": "test",
+            "predict_rows": [{"a": i} for i in range(100)]})
+        job_id = res["data"]["job"]["id"]
+        res = self.client.wait_for_job_to_finish(
+            job_id,
+            sec_to_sleep=0.01,
+            include_result=False)
+        self.assertEqual(res["status"], SUCCESS)
+        result = res["data"]["result"]
+        self.assertNotIn("predictions_json", result)
+        res = self.client.get_result_predictions_iter(result["id"])
+        self.assertEqual(res["status"], SUCCESS)
+        predictions = list(res["data"])
+        self.assertEqual(len(predictions), 100)
+        self.assertEqual(predictions[99]["row"], 99)
+
+        path = os.path.join(
+            tempfile.mkdtemp(),
+            "result.json")
+        res = self.client.download_result_by_id(
+            result["id"],
+            path)
+        self.assertEqual(res["status"], SUCCESS)
+        with open(path, "r") as f:
+            saved = json.loads(f.read())
+        self.assertEqual(
+            saved["predictions_json"]["predictions"],
+            predictions)
+    # end of test_stream_result_predictions
+
+    def test_compressed_request_bodies(self):
+        self.client.compress_requests = True
+        self.client.compress_min_bytes = 1024
+        res = self.client.run_job({
+            "label": "small",
+            "predict_rows": [{"a": 1}]})
+        self.assertEqual(res["status"], SUCCESS)
+        res = self.client.run_job({
+            "label": "large",
+            "predict_rows": [{"a": i} for i in range(500)]})
+        self.assertEqual(res["status"], SUCCESS)
+        self.assertEqual(res["data"]["job"]["label"], "large")
+        self.assertEqual(
+            len(res["data"]["results"]["predictions_json"]["predictions"]),
+            500)
+        self.assertEqual(
+            self.server.state.encodings[-2:],
+            [None, "gzip"])
+    # end of test_compressed_request_bodies
+
+    def test_run_job_with_encoded_request(self):
+        template = RequestTemplate(
+            req_dict={"dataset": "test.csv"},
+            use_model_name="encoded",
+            filter_features=["a"],
+            filter_features_dict={"a": 0})
+        res = self.client.run_job(
+            template.build([{"a": i} for i in range(5)]))
+        self.assertEqual(res["status"], SUCCESS)
+        self.assertEqual(res["data"]["job"]["label"], "encoded")
+        self.assertEqual(
+            len(res["data"]["results"]["predictions_json"]["predictions"]),
+            5)
+        self.assertEqual(
+            self.client.job_starts[str(res["data"]["job"]["id"])][1:],
+            ("encoded", 5))
+    # end of test_run_job_with_encoded_request
+
+    def test_run_job_with_columnar_rows(self):
+        kwargs = {
+            "req_dict": {"dataset": "test.csv"},
+            "use_model_name": "columnar",
+            "filter_features": ["a", "b", "c"],
+            "filter_features_dict": {"a": 0, "b": 1, "c": 2}
+        }
+        rows = [{"a": i + 1, "b": "2"} for i in range(5)]
+        expected = RequestTemplate(
+            **kwargs).convert_rows(rows)
+        for predict_format in ["columnar", "sparse"]:
+            template = RequestTemplate(
+                predict_format=predict_format,
+                **kwargs)
+            res = self.client.run_job(
+                template.build(rows))
+            self.assertEqual(res["status"], SUCCESS)
+            # the stand-in server expands the rows again
+            self.assertEqual(
+                self.server.state.bodies[-1]["predict_rows"],
+                expected)
+            self.assertEqual(
+                len(res["data"]["results"]["predictions_json"][
+                    "predictions"]),
+                5)
+    # end of test_run_job_with_columnar_rows
+
+    def test_concurrent_401s_share_one_login(self):
+        with concurrent.futures.ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(
+                lambda i: self.client.run_job({
+                    "label": "test",
+                    "predict_rows": [{"a": i}]}),
+                range(16)))
+        for res in results:
+            self.assertEqual(res["status"], SUCCESS)
+        self.assertEqual(self.server.state.logins, 1)
+    # end of test_concurrent_401s_share_one_login
+
+    def test_submit_many(self):
+        pulled = []
+
+        def build_bodies():
+            for i in range(20):
+                pulled.append(i)
+                yield {
+                    "label": "bulk-{}".format(i),
+                    "predict_rows": [{"a": i}]}
+        # end of build_bodies
+
+        labels = []
+        for res in self.client.submit_many(
+                build_bodies(),
+                max_in_flight=4):
+            # bodies are only read when there is room to post them
+            self.assertLessEqual(len(pulled), len(labels) + 4)
+            self.assertEqual(res["status"], SUCCESS)
+            labels.append(res["data"]["job"]["label"])
+        self.assertEqual(
+            labels,
+            ["bulk-{}".format(i) for i in range(20)])
+        self.assertEqual(self.server.state.logins, 1)
+    # end of test_submit_many
+
+    def test_iter_jobs_to_finish_without_max_concurrent(self):
+        job_ids = []
+        for i in range(3):
+            res = self.client.run_job({
+                "label": "test-{}".format(i),
+                "predict_rows": [{"a": i}]})
+            job_ids.append(res["data"]["job"]["id"])
+        finished = [
+            job_id
+            for job_id, res in self.client.iter_jobs_to_finish(
+                job_ids,
+                sec_to_sleep=0.01,
+                max_concurrent=0)
+            if res["status"] == SUCCESS
+        ]
+        self.assertEqual(sorted(finished), sorted(job_ids))
+    # end of test_iter_jobs_to_finish_without_max_concurrent
+
+    def test_merge_chunked_predictions(self):
+        template = RequestTemplate(
+            req_dict={"dataset": "test.csv"},
+            use_model_name="chunked",
+            filter_features=["a"],
+            filter_features_dict={"a": 0})
+        merger = PredictionMerger()
+        job_ids = []
+        for res in self.client.submit_many(
+                merger.track(generate_ai_requests_iter(
+                    ({"a": i + 1} for i in range(95)),
+                    max_rows=10,
+                    template=template)),
+                max_in_flight=4):
+            job_ids.append(merger.add_job(res))
+        self.assertEqual(len(job_ids), 10)
+        self.assertFalse(merger.is_done())
+        for job_id, res in self.client.iter_jobs_to_finish(
+                list(reversed(job_ids)),
+                sec_to_sleep=0.01):
+            self.assertTrue(merger.add_result(job_id, res))
+        self.assertTrue(merger.is_done())
+        self.assertEqual(
+            [p["a"] for p in merger.get_predictions()],
+            [float(i + 1) for i in range(95)])
+        df = merger.get_df()
+        self.assertEqual(list(df.index), list(range(95)))
+        self.assertEqual(list(df["row"][0:12]), list(range(10)) + [0, 1])
+    # end of test_merge_chunked_predictions
+
+    def test_run_job_with_cache(self):
+        kwargs = {
+            "req_dict": {"dataset": "test.csv"},
+            "use_model_name": "cached",
+            "filter_features": ["a", "b"],
+            "filter_features_dict": {"a": 0, "b": 1}
+        }
+        # heartbeat traffic repeats the same few rows
+        rows = [{"a": (i % 3) + 1, "b": ""} for i in range(12)]
+        body = generate_ai_request(
+            predict_rows=rows,
+            **kwargs)["data"]
+        res = self.client.run_job_with_cache(
+            body,
+            sec_to_sleep=0.01)
+        self.assertEqual(res["status"], SUCCESS)
+        self.assertEqual(res["data"]["cache_hits"], 0)
+        self.assertEqual(res["data"]["num_submitted"], 3)
+        self.assertEqual(
+            [p["a"] for p in res["data"]["predictions"]],
+            [float((i % 3) + 1) for i in range(12)])
+        self.assertEqual(len(self.server.state.bodies[-1]["predict_rows"]), 3)
+
+        num_posts = len(self.server.state.bodies)
+        rows.append({"a": 9, "b": ""})
+        template = RequestTemplate(
+            predict_format="sparse",
+            **kwargs)
+        res = self.client.run_job_with_cache(
+            template.build(rows),
+            sec_to_sleep=0.01)
+        self.assertEqual(res["status"], SUCCESS)
+        self.assertEqual(res["data"]["cache_hits"], 12)
+        self.assertEqual(res["data"]["num_submitted"], 1)
+        self.assertEqual(
+            [p["a"] for p in res["data"]["predictions"]],
+            [float((i % 3) + 1) for i in range(12)] + [9.0])
+        self.assertEqual(len(self.server.state.bodies), num_posts + 1)
+        self.assertEqual(
+            self.server.state.bodies[-1]["predict_rows"],
+            template.schema.convert([{"a": 9, "b": ""}]))
+
+        # every row is cached so nothing is posted
+        res = self.client.run_job_with_cache(
+            body,
+            sec_to_sleep=0.01)
+        self.assertEqual(res["status"], SUCCESS)
+        self.assertIsNone(res["data"]["job"])
+        self.assertEqual(res["data"]["num_submitted"], 0)
+        self.assertEqual(len(self.server.state.bodies), num_posts + 1)
+    # end of test_run_job_with_cache
+
+    def test_shared_client_stress(self):
+        # short lived tokens make threads race on refreshes too
+        self.server.state.token_lifetime = 1.0
+        self.client.token_refresh_margin = 0.5
+
+        def run_one(i):
+            res = self.client.run_job({
+                "label": "stress",
+                "predict_rows": [{"a": i}]})
+            if res["status"] != SUCCESS:
+                return res
+            job_id = res["data"]["job"]["id"]
+            res = self.client.wait_for_job_to_finish(
+                job_id,
+                sec_to_sleep=0.01)
+            if res["status"] != SUCCESS:
+                return res
+            return self.client.get_job_by_id(job_id)
+        # end of run_one
+
+        num_threads = 16
+        with concurrent.futures.ThreadPoolExecutor(num_threads) as pool:
+            results = list(pool.map(
+                run_one,
+                range(100)))
+        for res in results:
+            self.assertEqual(res["status"], SUCCESS, res["error"])
+            self.assertEqual(res["data"]["label"], "stress")
+        self.assertLessEqual(
+            len(self.client.sessions),
+            num_threads + 1)
+        self.assertEqual(len(self.client.all_jobs), 100)
+    # end of test_shared_client_stress
+
+    def test_token_refreshed_before_it_expires(self):
+        self.server.state.token_lifetime = 2.0
+        self.client.token_refresh_margin = 1.5
+        self.assertEqual(self.client.login(), 0)
+        first_token = self.client.get_token()
+        self.assertIsNotNone(self.client.token_expires_at)
+        time.sleep(0.6)
+        self.client.get_token()
+        for i in range(100):
+            if not self.client.refreshing:
+                break
+            time.sleep(0.01)
+        self.assertNotEqual(self.client.get_token(), first_token)
+        self.assertEqual(self.server.state.logins, 2)
+        res = self.client.run_job({
+            "label": "test",
+            "predict_rows": [{"a": 1}]})
+        self.assertEqual(res["status"], SUCCESS)
+        self.assertEqual(self.server.state.logins, 2)
+    # end of test_token_refreshed_before_it_expires
+
+    def test_sync_refresh_keeps_background_flag(self):
+        self.server.state.token_lifetime = 300.0
+        self.assertEqual(self.client.login(), 0)
+        with self.client.login_lock:
+            # the background login waits on the held lock
+            self.client.start_token_refresh()
+            self.assertTrue(self.client.refreshing)
+            self.client.refresh_token(
+                "not-the-current-token")
+            self.assertTrue(self.client.refreshing)
+        for i in range(100):
+            if not self.client.refreshing:
+                break
+            time.sleep(0.01)
+        self.assertFalse(self.client.refreshing)
+    # end of test_sync_refresh_keeps_background_flag
+
+    def test_token_cache_shared_between_clients(self):
+        self.server.state.token_lifetime = 300.0
+        path = os.path.join(
+            tempfile.mkdtemp(),
+            "tokens.json")
+        for i in range(3):
+            client = AIClient(
+                url=self.url,
+                user="user",
+                password="password",
+                verbose=False,
+                token_cache_file=path)
+            res = client.run_job({
+                "label": "test",
+                "predict_rows": [{"a": i}]})
+            client.close()
+            self.assertEqual(res["status"], SUCCESS)
+        self.assertEqual(self.server.state.logins, 1)
+
+        # a revoked token is replaced with a new login
+        self.server.state.tokens.clear()
+        client = AIClient(
+            url=self.url,
+            user="user",
+            password="password",
+            verbose=False,
+            token_cache_file=path)
+        res = client.run_job({
+            "label": "test",
+            "predict_rows": [{"a": 1}]})
+        client.close()
+        self.assertEqual(res["status"], SUCCESS)
+        self.assertEqual(self.server.state.logins, 2)
+        self.assertEqual(
+            client.token_cache.get(self.url, "user"),
+            client.token)
+    # end of test_token_cache_shared_between_clients
+
+# end of AIClientTest
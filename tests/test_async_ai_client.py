@@ -0,0 +1,270 @@
+import os
+import asyncio
+import unittest
+import importlib.util
+import tempfile
+from tests.base_test import BaseTestCase
+from tests.stand_in_server import start_stand_in_server
+from antinex_client.async_ai_client import AsyncAIClient
+from antinex_client.consts import SUCCESS
+
+
+has_aiohttp = importlib.util.find_spec("aiohttp") is not None
+
+
+@unittest.skipIf(
+    not has_aiohttp,
+    "requires: pip install antinex-client[async]")
+class AsyncAIClientTest(BaseTestCase):
+
+    def setUp(self):
+        super(AsyncAIClientTest, self).setUp()
+        self.server, self.url = start_stand_in_server()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+    # end of setUp
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        self.server.shutdown()
+        self.server.server_close()
+        super(AsyncAIClientTest, self).tearDown()
+    # end of tearDown
+
+    def run_loop(self, coro):
+        return self.loop.run_until_complete(coro)
+    # end of run_loop
+
+    def test_run_and_wait_for_many_jobs(self):
+
+        async def run_all():
+            async with AsyncAIClient(
+                    url=self.url,
+                    user="user",
+                    password="password",
+                    verbose=False) as client:
+                started = await asyncio.gather(*[
+                    client.run_job({
+                        "label": "test",
+                        "predict_rows": [{"a": i}]})
+                    for i in range(20)
+                ])
+                return await asyncio.gather(*[
+                    client.wait_for_job_to_finish(
+                        res["data"]["job"]["id"],
+                        sec_to_sleep=0.01)
+                    for res in started
+                ])
+        # end of run_all
+
+        finished = self.run_loop(run_all())
+        self.assertEqual(len(finished), 20)
+        # concurrent 401s share one login
+        self.assertEqual(self.server.state.logins, 1)
+        for res in finished:
+            self.assertEqual(res["status"], SUCCESS)
+            self.assertEqual(
+                res["data"]["result"]["status"],
+                "finished")
+    # end of test_run_and_wait_for_many_jobs
+
+    def test_wait_for_jobs_to_finish(self):
+
+        async def run_all():
+            async with AsyncAIClient(
+                    url=self.url,
+                    verbose=False) as client:
+                await client.login()
+                job_ids = []
+                for i in range(10):
+                    res = await client.run_job({
+                        "label": "test",
+                        "predict_rows": [{"a": i}]})
+                    job_ids.append(res["data"]["job"]["id"])
+                first = await client.wait_any(
+                    job_ids,
+                    sec_to_sleep=0.01)
+                every = await client.wait_all(
+                    job_ids,
+                    sec_to_sleep=0.01,
+                    max_concurrent=4)
+                return job_ids, first, every
+        # end of run_all
+
+        job_ids, first, every = self.run_loop(run_all())
+        self.assertEqual(len(first["data"]["finished"]), 1)
+        self.assertEqual(every["status"], SUCCESS)
+        self.assertEqual(sorted(every["data"]["finished"]), job_ids)
+        self.assertEqual(every["data"]["pending"], [])
+    # end of test_wait_for_jobs_to_finish
+
+    def test_prepare(self):
+
+        async def run_prepare():
+            async with AsyncAIClient(
+                    url=self.url,
+                    verbose=False) as client:
+                res = await client.run_prepare({"output_dir": "/tmp"})
+                return await client.wait_for_prepare_to_finish(
+                    res["data"]["id"],
+                    sec_to_sleep=0.01)
+        # end of run_prepare
+
+        res = self.run_loop(run_prepare())
+        self.assertEqual(res["status"], SUCCESS)
+        self.assertEqual(res["data"]["status"], "finished")
+    # end of test_prepare
+
+    def test_submit_many(self):
+        pulled = []
+
+        def build_bodies():
+            for i in range(20):
+                pulled.append(i)
+                yield {
+                    "label": "bulk-{}".format(i),
+                    "predict_rows": [{"a": i}]}
+        # end of build_bodies
+
+        async def run_all():
+            labels = []
+            async with AsyncAIClient(
+                    url=self.url,
+                    user="user",
+                    password="password",
+                    verbose=False) as client:
+                async for res in client.submit_many(
+                        build_bodies(),
+                        max_in_flight=4):
+                    # results arrive before the batch is posted
+                    self.assertLessEqual(len(pulled), len(labels) + 4)
+                    self.assertEqual(res["status"], SUCCESS)
+                    labels.append(res["data"]["job"]["label"])
+            return labels
+        # end of run_all
+
+        labels = self.run_loop(run_all())
+        self.assertEqual(
+            labels,
+            ["bulk-{}".format(i) for i in range(20)])
+        self.assertEqual(self.server.state.logins, 1)
+    # end of test_submit_many
+
+    def test_submit_many_stops_early(self):
+        pulled = []
+
+        def build_bodies():
+            for i in range(20):
+                pulled.append(i)
+                yield {
+                    "label": "stop-{}".format(i),
+                    "predict_rows": [{"a": i}]}
+        # end of build_bodies
+
+        async def run_first():
+            async with AsyncAIClient(
+                    url=self.url,
+                    user="user",
+                    password="password",
+                    verbose=False) as client:
+                results = client.submit_many(
+                    build_bodies(),
+                    max_in_flight=2)
+                first = await results.__anext__()
+                await results.aclose()
+                with self.assertRaises(StopAsyncIteration):
+                    await results.__anext__()
+                return first
+        # end of run_first
+
+        first = self.run_loop(run_first())
+        self.assertEqual(first["data"]["job"]["label"], "stop-0")
+        self.assertLessEqual(len(pulled), 2)
+    # end of test_submit_many_stops_early
+
+    def test_status_probe_and_conditional_get(self):
+
+        async def run_all():
+            async with AsyncAIClient(
+                    url=self.url,
+                    user="user",
+                    password="password",
+                    verbose=False) as client:
+                res = await client.run_job({
+                    "label": "test",
+                    "predict_rows": [{"a": 1}]})
+                job_id = res["data"]["job"]["id"]
+                finished = await client.wait_for_job_to_finish(
+                    job_id,
+                    sec_to_sleep=0.01)
+                probe_not_modified = self.server.state.not_modified
+                self.server.state.not_modified = 0
+                first = await client.get_job_by_id(job_id)
+                second = await client.get_job_by_id(job_id)
+                return job_id, finished, first, second, probe_not_modified
+        # end of run_all
+
+        job_id, finished, first, second, probe_not_modified = self.run_loop(
+            run_all())
+        # status polls were revalidated too
+        self.assertGreater(probe_not_modified, 0)
+        self.assertEqual(finished["status"], SUCCESS)
+        result = finished["data"]["result"]
+        self.assertIn("predictions_json", result)
+        full_gets = [
+            path
+            for method, path in self.server.state.requests
+            if method == "GET" and "?" not in path
+        ]
+        self.assertEqual(
+            sorted(set(full_gets)),
+            sorted([
+                "/ml/{}".format(job_id),
+                "/mlresults/{}".format(result["id"])
+            ]))
+        self.assertEqual(second["status"], SUCCESS)
+        self.assertEqual(first["data"], second["data"])
+        self.assertEqual(self.server.state.not_modified, 2)
+    # end of test_status_probe_and_conditional_get
+
+    def test_token_cache_and_job_durations(self):
+        self.server.state.token_lifetime = 300.0
+        use_dir = tempfile.mkdtemp()
+        token_cache_file = os.path.join(
+            use_dir,
+            "tokens.json")
+        eta_file = os.path.join(
+            use_dir,
+            "eta.json")
+
+        async def run_one():
+            async with AsyncAIClient(
+                    url=self.url,
+                    user="user",
+                    password="password",
+                    verbose=False,
+                    eta_file=eta_file,
+                    token_cache_file=token_cache_file) as client:
+                res = await client.run_job({
+                    "label": "eta-model",
+                    "predict_rows": [{"a": 1}]})
+                job_id = res["data"]["job"]["id"]
+                delay = client.get_first_poll_delay(job_id)
+                res = await client.wait_for_job_to_finish(
+                    job_id,
+                    sec_to_sleep=0.05)
+                return delay, res
+        # end of run_one
+
+        first_delay, res = self.run_loop(run_one())
+        self.assertEqual(res["status"], SUCCESS)
+        self.assertEqual(first_delay, 0.0)
+        second_delay, res = self.run_loop(run_one())
+        self.assertEqual(res["status"], SUCCESS)
+        self.assertGreater(second_delay, 0.0)
+        # the second client reused the cached token
+        self.assertEqual(self.server.state.logins, 1)
+    # end of test_token_cache_and_job_durations
+
+# end of AsyncAIClientTest
@@ -0,0 +1,37 @@
+from tests.base_test import BaseTestCase
+from antinex_client.compression import compress_body
+from antinex_client.compression import decompress_body
+
+
+class CompressionTest(BaseTestCase):
+
+    def test_round_trip(self):
+        body = '{"predict_rows": [' + ", ".join(
+            ['{"a": 1}'] * 1000) + ']}'
+        for encoding in ["gzip", "deflate"]:
+            data, use_encoding = compress_body(
+                body,
+                encoding=encoding)
+            self.assertEqual(use_encoding, encoding)
+            self.assertLess(len(data), len(body))
+            self.assertEqual(
+                decompress_body(data, use_encoding).decode("utf-8"),
+                body)
+    # end of test_round_trip
+
+    def test_small_bodies_are_not_compressed(self):
+        data, use_encoding = compress_body(
+            "{}",
+            min_bytes=1024)
+        self.assertIsNone(use_encoding)
+        self.assertEqual(data, b"{}")
+    # end of test_small_bodies_are_not_compressed
+
+    def test_unsupported_encoding(self):
+        with self.assertRaises(ValueError):
+            compress_body(
+                "{}",
+                encoding="br")
+    # end of test_unsupported_encoding
+
+# end of CompressionTest
@@ -0,0 +1,182 @@
+import json
+import random
+import mock
+import concurrent.futures
+from tests.base_test import BaseTestCase
+from antinex_client.generate_ai_request import convert_predict_rows_loop
+from antinex_client.generate_ai_request import convert_predict_rows_fast
+from antinex_client.generate_ai_request import get_row_schema
+from antinex_client.generate_ai_request import RowSchema
+from antinex_client.generate_ai_request import generate_ai_request
+
+
+class ConvertPredictRowsTest(BaseTestCase):
+
+    features = [
+        "idx",
+        "src_port",
+        "dst_port",
+        "ip_len",
+        "tcp_flags"
+    ]
+
+    cell_values = [
+        0,
+        1,
+        -7,
+        0.0,
+        2.5,
+        float("nan"),
+        None,
+        "",
+        "0",
+        "0.0",
+        "80",
+        "1e3",
+        " 42 ",
+        True,
+        False
+    ]
+
+    bad_values = [
+        "not-a-number",
+        [1, 2],
+        {"a": 1}
+    ]
+
+    def build_rows(
+            self,
+            num_rows,
+            seed,
+            bad_rate=0.0):
+        rand = random.Random(seed)
+        keys = self.features[1:] + ["not_a_feature", "label_value"]
+        rows = []
+        for i in range(num_rows):
+            row = {}
+            for key in keys:
+                if rand.random() < bad_rate:
+                    row[key] = rand.choice(self.bad_values)
+                else:
+                    row[key] = rand.choice(self.cell_values)
+            rows.append(row)
+        return rows
+    # end of build_rows
+
+    def build_kwargs(
+            self,
+            **kwargs):
+        use_kwargs = {
+            "filter_features_dict": {
+                f: idx
+                for idx, f in enumerate(self.features)
+            },
+            "filter_features": self.features,
+            "predict_feature": "label_value",
+            "convert_to_type": "float",
+            "include_failed_conversions": True,
+            "value_for_missing": "-1.0",
+            "check_missing_predict_feature": True
+        }
+        use_kwargs.update(kwargs)
+        return use_kwargs
+    # end of build_kwargs
+
+    def assert_same_output(
+            self,
+            rows,
+            **kwargs):
+        use_kwargs = self.build_kwargs(
+            **kwargs)
+        expected = convert_predict_rows_loop(
+            predict_rows=rows,
+            **use_kwargs)
+        found = convert_predict_rows_fast(
+            predict_rows=rows,
+            **use_kwargs)
+        # compare the encoded rows so key order and types must match
+        self.assertEqual(
+            json.dumps(found),
+            json.dumps(expected))
+    # end of assert_same_output
+
+    def test_matches_loop(self):
+        for seed in range(5):
+            rows = self.build_rows(200, seed)
+            for convert_to_type in ["float", "int", "str"]:
+                for check_missing in [True, False]:
+                    self.assert_same_output(
+                        rows,
+                        convert_to_type=convert_to_type,
+                        check_missing_predict_feature=check_missing)
+    # end of test_matches_loop
+
+    def test_failed_conversions_match_loop(self):
+        rows = self.build_rows(200, 7, bad_rate=0.02)
+        for include_failed in [True, False]:
+            with mock.patch(
+                    "antinex_client.generate_ai_request.log"):
+                self.assert_same_output(
+                    rows,
+                    include_failed_conversions=include_failed)
+    # end of test_failed_conversions_match_loop
+
+    def test_irregular_rows_and_no_conversion(self):
+        rows = self.build_rows(50, 3)
+        rows[10] = dict(reversed(list(rows[10].items())))
+        del rows[20]["src_port"]
+        self.assert_same_output(rows)
+        with mock.patch(
+                "antinex_client.generate_ai_request.ANTINEX_CONVERT_DATA",
+                False):
+            self.assert_same_output(self.build_rows(50, 4))
+    # end of test_irregular_rows_and_no_conversion
+
+    def test_row_schema_is_shared(self):
+        schema = get_row_schema(
+            **self.build_kwargs())
+        self.assertIs(
+            get_row_schema(**self.build_kwargs()),
+            schema)
+        self.assertIsNot(
+            get_row_schema(**self.build_kwargs(convert_to_type="int")),
+            schema)
+        schema = RowSchema(
+            **self.build_kwargs())
+        rows = self.build_rows(20, 5)
+        rows[5] = dict(reversed(list(rows[5].items())))
+        schema.convert(rows)
+        # one plan per row key layout
+        self.assertEqual(len(schema.plans), 2)
+    # end of test_row_schema_is_shared
+
+    def test_row_schema_key_uses_types(self):
+        rows = self.build_rows(50, 8)
+        for value_for_missing in [-1.0, -1, True, 1, 0, False]:
+            self.assert_same_output(
+                rows,
+                value_for_missing=value_for_missing)
+        self.assertIsNot(
+            get_row_schema(**self.build_kwargs(value_for_missing=-1)),
+            get_row_schema(**self.build_kwargs(value_for_missing=-1.0)))
+    # end of test_row_schema_key_uses_types
+
+    def test_process_pool_keeps_row_order(self):
+        rows = self.build_rows(300, 7, bad_rate=0.05)
+        kwargs = self.build_kwargs(
+            req_dict={"label": "pool"})
+        expected = generate_ai_request(
+            predict_rows=rows,
+            **kwargs)["data"]
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=2) as executor:
+            found = generate_ai_request(
+                predict_rows=rows,
+                executor=executor,
+                **kwargs)["data"]
+        self.assertEqual(
+            json.dumps(found),
+            json.dumps(expected))
+    # end of test_process_pool_keeps_row_order
+
+# end of ConvertPredictRowsTest
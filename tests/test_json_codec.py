@@ -0,0 +1,71 @@
+import json
+from tests.base_test import BaseTestCase
+from antinex_client.json_codec import JSONCodec
+from antinex_client.json_codec import SUPPORTED_BACKENDS
+from antinex_client.utils import ppj
+
+
+class JSONCodecTest(BaseTestCase):
+
+    def test_round_trip_on_every_installed_backend(self):
+        body = {
+            "label": "predict-ü",
+            "url": "http://localhost:8010/ml/",
+            "predict_rows": [
+                {"idx": i, "value": i * 0.5, "name": None}
+                for i in range(10)
+            ],
+            1: "int keys"
+        }
+        expected = json.loads(json.dumps(body))
+        for backend in SUPPORTED_BACKENDS:
+            codec = JSONCodec(backend=backend)
+            data = codec.dumps(body)
+            self.assertIsInstance(data, bytes)
+            self.assertEqual(json.loads(data.decode("utf-8")), expected)
+            self.assertEqual(codec.loads(data), expected)
+            self.assertEqual(codec.loads(data.decode("utf-8")), expected)
+    # end of test_round_trip_on_every_installed_backend
+
+    def test_stdlib_fallback(self):
+        codec = JSONCodec(backend="json")
+        self.assertEqual(codec.backend, "json")
+        self.assertEqual(codec.dumps({"a": 1}), b'{"a": 1}')
+        with self.assertRaises(ValueError):
+            JSONCodec(backend="not-a-json-library")
+    # end of test_stdlib_fallback
+
+    def test_non_finite_rows_match_stdlib(self):
+        body = {
+            "predict_rows": [
+                {"idx": 1, "value": float("nan"), "name": None},
+                {"idx": 2, "value": float("inf"), "name": "null"},
+                {"idx": 3, "value": -float("inf"), "name": "x"}
+            ]
+        }
+        expected = json.dumps(body).encode("utf-8")
+        for backend in SUPPORTED_BACKENDS:
+            codec = JSONCodec(backend=backend)
+            data = codec.dumps(body)
+            self.assertIn(b"NaN", data)
+            self.assertIn(b"-Infinity", data)
+            if codec.backend in ["orjson", "json"]:
+                self.assertEqual(data, expected)
+        # a None without a NaN stays on the fast path
+        self.assertEqual(
+            json.loads(JSONCodec().dumps({"a": None, "b": 1.5})),
+            {"a": None, "b": 1.5})
+    # end of test_non_finite_rows_match_stdlib
+
+    def test_ppj_uses_codec(self):
+        body = {"b": [1, float("nan")], "a": {"c": None}}
+        for backend in SUPPORTED_BACKENDS:
+            data = JSONCodec(backend=backend).pretty(body).decode("utf-8")
+            self.assertLess(data.index('"a"'), data.index('"b"'))
+            self.assertIn("NaN", data)
+        self.assertEqual(
+            json.loads(ppj({"b": 1, "a": [None]})),
+            {"a": [None], "b": 1})
+    # end of test_ppj_uses_codec
+
+# end of JSONCodecTest
@@ -0,0 +1,61 @@
+from tests.base_test import BaseTestCase
+from antinex_client.poll_policy import PollPolicy
+from antinex_client.poll_policy import FixedPollPolicy
+from antinex_client.poll_policy import build_poll_policy
+
+
+class PollPolicyTest(BaseTestCase):
+
+    def test_backoff_grows_to_ceiling(self):
+        policy = PollPolicy(
+            floor=1.0,
+            ceiling=10.0,
+            multiplier=2.0,
+            jitter=0.0,
+            fast_polls=2,
+            fast_sleep=0.1)
+        sleeps = [
+            policy.get_sleep(attempt)
+            for attempt in range(1, 10)
+        ]
+        self.assertEqual(
+            sleeps,
+            [0.1, 0.1, 1.0, 2.0, 4.0, 8.0, 10.0, 10.0, 10.0])
+        self.assertEqual(policy.get_sleep(100000), 10.0)
+    # end of test_backoff_grows_to_ceiling
+
+    def test_jitter_stays_in_bounds(self):
+        policy = PollPolicy(
+            floor=1.0,
+            ceiling=8.0,
+            multiplier=2.0,
+            jitter=0.5,
+            fast_polls=0,
+            seed=7)
+        for attempt in range(1, 200):
+            base = policy.get_base_sleep(attempt)
+            use_sleep = policy.get_sleep(attempt)
+            self.assertTrue(base * 0.5 <= use_sleep <= base)
+    # end of test_jitter_stays_in_bounds
+
+    def test_build_poll_policy(self):
+        default_policy = PollPolicy()
+        explicit = PollPolicy(floor=2.0)
+        self.assertIs(
+            build_poll_policy(
+                sec_to_sleep=1.0,
+                poll_policy=explicit,
+                default_policy=default_policy),
+            explicit)
+        fixed = build_poll_policy(
+            sec_to_sleep=3.0,
+            default_policy=default_policy)
+        self.assertIsInstance(fixed, FixedPollPolicy)
+        self.assertEqual(fixed.get_sleep(50), 3.0)
+        self.assertIs(
+            build_poll_policy(
+                default_policy=default_policy),
+            default_policy)
+    # end of test_build_poll_policy
+
+# end of PollPolicyTest
@@ -0,0 +1,60 @@
+import json
+from tests.base_test import BaseTestCase
+from antinex_client.precision import ValueRounder
+from antinex_client.generate_ai_request import generate_ai_request
+from antinex_client.request_template import RequestTemplate
+
+
+class ValueRounderTest(BaseTestCase):
+
+    def test_round_value(self):
+        rounder = ValueRounder(
+            precision=3)
+        self.assertEqual(rounder.round_value(1234.5678), 1230.0)
+        self.assertEqual(rounder.round_value(0.000123456), 0.000123)
+        self.assertEqual(rounder.round_value(7), 7)
+        self.assertEqual(rounder.round_value("1.23456"), "1.23456")
+        self.assertEqual(rounder.round_value(float("inf")), float("inf"))
+        rounder = ValueRounder(
+            dtype="float32")
+        self.assertEqual(repr(rounder.round_value(1 / 3)), "0.33333334")
+        self.assertEqual(rounder.round_value(0.1), 0.1)
+        self.assertEqual(rounder.round_value(1e300), 1e300)
+        self.assertFalse(ValueRounder().is_enabled())
+        with self.assertRaises(ValueError):
+            ValueRounder(dtype="float16")
+    # end of test_round_value
+
+    def test_rounded_requests(self):
+        features = ["a", "b"]
+        kwargs = {
+            "req_dict": {"label": "precision"},
+            "use_model_name": "precision",
+            "filter_features": features,
+            "filter_features_dict": {"a": 0, "b": 1},
+            "convert_to_type": "float"
+        }
+        rows = [
+            {"a": str(i / 7.0), "b": ""}
+            for i in range(1, 30)
+        ]
+        full = generate_ai_request(
+            predict_rows=rows,
+            **kwargs)["data"]
+        found = generate_ai_request(
+            predict_rows=rows,
+            precision=4,
+            **kwargs)["data"]
+        self.assertEqual(found["predict_rows"][0]["a"], 0.1429)
+        self.assertEqual(found["predict_rows"][0]["b"], -1.0)
+        self.assertLess(len(json.dumps(found)), len(json.dumps(full)))
+        template = RequestTemplate(
+            precision=4,
+            predict_format="sparse",
+            **kwargs)
+        body = json.loads(template.build(rows).decode("utf-8"))
+        # the filled in predict feature keeps the unconverted value
+        self.assertEqual(body["predict_values"][0], [0, 0.1429, 2, "-1.0"])
+    # end of test_rounded_requests
+
+# end of ValueRounderTest
@@ -0,0 +1,159 @@
+import json
+from tests.base_test import BaseTestCase
+from antinex_client.generate_ai_request import generate_ai_request
+from antinex_client.request_template import RequestTemplate
+from antinex_client.request_template import generate_ai_requests_iter
+from antinex_client.predict_format import ColumnarEncoder
+from antinex_client.predict_format import SparseEncoder
+from antinex_client.predict_format import set_predict_rows
+from antinex_client.predict_format import decode_predict_rows
+from antinex_client.predict_format import get_num_predict_rows
+
+
+class PredictFormatTest(BaseTestCase):
+
+    def setUp(self):
+        super(PredictFormatTest, self).setUp()
+        self.features = [
+            "feature_{}".format(i)
+            for i in range(20)
+        ]
+        self.kwargs = {
+            "req_dict": {
+                "label": "columnar",
+                "dataset": "test.csv"
+            },
+            "use_model_name": "columnar",
+            "filter_features": self.features,
+            "filter_features_dict": {
+                f: idx
+                for idx, f in enumerate(self.features)
+            },
+            "convert_to_type": "float",
+            "include_failed_conversions": False
+        }
+        self.rows = []
+        for idx in range(50):
+            row = {
+                f: str(idx + i)
+                for i, f in enumerate(self.features)
+            }
+            if idx % 10 == 3:
+                # a failed conversion is dropped from this row
+                row[self.features[4]] = "not-a-number"
+            if idx % 10 == 5:
+                row = dict(reversed(list(row.items())))
+            self.rows.append(row)
+    # end of setUp
+
+    def test_encoder(self):
+        encoder = ColumnarEncoder(["a", "b"])
+        self.assertEqual(
+            encoder.encode_rows([
+                {"b": 2, "a": 1},
+                {"a": 3},
+                {"a": 4, "c": 5}
+            ]),
+            [[1, 2], {"a": 3}, {"a": 4, "c": 5}])
+        self.assertEqual(ColumnarEncoder(["a"]).encode_row({"a": 1}), [1])
+        body = set_predict_rows(
+            {"label": "x"},
+            [{"a": 1, "b": 2}, {"a": 3}],
+            predict_format="columnar")
+        self.assertEqual(body["predict_columns"], ["a", "b"])
+        self.assertEqual(get_num_predict_rows(body), 2)
+        self.assertEqual(
+            decode_predict_rows(body),
+            {"label": "x", "predict_rows": [{"a": 1, "b": 2}, {"a": 3}]})
+        with self.assertRaises(ValueError):
+            set_predict_rows({}, [], predict_format="not-a-format")
+    # end of test_encoder
+
+    def test_columnar_round_trip(self):
+        expected = generate_ai_request(
+            predict_rows=self.rows,
+            **self.kwargs)["data"]
+        found = generate_ai_request(
+            predict_rows=self.rows,
+            predict_format="columnar",
+            **self.kwargs)["data"]
+        self.assertNotIn("predict_rows", found)
+        self.assertEqual(decode_predict_rows(found), expected)
+        self.assertLess(
+            len(json.dumps(found)),
+            len(json.dumps(expected)) / 2)
+
+        template = RequestTemplate(
+            predict_format="columnar",
+            **self.kwargs)
+        self.assertEqual(
+            json.loads(template.build(self.rows).decode("utf-8")),
+            found)
+        self.assertEqual(template.build_body(self.rows), found)
+        predict_rows = []
+        for body in generate_ai_requests_iter(
+                self.rows,
+                max_rows=15,
+                template=template):
+            predict_rows.extend(decode_predict_rows(
+                json.loads(body.decode("utf-8")))["predict_rows"])
+        self.assertEqual(predict_rows, expected["predict_rows"])
+    # end of test_columnar_round_trip
+
+    def test_sparse_encoder(self):
+        encoder = SparseEncoder(["a", "b", "c"], -1.0)
+        self.assertEqual(
+            encoder.encode_rows([
+                {"a": -1.0, "b": 7.0, "c": -1.0},
+                {"a": -1, "b": -1.0, "c": float("inf")},
+                {"a": 1.0}
+            ]),
+            [[1, 7.0], [0, -1, 2, float("inf")], {"a": 1.0}])
+        body = set_predict_rows(
+            {},
+            [{"a": -1.0, "b": -1.0}, {"a": 2.0, "b": -1.0}],
+            predict_format="sparse",
+            default=-1.0)
+        self.assertEqual(body["predict_values"], [[], [0, 2.0]])
+        self.assertEqual(
+            decode_predict_rows(json.loads(json.dumps(body))),
+            {"predict_rows": [
+                {"a": -1.0, "b": -1.0},
+                {"a": 2.0, "b": -1.0}]})
+    # end of test_sparse_encoder
+
+    def test_sparse_round_trip(self):
+        # only a few columns of each row are filled in
+        rows = []
+        for idx in range(60):
+            row = {
+                f: ""
+                for f in self.features
+            }
+            for f in self.features[idx % 15:idx % 15 + 3]:
+                row[f] = str(idx + 1)
+            rows.append(row)
+        rows[7][self.features[0]] = "not-a-number"
+        expected = generate_ai_request(
+            predict_rows=rows,
+            **self.kwargs)["data"]
+        found = generate_ai_request(
+            predict_rows=rows,
+            predict_format="sparse",
+            **self.kwargs)["data"]
+        self.assertEqual(found["predict_default"], -1.0)
+        self.assertEqual(
+            decode_predict_rows(json.loads(json.dumps(found))),
+            expected)
+        self.assertLess(
+            len(json.dumps(found)) * 4,
+            len(json.dumps(expected)))
+        template = RequestTemplate(
+            predict_format="sparse",
+            **self.kwargs)
+        self.assertEqual(
+            json.loads(template.build(rows).decode("utf-8")),
+            found)
+    # end of test_sparse_round_trip
+
+# end of PredictFormatTest
@@ -0,0 +1,79 @@
+import os
+import hashlib
+import tempfile
+from tests.base_test import BaseTestCase
+from antinex_client.prediction_cache import PredictionCache
+from antinex_client.prediction_cache import build_row_key
+
+
+class PredictionCacheTest(BaseTestCase):
+
+    def test_row_key(self):
+        self.assertEqual(
+            build_row_key("model", {"a": 1.0, "b": 2.0}),
+            build_row_key("model", {"b": 2.0, "a": 1.0}))
+        self.assertNotEqual(
+            build_row_key("model", {"a": 1.0}),
+            build_row_key("other", {"a": 1.0}))
+        self.assertNotEqual(
+            build_row_key("model", {"a": 1.0}),
+            build_row_key("model", {"a": 2.0}))
+        self.assertNotEqual(
+            build_row_key("model", {"a": float("nan")}),
+            build_row_key("model", {"a": None}))
+        # the same key no matter which json library is installed
+        self.assertEqual(
+            build_row_key("model", {"b": float("nan"), "a": 1.0}),
+            hashlib.sha1(b'["model",{"a":1.0,"b":NaN}]').hexdigest())
+    # end of test_row_key
+
+    def test_lru(self):
+        cache = PredictionCache(
+            max_entries=2)
+        cache.set_many("m", [("a", {"p": 1}), ("b", {"p": 2})])
+        self.assertEqual(cache.get_many(["a"]), {"a": {"p": 1}})
+        cache.set_many("m", [("c", {"p": 3})])
+        # b was the least recently used
+        self.assertEqual(
+            cache.get_many(["a", "b", "c"]),
+            {"a": {"p": 1}, "c": {"p": 3}})
+        self.assertEqual(cache.get_stats()["hits"], 3)
+        self.assertEqual(cache.get_stats()["misses"], 1)
+    # end of test_lru
+
+    def test_nan_and_none_rows(self):
+        cache = PredictionCache()
+        nan_key = build_row_key("m", {"a": float("nan")})
+        none_key = build_row_key("m", {"a": None})
+        cache.set_many("m", [(nan_key, {"label_value": 1})])
+        self.assertEqual(cache.get_many([none_key]), {})
+        self.assertEqual(
+            cache.get_many([nan_key]),
+            {nan_key: {"label_value": 1}})
+    # end of test_nan_and_none_rows
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_file = os.path.join(tmp_dir, "cache", "predictions.db")
+            cache = PredictionCache(
+                max_entries=1,
+                db_file=db_file)
+            cache.set_many("m", [("a", {"p": 1}), ("b", {"p": 2})])
+            cache.set_many("n", [("c", {"p": 3})])
+            # evicted from memory but still on disk
+            self.assertEqual(cache.get_many(["a"]), {"a": {"p": 1}})
+            cache.close()
+
+            cache = PredictionCache(
+                db_file=db_file)
+            self.assertEqual(
+                cache.get_many(["a", "b", "c", "d"]),
+                {"a": {"p": 1}, "b": {"p": 2}, "c": {"p": 3}})
+            cache.clear(label="m")
+            self.assertEqual(
+                cache.get_many(["a", "b", "c"]),
+                {"c": {"p": 3}})
+            cache.close()
+    # end of test_disk_tier
+
+# end of PredictionCacheTest
@@ -0,0 +1,108 @@
+from tests.base_test import BaseTestCase
+from antinex_client.prediction_merger import PredictionMerger
+from antinex_client.request_template import EncodedRequest
+from antinex_client.consts import SUCCESS
+from antinex_client.consts import ERROR
+
+
+def build_job_response(
+        job_id):
+    return {
+        "status": SUCCESS,
+        "error": "",
+        "data": {
+            "job": {"id": job_id},
+            "results": {}
+        }
+    }
+
+
+def build_result_response(
+        predictions):
+    return {
+        "status": SUCCESS,
+        "error": "",
+        "data": {
+            "job": {},
+            "result": {
+                "status": "finished",
+                "predictions_json": {
+                    "predictions": predictions
+                }
+            }
+        }
+    }
+
+
+class PredictionMergerTest(BaseTestCase):
+
+    def test_out_of_order_chunks(self):
+        merger = PredictionMerger(
+            fill_value={"missing": True})
+        bodies = [
+            {"predict_rows": [{"a": 0}, {"a": 1}]},
+            {"predict_rows": [{"a": 2}]},
+            {"predict_rows": [{"a": 3}, {"a": 4}, {"a": 5}]}
+        ]
+        for job_id, body in enumerate(merger.track(bodies)):
+            self.assertEqual(
+                merger.add_job(build_job_response(job_id)),
+                job_id)
+        self.assertEqual(merger.get_pending(), [0, 2, 3])
+
+        merger.add_result(2, build_result_response([3, 4, 5]))
+        self.assertEqual(merger.pop_ready(), [])
+        self.assertEqual(merger.get_predictions(), [3, 4, 5])
+        self.assertEqual(
+            merger.get_predictions(fill_missing=True),
+            [{"missing": True}] * 3 + [3, 4, 5])
+        self.assertEqual(list(merger.get_df().index), [3, 4, 5])
+
+        merger.add_result(0, build_result_response([0, 1]))
+        self.assertEqual(merger.pop_ready(), [0, 1])
+        self.assertEqual(merger.pop_ready(), [])
+        self.assertFalse(merger.is_done())
+
+        merger.add_result(1, build_result_response([2]))
+        self.assertEqual(merger.pop_ready(), [2, 3, 4, 5])
+        self.assertTrue(merger.is_done())
+        # popped chunks are not kept
+        self.assertEqual(merger.chunks, {})
+        self.assertEqual(merger.get_predictions(), [])
+    # end of test_out_of_order_chunks
+
+    def test_encoded_offsets_and_failures(self):
+        merger = PredictionMerger()
+        merger.track_body(EncodedRequest(b"{}", num_rows=4, offset=4))
+        merger.track_body(EncodedRequest(b"{}", num_rows=4, offset=0))
+        self.assertIsNone(merger.add_job({
+            "status": ERROR,
+            "error": "server down",
+            "data": None}))
+        self.assertEqual(merger.add_job(build_job_response(7)), 7)
+        self.assertEqual(merger.failed, {4: "server down"})
+        self.assertFalse(merger.add_result(8, build_result_response([])))
+        merger.add_result(7, build_result_response(list(range(4))))
+        self.assertEqual(merger.pop_ready(), [0, 1, 2, 3])
+        self.assertEqual(merger.get_pending(), [4])
+        # a chunk that was retried on its own can still be added
+        merger.add_predictions(4, list(range(4, 8)))
+        self.assertEqual(merger.failed, {})
+        self.assertEqual(merger.get_predictions(), list(range(4, 8)))
+        self.assertTrue(merger.is_done())
+        # a late copy of a popped chunk is not added again
+        merger.add_predictions(0, list(range(4)))
+        self.assertEqual(merger.pop_ready(), list(range(4, 8)))
+        self.assertEqual(merger.chunks, {})
+    # end of test_encoded_offsets_and_failures
+
+    def test_add_job_without_tracked_bodies(self):
+        merger = PredictionMerger()
+        self.assertIsNone(merger.add_job(build_job_response(1)))
+        self.assertEqual(merger.jobs, {})
+        merger.track_body({"predict_rows": [{"a": 0}]})
+        self.assertEqual(merger.add_job(build_job_response(2)), 2)
+        self.assertIsNone(merger.add_job(build_job_response(3)))
+    # end of test_add_job_without_tracked_bodies
+
+# end of PredictionMergerTest
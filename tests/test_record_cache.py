@@ -0,0 +1,102 @@
+import time
+from tests.base_test import BaseTestCase
+from antinex_client.record_cache import RecordCache
+
+
+class RecordCacheTest(BaseTestCase):
+
+    def test_lru_max_entries(self):
+        cache = RecordCache(
+            max_entries=2,
+            max_bytes=0,
+            ttl=0)
+        cache["1"] = {"id": 1}
+        cache["2"] = {"id": 2}
+        self.assertEqual(cache["1"]["id"], 1)
+        cache["3"] = {"id": 3}
+        self.assertIn("1", cache)
+        self.assertNotIn("2", cache)
+        self.assertEqual(len(cache), 2)
+        stats = cache.get_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertIsNone(cache.get("2"))
+        self.assertEqual(cache.get_stats()["misses"], 1)
+    # end of test_lru_max_entries
+
+    def test_fifo_max_bytes(self):
+        cache = RecordCache(
+            max_entries=0,
+            max_bytes=250,
+            ttl=0,
+            eviction="fifo")
+        cache.set("1", {"id": 1}, size=100)
+        cache.set("2", {"id": 2}, size=100)
+        cache.get("1")
+        cache.set("3", {"id": 3}, size=100)
+        self.assertEqual(cache.keys(), ["2", "3"])
+        self.assertEqual(cache.get_stats()["bytes"], 200)
+    # end of test_fifo_max_bytes
+
+    def test_ttl_and_summaries(self):
+        cache = RecordCache(
+            max_entries=10,
+            max_bytes=0,
+            ttl=0.05,
+            summaries_only=True)
+        cache["1"] = {
+            "id": 1,
+            "status": "finished",
+            "predictions_json": {"predictions": [1, 2, 3]}
+        }
+        self.assertEqual(cache["1"], {"id": 1, "status": "finished"})
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("1"))
+        self.assertEqual(cache.get_stats()["expirations"], 1)
+        self.assertEqual(len(cache), 0)
+    # end of test_ttl_and_summaries
+
+    def test_touch_resets_ttl(self):
+        cache = RecordCache(
+            ttl=0.2)
+        cache["1"] = {"id": 1}
+        self.assertFalse(cache.touch("2"))
+        time.sleep(0.15)
+        self.assertTrue(cache.touch("1"))
+        time.sleep(0.15)
+        self.assertEqual(cache.get("1"), {"id": 1})
+    # end of test_touch_resets_ttl
+
+    def test_mapping_interface(self):
+        cache = RecordCache(
+            max_entries=10,
+            max_bytes=0,
+            ttl=0)
+        cache.update({
+            "1": {"id": 1},
+            "2": {"id": 2}
+        })
+        cache["3"] = {"id": 3}
+        self.assertEqual(list(cache), ["1", "2", "3"])
+        self.assertEqual(
+            [k for k, v in cache.items()],
+            ["1", "2", "3"])
+        self.assertEqual(
+            [v["id"] for v in cache.values()],
+            [1, 2, 3])
+        self.assertEqual(cache.get_stats()["hits"], 0)
+        self.assertEqual(cache.pop("2"), {"id": 2})
+        self.assertIsNone(cache.pop("2", None))
+        with self.assertRaises(KeyError):
+            cache.pop("2")
+        del cache["1"]
+        with self.assertRaises(KeyError):
+            del cache["1"]
+        self.assertEqual(dict(cache), {"3": {"id": 3}})
+        # iterating a snapshot allows changing the cache
+        for key in cache:
+            cache[key + "-copy"] = cache[key]
+        self.assertEqual(len(cache), 2)
+    # end of test_mapping_interface
+
+# end of RecordCacheTest
@@ -0,0 +1,168 @@
+import json
+import concurrent.futures
+from tests.base_test import BaseTestCase
+from antinex_client.generate_ai_request import generate_ai_request
+from antinex_client.request_template import RequestTemplate
+from antinex_client.request_template import generate_ai_requests_iter
+
+
+class RequestTemplateTest(BaseTestCase):
+
+    def setUp(self):
+        super(RequestTemplateTest, self).setUp()
+        features = [
+            "idx",
+            "src_port",
+            "dst_port"
+        ]
+        self.kwargs = {
+            "req_dict": {
+                "label": "template",
+                "dataset": "/opt/antinex/datasets/v1/train.csv",
+                "predict_rows": [{"old": 1}]
+            },
+            "use_model_name": "Full-Django-AntiNex-Simple-Scaler-DNN",
+            "predict_feature": "label_value",
+            "sort_values": ["label_value"],
+            "histories": ["val_loss", "val_acc"],
+            "filter_features": features,
+            "filter_features_dict": {
+                f: idx
+                for idx, f in enumerate(features)
+            },
+            "convert_to_type": "float",
+            "value_for_missing": "-1.0"
+        }
+        self.rows = [
+            {"idx": 1, "src_port": "80", "dst_port": 0, "other": "x"},
+            {"idx": 2, "src_port": "443"}
+        ]
+    # end of setUp
+
+    def test_build_matches_generate_ai_request(self):
+        expected = generate_ai_request(
+            predict_rows=self.rows,
+            **self.kwargs)["data"]
+        template = RequestTemplate(
+            **self.kwargs)
+        data = template.build(self.rows)
+        self.assertEqual(json.loads(data.decode("utf-8")), expected)
+        self.assertEqual(template.build_body(self.rows), expected)
+        self.assertEqual(data.label, self.kwargs["use_model_name"])
+        self.assertEqual(data.num_rows, 2)
+        # the template is left as-is
+        self.assertEqual(
+            self.kwargs["req_dict"]["predict_rows"],
+            [{"old": 1}])
+    # end of test_build_matches_generate_ai_request
+
+    def test_empty_template_file(self):
+        with self.assertRaises(ValueError):
+            RequestTemplate(
+                req_dict=None,
+                req_file="/tmp/not-a-real-antinex-request.json")
+    # end of test_empty_template_file
+
+    def test_requests_iter_from_generator(self):
+        rows = [
+            {"idx": idx, "src_port": str(idx), "dst_port": idx * 2}
+            for idx in range(25)
+        ]
+        pulled = []
+
+        def row_gen():
+            for r in rows:
+                pulled.append(r)
+                yield r
+
+        expected = generate_ai_request(
+            predict_rows=rows,
+            **self.kwargs)["data"]
+        requests_iter = generate_ai_requests_iter(
+            row_gen(),
+            max_rows=10,
+            max_bytes=0,
+            convert_batch_rows=5,
+            **self.kwargs)
+        first = next(requests_iter)
+        self.assertEqual(first.num_rows, 10)
+        self.assertEqual(first.offset, 0)
+        # rows are pulled lazily
+        self.assertLess(len(pulled), len(rows))
+        bodies = [first] + list(requests_iter)
+        self.assertEqual([b.num_rows for b in bodies], [10, 10, 5])
+        self.assertEqual([b.offset for b in bodies], [0, 10, 20])
+        predict_rows = []
+        for b in bodies:
+            body = json.loads(b.decode("utf-8"))
+            predict_rows.extend(body.pop("predict_rows"))
+            expected_static = dict(expected)
+            expected_static.pop("predict_rows")
+            self.assertEqual(body, expected_static)
+            self.assertEqual(b.label, self.kwargs["use_model_name"])
+        self.assertEqual(predict_rows, expected["predict_rows"])
+    # end of test_requests_iter_from_generator
+
+    def test_requests_iter_max_bytes(self):
+        rows = [
+            {"idx": idx, "src_port": "80", "dst_port": idx}
+            for idx in range(50)
+        ]
+        template = RequestTemplate(
+            **self.kwargs)
+        max_bytes = len(template.build(rows[0:4]))
+        bodies = list(generate_ai_requests_iter(
+            rows,
+            max_rows=0,
+            max_bytes=max_bytes,
+            template=template))
+        self.assertGreater(len(bodies), 1)
+        self.assertEqual(sum(b.num_rows for b in bodies), len(rows))
+        for b in bodies:
+            self.assertLessEqual(len(b), max_bytes)
+        # a row bigger than max_bytes still gets sent on its own
+        bodies = list(generate_ai_requests_iter(
+            rows[0:3],
+            max_rows=0,
+            max_bytes=1,
+            template=template))
+        self.assertEqual([b.num_rows for b in bodies], [1, 1, 1])
+        self.assertEqual(
+            list(generate_ai_requests_iter([], template=template)),
+            [])
+    # end of test_requests_iter_max_bytes
+
+    def test_requests_iter_keeps_model_batch_size(self):
+        bodies = list(generate_ai_requests_iter(
+            self.rows,
+            batch_size=7,
+            **self.kwargs))
+        self.assertEqual(len(bodies), 1)
+        body = json.loads(bodies[0].decode("utf-8"))
+        self.assertEqual(body["batch_size"], 7)
+    # end of test_requests_iter_keeps_model_batch_size
+
+    def test_requests_iter_process_pool(self):
+        rows = [
+            {"idx": idx, "src_port": str(idx % 7), "dst_port": "x"}
+            for idx in range(120)
+        ]
+        expected = list(generate_ai_requests_iter(
+            rows,
+            max_rows=25,
+            **self.kwargs))
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=2) as executor:
+            found = list(generate_ai_requests_iter(
+                iter(rows),
+                max_rows=25,
+                convert_batch_rows=10,
+                executor=executor,
+                **self.kwargs))
+        self.assertEqual(found, expected)
+        self.assertEqual(
+            [b.offset for b in found],
+            [0, 25, 50, 75, 100])
+    # end of test_requests_iter_process_pool
+
+# end of RequestTemplateTest
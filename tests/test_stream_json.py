@@ -0,0 +1,66 @@
+import json
+import random
+from tests.base_test import BaseTestCase
+from antinex_client.stream_json import iter_json_array
+
+
+def split_chunks(
+        data,
+        size):
+    return [
+        data[i:i + size]
+        for i in range(0, len(data), size)
+    ]
+# end of split_chunks
+
+
+class StreamJSONTest(BaseTestCase):
+
+    def test_matches_json_loads_for_any_chunk_size(self):
+        rand = random.Random(3)
+        predictions = [
+            {
+                "idx": idx,
+                "label_value": rand.random(),
+                "note": 'quoted "predictions": [1] \\ ✓'
+            }
+            for idx in range(50)
+        ]
+        doc = {
+            "id": 5,
+            "model_json": '{"predictions": [9, 9]}',
+            "predictions_json": {
+                "predictions": predictions
+            },
+            "tail": {"predictions": 1}
+        }
+        data = json.dumps(
+            doc,
+            indent=2,
+            ensure_ascii=False).encode("utf-8")
+        for size in (1, 2, 7, 64, len(data)):
+            self.assertEqual(
+                list(iter_json_array(split_chunks(data, size))),
+                predictions)
+    # end of test_matches_json_loads_for_any_chunk_size
+
+    def test_numbers_split_across_chunks(self):
+        data = b'{"predictions": [12345, 678, -1.25e3]}'
+        for size in range(1, 8):
+            self.assertEqual(
+                list(iter_json_array(split_chunks(data, size))),
+                [12345, 678, -1250.0])
+    # end of test_numbers_split_across_chunks
+
+    def test_missing_and_empty(self):
+        self.assertEqual(
+            list(iter_json_array([b'{"predictions": []}'])),
+            [])
+        self.assertEqual(
+            list(iter_json_array([b'{"other": [1]}'])),
+            [])
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'{"predictions": [1, 2']))
+    # end of test_missing_and_empty
+
+# end of StreamJSONTest
@@ -0,0 +1,69 @@
+import os
+import json
+import time
+import stat
+import base64
+import tempfile
+from tests.base_test import BaseTestCase
+from antinex_client.token_cache import TokenCache
+
+
+def build_token(
+        expires_at):
+    claims = base64.urlsafe_b64encode(json.dumps({
+        "exp": expires_at
+    }).encode("utf-8")).decode("ascii").rstrip("=")
+    return "header.{}.signature".format(
+        claims)
+# end of build_token
+
+
+class TokenCacheTest(BaseTestCase):
+
+    def setUp(self):
+        super(TokenCacheTest, self).setUp()
+        self.path = os.path.join(
+            tempfile.mkdtemp(),
+            "antinex",
+            "tokens.json")
+        self.cache = TokenCache(
+            path=self.path,
+            min_ttl=10)
+    # end of setUp
+
+    def test_tokens_are_keyed_by_url_and_user(self):
+        token = build_token(time.time() + 300)
+        self.cache.set("http://api:8010/", "user", token)
+        self.assertEqual(
+            self.cache.get("http://api:8010", "user"),
+            token)
+        self.assertIsNone(self.cache.get("http://api:8010", "other"))
+        self.assertIsNone(self.cache.get("http://other:8010", "user"))
+        self.assertEqual(
+            stat.S_IMODE(os.stat(self.path).st_mode),
+            0o600)
+        self.cache.remove("http://api:8010", "user")
+        self.assertIsNone(self.cache.get("http://api:8010", "user"))
+    # end of test_tokens_are_keyed_by_url_and_user
+
+    def test_expiring_tokens_are_not_reused(self):
+        self.cache.set(
+            "http://api:8010",
+            "user",
+            build_token(time.time() + 5))
+        self.assertIsNone(self.cache.get("http://api:8010", "user"))
+    # end of test_expiring_tokens_are_not_reused
+
+    def test_unreadable_file_is_empty(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            f.write("not json")
+        self.assertIsNone(self.cache.get("http://api:8010", "user"))
+        token = build_token(time.time() + 300)
+        self.cache.set("http://api:8010", "user", token)
+        self.assertEqual(
+            self.cache.get("http://api:8010", "user"),
+            token)
+    # end of test_unreadable_file_is_empty
+
+# end of TokenCacheTest